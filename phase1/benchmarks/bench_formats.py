@@ -0,0 +1,49 @@
+"""
+Compares the JSON and binary snapshot formats of FileStorage.
+
+For a synthetic store it reports the snapshot size, the time to write a
+snapshot, and the time to open the store (parse plus index build).
+
+Usage (from the phase1 directory):
+    python -m benchmarks.bench_formats [--tasks 100000] [--repeat 3]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import make_tasks
+from src.todo.storage import FileStorage, STORAGE_FORMATS
+
+
+def best_of(repeat: int, func) -> float:
+    """Returns the fastest of ``repeat`` timed calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000, help="Number of tasks in the synthetic store")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    print(f"{args.tasks} tasks")
+    print(f"{'format':<8} {'size':>12} {'write':>10} {'open':>10}")
+    for format in STORAGE_FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            storage = FileStorage(storage_dir=Path(directory), format=format, locking=False)
+            storage._tasks = {task.id: task for task in tasks}
+            write = best_of(args.repeat, storage._save_tasks)
+            size = storage._filepath.stat().st_size
+            load = best_of(args.repeat, lambda: FileStorage(storage_dir=Path(directory), format=format, locking=False))
+            print(f"{format:<8} {size / 1e6:>10.2f}MB {write * 1e3:>8.0f}ms {load * 1e3:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
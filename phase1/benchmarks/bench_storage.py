@@ -0,0 +1,218 @@
+"""
+Scaling benchmark for the storage backends.
+
+For each backend and store size it builds a deterministic synthetic store and
+times the basic operations: bulk load, reopening (persistent backends),
+single-task add, get, update and delete, listing pages and a full listing,
+and search pages of 50 results by text query, status, priority and tag. Each
+measurement records the wall time, operations per second, the peak RSS of the
+process and the bytes it handed to ``write()``.
+
+The "file" backend is ``FileStorage`` with its defaults, rewriting the whole
+snapshot on every mutation; "journal" and "lazy" append mutations to the
+journal instead.
+
+Every backend/size pair runs in a fresh subprocess, so peak RSS belongs to
+that pair alone and one store's garbage does not slow the next.
+
+Results can be written as JSON (``--output``) and compared against a stored
+baseline (``--baseline``); the exit status is 1 if any operation got slower
+than ``--tolerance`` allows. ``--save-baseline`` records the run as the new
+baseline. Baselines are only comparable on the same machine.
+
+Usage (from the phase1 directory):
+    python -m benchmarks.bench_storage [--backends memory,file,journal] [--sizes 1k,10k,100k,1m]
+        [--ops 1000] [--queries 50] [--output results.json] [--baseline benchmarks/baseline.json]
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic import make_tasks
+from src.todo.storage import FileStorage, InMemoryStorage, SQLiteStorage
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+BACKENDS: Dict[str, Callable[[Path], object]] = {
+    'memory': lambda directory: InMemoryStorage(),
+    # The FileStorage defaults: every mutation rewrites the whole snapshot.
+    'file': lambda directory: FileStorage(storage_dir=directory),
+    'journal': lambda directory: FileStorage(storage_dir=directory, journal=True),
+    'lazy': lambda directory: FileStorage(storage_dir=directory, journal=True, lazy=True, format='binary'),
+    'sqlite': lambda directory: SQLiteStorage(storage_dir=directory),
+}
+PERSISTENT = ('file', 'journal', 'lazy', 'sqlite')
+# Backends whose single-task writes cost O(N) run at most this many of each,
+# so large stores still finish; ops/s stays comparable with the others.
+REWRITING = ('file',)
+REWRITE_OPS = 20
+PAGE = 50
+
+
+def parse_size(value: str) -> int:
+    """Converts '1k', '10k', '1m' or a plain number to a task count."""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(value.rstrip('km')) * multiplier
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes
+
+
+def bytes_written() -> Optional[int]:
+    """Bytes this process has passed to ``write()`` so far (Linux only)."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run_case(backend: str, size: int, ops: int, queries: int, seed: int) -> List[dict]:
+    """Measures every operation for one backend and store size."""
+    tasks = make_tasks(size, seed)
+    extra = make_tasks(ops, seed + 1, start=size)
+    rng = random.Random(seed)
+    sample = [task.id for task in rng.sample(tasks, min(ops, size))]
+    writes = REWRITE_OPS if backend in REWRITING else ops
+    results = []
+
+    def measure(op: str, count: int, func: Callable[[], object]) -> None:
+        written = bytes_written()
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        after = bytes_written()
+        results.append({
+            "backend": backend, "tasks": size, "op": op, "count": count,
+            "seconds": seconds, "ops_per_sec": count / seconds if seconds else None,
+            "peak_rss_kb": peak_rss_kb(),
+            "bytes_written": after - written if written is not None and after is not None else None,
+        })
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        storage = BACKENDS[backend](directory)
+        measure("bulk_add", size, lambda: storage.add_tasks(tasks))
+        if backend in PERSISTENT:
+            getattr(storage, 'close', lambda: None)()
+            opened = []
+            measure("open", 1, lambda: opened.append(BACKENDS[backend](directory)))
+            storage = opened[0]
+
+        measure("add_task", len(extra[:writes]), lambda: [storage.add_task(task) for task in extra[:writes]])
+        measure("get_task", len(sample), lambda: [storage.get_task(task_id) for task_id in sample])
+        measure("update_task", len(sample[:writes]),
+                lambda: [storage.update_task(task_id, priority="high") for task_id in sample[:writes]])
+        measure("list_tasks", queries,
+                lambda: [storage.list_tasks(limit=PAGE, offset=i * PAGE % size) for i in range(queries)])
+        measure("list_all", 1, storage.list_tasks)
+        searches = {
+            "search_query": dict(query="report"),
+            "search_status": dict(status="completed"),
+            "search_priority": dict(priority="low"),
+            "search_tags": dict(tags=["urgent", "work"]),
+        }
+        for op, filters in searches.items():
+            measure(op, queries, lambda: [storage.search_tasks(limit=PAGE, **filters) for _ in range(queries)])
+        measure("delete_task", len(sample[:writes]), lambda: [storage.delete_task(task_id) for task_id in sample[:writes]])
+        getattr(storage, 'close', lambda: None)()
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Returns a line for each operation whose throughput fell below the baseline by more than ``tolerance``."""
+    previous = {(r["backend"], r["tasks"], r["op"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["backend"], result["tasks"], result["op"]))
+        if not before or not before["ops_per_sec"] or not result["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / before["ops_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{result['backend']:<7} {result['tasks']:>8} {result['op']:<16} "
+                               f"{before['ops_per_sec']:>12.0f} -> {result['ops_per_sec']:>12.0f} ops/s ({ratio:.0%})")
+    return regressions
+
+
+def print_table(results: List[dict]) -> None:
+    print(f"{'backend':<7} {'tasks':>8} {'op':<16} {'count':>8} {'seconds':>9} {'ops/s':>12} {'peak RSS':>10} {'written':>10}")
+    for r in results:
+        rss = f"{r['peak_rss_kb'] / 1024:.0f}MB" if r["peak_rss_kb"] is not None else "-"
+        written = f"{r['bytes_written'] / 1e6:.1f}MB" if r["bytes_written"] is not None else "-"
+        ops = f"{r['ops_per_sec']:.0f}" if r["ops_per_sec"] else "-"
+        print(f"{r['backend']:<7} {r['tasks']:>8} {r['op']:<16} {r['count']:>8} {r['seconds']:>9.4f} {ops:>12} {rss:>10} {written:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="memory,file,journal", help=f"Comma-separated, from: {', '.join(BACKENDS)}")
+    parser.add_argument("--sizes", default="1k,10k,100k,1m", help="Comma-separated store sizes (e.g. 1k,10k,100k,1m)")
+    parser.add_argument("--ops", type=int, default=1000, help="Operations per single-task measurement")
+    parser.add_argument("--queries", type=int, default=50, help="Listing and search pages per measurement")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic store")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare against the results in this JSON file")
+    parser.add_argument("--save-baseline", type=Path, help="Also write the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed throughput drop against the baseline")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, size = args.worker
+        json.dump(run_case(backend, int(size), args.ops, args.queries, args.seed), sys.stdout)
+        return
+
+    backends = [name.strip() for name in args.backends.split(',')]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+    results = []
+    for size in (parse_size(value) for value in args.sizes.split(',')):
+        for backend in backends:
+            print(f"Running {backend} with {size} tasks...", file=sys.stderr)
+            worker = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_storage", "--worker", backend, str(size),
+                 "--ops", str(args.ops), "--queries", str(args.queries), "--seed", str(args.seed)],
+                check=True, stdout=subprocess.PIPE, text=True,
+            )
+            results.extend(json.loads(worker.stdout))
+
+    print_table(results)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "ops": args.ops, "queries": args.queries, "seed": args.seed, "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(report, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
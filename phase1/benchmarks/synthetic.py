@@ -0,0 +1,35 @@
+"""
+Deterministic synthetic task stores for the benchmarks.
+
+The same ``count`` and ``seed`` always produce the same tasks, IDs included,
+so results from different runs and machines describe the same store.
+"""
+import random
+import uuid
+from typing import List
+
+from src.todo.models import Task
+
+TAGS = ["work", "home", "errands", "urgent", "later", "project-x", "reading"]
+VERBS = ['write', 'review', 'call', 'buy', 'fix']
+OBJECTS = ['report', 'groceries', 'bug', 'mom', 'docs']
+
+
+def make_tasks(count: int, seed: int = 42, start: int = 0) -> List[Task]:
+    """Builds ``count`` tasks with a realistic mix of fields, numbered from ``start``."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(start, start + count):
+        day = 1 + i % 28
+        tasks.append(Task(
+            title=f"Task {i}: {rng.choice(VERBS)} {rng.choice(OBJECTS)}",
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            description=rng.choice([None, "", "Some longer notes about what needs to happen next."]),
+            status=rng.choice(["pending", "pending", "completed"]),
+            priority=rng.choice(["high", "medium", "low", None]),
+            tags=rng.sample(TAGS, rng.randint(0, 3)),
+            created_at=f"2025-{1 + i % 12:02d}-{day:02d}T{i % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}Z",
+            modified_at=rng.choice([None, f"2025-12-{day:02d}T08:00:00Z"]),
+            due_date=rng.choice([None, f"2026-01-{day:02d}T00:00:00Z"]),
+        ))
+    return tasks
@@ -0,0 +1,93 @@
+"""
+Versioned result cache for the read-only agent skills.
+
+Agent loops and the TUI issue the same ``list`` and ``stats`` commands over
+and over, and each call used to re-query storage and re-format the whole
+output. ``ResultCache`` remembers formatted results keyed on the skill and its
+normalized arguments. Each result is stamped with a generation: the storage
+``version``, which every mutation (including those of other processes)
+increments. A result is reused only while the generation is unchanged, so a
+repeated read between writes is a dictionary lookup.
+"""
+from collections import OrderedDict
+from functools import wraps
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of skill results, each valid for one storage generation.
+
+    Args:
+        max_size: Most results kept; the least recently used is evicted first.
+
+    Attributes:
+        hits: Lookups answered from the cache.
+        misses: Lookups that had to compute the result (absent or stale).
+    """
+    def __init__(self, max_size: int = 128):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Hashable, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, generation: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns the result cached under ``key`` for ``generation``, computing and storing it if needed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Computed outside the lock: a concurrent caller at worst computes it too.
+        value = compute()
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Drops every cached result; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters, the current size and the size limit."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_size": self.max_size}
+
+    def cached(self, generation: Callable[[], Hashable]) -> Callable[[Callable], Callable]:
+        """
+        Decorator caching a function's results per ``generation()``.
+
+        Arguments are normalized through the function's signature, so
+        ``f()``, ``f(None)`` and ``f(status=None)`` share one entry. The wrapper
+        keeps the signature and docstring, so it can still be registered with
+        ``Skill.from_callable``.
+        """
+        def decorate(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (func.__qualname__, tuple(bound.arguments.items()))
+                try:
+                    hash(key)
+                except TypeError:
+                    return func(*args, **kwargs)  # unhashable arguments are not cached
+                return self.get_or_compute(key, generation(), lambda: func(*args, **kwargs))
+            wrapper.cache = self
+            return wrapper
+        return decorate
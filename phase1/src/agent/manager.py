@@ -7,6 +7,7 @@ and dispatching them to the appropriate underlying skills.
 """
 from src.agent.base import Agent, Skill
 import src.agent.skills as skills
+from src.todo.query import looks_like_filter
 
 class TodoManager(Agent):
     """
@@ -32,10 +33,13 @@ class TodoManager(Agent):
         Registers all task-related skills with the agent.
         
         This includes skills for:
-        - creating and listing tasks
+        - creating and listing tasks, optionally with a filter expression
         - updating and completing tasks
         - searching and deleting tasks
         - getting statistics
+        - listing overdue and upcoming tasks by due date
+        - completing and deleting many tasks at once
+        - undoing and redoing changes, and listing tasks as of a past date
         """
         self.add_skill(Skill.from_callable(skills.add_task))
         self.add_skill(Skill.from_callable(skills.list_tasks))
@@ -45,6 +49,13 @@ class TodoManager(Agent):
         self.add_skill(Skill.from_callable(skills.update_task))
         self.add_skill(Skill.from_callable(skills.get_task_details))
         self.add_skill(Skill.from_callable(skills.get_statistics))
+        self.add_skill(Skill.from_callable(skills.bulk_complete))
+        self.add_skill(Skill.from_callable(skills.bulk_delete))
+        self.add_skill(Skill.from_callable(skills.list_overdue))
+        self.add_skill(Skill.from_callable(skills.list_due_soon))
+        self.add_skill(Skill.from_callable(skills.undo))
+        self.add_skill(Skill.from_callable(skills.redo))
+        self.add_skill(Skill.from_callable(skills.list_tasks_at))
 
     def run(self, user_input: str) -> str:
         """
@@ -75,18 +86,35 @@ class TodoManager(Agent):
             return self.get_skill("add_task")(title=title)
             
         elif command in ["list", "show", "ls"]:
+            rest = user_input.split(None, 1)[1] if len(args) > 1 else ""
+            if looks_like_filter(rest):
+                return self.get_skill("list_tasks")(where=rest)
             status = "completed" if "completed" in args else ("pending" if "pending" in args else None)
             return self.get_skill("list_tasks")(status=status)
         
         elif command in ["search", "find"]:
-            if len(args) < 2: return "Search query required. Usage: search <query>"
-            query = " ".join(args[1:])
-            return self.get_skill("search_tasks")(query=query)
+            usage = "Search query required. Usage: search [--ranked] <query | filter expression>"
+            if len(args) < 2: return usage
+            query = user_input.split(None, 1)[1]
+            if looks_like_filter(query):
+                return self.get_skill("search_tasks")(where=query)
+            # Matches come in listing order unless relevance ranking is asked for.
+            words = [word for word in args[1:] if word != "--ranked"]
+            if not words: return usage
+            return self.get_skill("search_tasks")(query=" ".join(words), ranked=len(words) < len(args) - 1)
             
         elif command in ["complete", "done", "finish"]:
             if len(args) < 2: return "Task ID required. Usage: complete <task-id>"
             return self.get_skill("complete_task")(task_id=args[1])
         
+        elif command in ["bulk-complete", "bulk-done"]:
+            if len(args) < 2: return "Task IDs required. Usage: bulk-complete <task-id> [<task-id>...]"
+            return self.get_skill("bulk_complete")(task_ids=" ".join(args[1:]))
+
+        elif command in ["bulk-delete", "bulk-rm"]:
+            if len(args) < 2: return "Task IDs required. Usage: bulk-delete <task-id> [<task-id>...]"
+            return self.get_skill("bulk_delete")(task_ids=" ".join(args[1:]))
+
         elif command in ["update", "edit", "modify"]:
             if len(args) < 2: return "Task ID required. Usage: update <task-id> [field=value...]"
             return self.get_skill("update_task")(task_id=args[1])
@@ -99,6 +127,23 @@ class TodoManager(Agent):
             if len(args) < 2: return "Task ID required. Usage: details <task-id>"
             return self.get_skill("get_task_details")(task_id=args[1])
         
+        elif command in ["overdue", "late"]:
+            return self.get_skill("list_overdue")()
+
+        elif command in ["due", "upcoming", "soon"]:
+            within = args[1] if len(args) > 1 else "7d"
+            return self.get_skill("list_due_soon")(within=within)
+
+        elif command == "undo":
+            return self.get_skill("undo")()
+
+        elif command == "redo":
+            return self.get_skill("redo")()
+
+        elif command in ["at", "asof"]:
+            if len(args) < 2: return "Date required. Usage: at <date>"
+            return self.get_skill("list_tasks_at")(date=args[1])
+
         elif command in ["stats", "statistics", "summary"]:
             return self.get_skill("get_statistics")()
 
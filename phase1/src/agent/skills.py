@@ -6,13 +6,31 @@ These functions wrap the underlying `FileStorage` and logic into string-in/strin
 functions that are easy for an LLM or agent to invoke.
 """
 from typing import List, Optional
-from src.todo.storage import FileStorage
+from src.agent.cache import ResultCache
+from src.todo.storage import AmbiguousIDError, FileStorage, history_enabled
 from src.todo.models import Task
-from src.todo.utils import now_iso
+from src.todo.query import quote_value
+from src.todo.utils import now_epoch, now_iso, parse_date, parse_duration
 
 # Shared storage instance for skills
 # Agents using these skills will operate on the same persistent file storage.
-_storage = FileStorage()
+# Writes are persisted in the background so interactive commands return at once.
+# The event history is recorded only if the store has opted in (see the CLI's
+# --history); it is then shared with the CLI, so either can undo the other's changes.
+_storage = FileStorage(journal=True, write_behind=True, history=history_enabled())
+
+# Formatted results of the listing, search and statistics skills, reused until
+# the store changes. Its hit and miss counters are in ``read_cache.stats()``.
+read_cache = ResultCache(max_size=128)
+
+def _generation():
+    # The storage object is included so that swapping it (as tests do) invalidates every entry.
+    return (_storage, _storage.version)
+
+def _generation_this_minute():
+    # Overdue counts and weekly buckets also move with the clock.
+    return (*_generation(), now_epoch() // 60)
+
 
 def add_task(title: str, description: str = None, priority: str = "medium", tags: str = "") -> str:
     """
@@ -37,7 +55,9 @@ def add_task(title: str, description: str = None, priority: str = "medium", tags
     _storage.add_task(task)
     return f"Task '{title}' added successfully. ID: {task.id}"
 
-def list_tasks(status: str = None, priority: str = None, tag: str = None) -> str:
+@read_cache.cached(_generation)
+def list_tasks(status: str = None, priority: str = None, tag: str = None,
+               limit: int = None, after: str = None, where: str = None) -> str:
     """
     Lists tasks, optionally filtered.
     
@@ -45,44 +65,149 @@ def list_tasks(status: str = None, priority: str = None, tag: str = None) -> str
         status: (Optional) Filter by 'pending' or 'completed'.
         priority: (Optional) Filter by 'high', 'medium', 'low'.
         tag: (Optional) Filter by a specific tag.
+        limit: (Optional) Maximum number of tasks to return.
+        after: (Optional) Cursor from a previous page's "Next cursor" line.
+        where: (Optional) Filter expression, e.g. 'status=pending and (priority=high or tag:urgent) and due<2026-11-01'.
         
     Returns:
         A formatted string list of tasks.
     """
     # map singular tag arg to list for storage search
     tags_filter = [tag] if tag else None
+    # Fetch one extra task to know whether another page follows
+    page_size = limit + 1 if limit else None
     
     # Use search_tasks for filtering if args provided, else list_tasks
-    if status or priority or tags_filter:
-        tasks = _storage.search_tasks(status=status, priority=priority, tags=tags_filter)
+    if where:
+        terms = [f"({where})"] + [f'{field}={quote_value(value)}' for field, value in
+                                  (("status", status), ("priority", priority), ("tag", tag)) if value]
+        try:
+            tasks = _storage.filter_tasks(" and ".join(terms), limit=page_size, after=after)
+        except ValueError as e:
+            return f"Error: {e}"
+    elif status or priority or tags_filter:
+        tasks = _storage.search_tasks(status=status, priority=priority, tags=tags_filter,
+                                      limit=page_size, after=after)
     else:
-        tasks = _storage.list_tasks()
+        tasks = _storage.list_tasks(limit=page_size, after=after)
 
     if not tasks:
         return "No tasks found matching criteria."
 
-    output = []
-    for t in tasks:
-        check = "[x]" if t.status == "completed" else "[ ]"
-        prio = f"({t.priority})" if t.priority else ""
-        tags_str = f"[{', '.join(t.tags)}]" if t.tags else ""
-        output.append(f"{check} {t.title} {prio} {tags_str} - ID: {t.id}")
+    has_more = bool(limit) and len(tasks) > limit
+    tasks = tasks[:limit] if limit else tasks
+
+    output = [_format_task_line(t) for t in tasks]
+    if has_more:
+        output.append(f"Next cursor: {_storage.cursor_for(tasks[-1])}")
     
     return "\n".join(output)
 
+def _format_task_line(t: Task) -> str:
+    check = "[x]" if t.status == "completed" else "[ ]"
+    prio = f"({t.priority})" if t.priority else ""
+    tags_str = f"[{', '.join(t.tags)}]" if t.tags else ""
+    return f"{check} {t.title} {prio} {tags_str} - ID: {t.id}"
+
+def list_overdue(limit: int = None) -> str:
+    """
+    Lists pending tasks whose due date has passed, most overdue first.
+    
+    Args:
+        limit: (Optional) Maximum number of tasks to return.
+        
+    Returns:
+        A formatted string list of overdue tasks with their due dates.
+    """
+    tasks = _storage.overdue(limit=limit)
+    if not tasks:
+        return "No overdue tasks."
+    return "\n".join(f"{_format_task_line(t)} - Due: {t.due_date}" for t in tasks)
+
+def list_due_soon(within: str = "7d", limit: int = None) -> str:
+    """
+    Lists pending tasks falling due within a time window, earliest first.
+    
+    Args:
+        within: Window from now, e.g. '12h', '3d' or '2w'. Default: '7d'.
+        limit: (Optional) Maximum number of tasks to return.
+        
+    Returns:
+        A formatted string list of upcoming tasks with their due dates.
+    """
+    try:
+        window = parse_duration(within)
+    except ValueError as e:
+        return f"Error: {e}"
+    now = now_epoch()
+    tasks = _storage.due_between(now, now + window, limit=limit)
+    if not tasks:
+        return f"No tasks due within {within}."
+    return "\n".join(f"{_format_task_line(t)} - Due: {t.due_date}" for t in tasks)
+
+def list_tasks_at(date: str) -> str:
+    """
+    Lists the tasks as they were at a past date, rebuilt from the change history.
+    
+    Args:
+        date: ISO 8601 date or date-time, e.g. '2025-12-02' or '2025-12-02T17:00:00Z'.
+        
+    Returns:
+        A formatted string list of the tasks at that time.
+    """
+    at = parse_date(date)
+    if at is None:
+        return f"Error: Invalid date: {date}. Use ISO 8601, e.g. 2025-12-31."
+    try:
+        tasks = _storage.state_at(at)
+    except ValueError as e:
+        return f"Error: {e}"
+    if not tasks:
+        return f"No tasks at {date}."
+    return "\n".join(_format_task_line(t) for t in tasks)
+
+def undo() -> str:
+    """
+    Reverts the most recent change to the tasks; a bulk operation counts as one change.
+    
+    Returns:
+        Confirmation message.
+    """
+    try:
+        count = _storage.undo()
+    except ValueError as e:
+        return f"Error: {e}"
+    return f"Undid {count} change(s)." if count else "Nothing to undo."
+
+def redo() -> str:
+    """
+    Re-applies the most recently undone change.
+    
+    Returns:
+        Confirmation message.
+    """
+    try:
+        count = _storage.redo()
+    except ValueError as e:
+        return f"Error: {e}"
+    return f"Redid {count} change(s)." if count else "Nothing to redo."
+
 def complete_task(task_id: str) -> str:
     """
     Marks a task as completed.
     
     Args:
-        task_id: The UUID of the task to complete.
+        task_id: The UUID of the task to complete, or a unique prefix of it.
         
     Returns:
         Confirmation message.
     """
     try:
+        task_id = _storage.resolve_id(task_id)
         _storage.update_task(task_id, status="completed")
         return f"Task {task_id} marked as completed."
+    except AmbiguousIDError as e:
+        return f"Error: {e}"
     except KeyError:
         return f"Error: Task with ID {task_id} not found."
 
@@ -91,37 +216,112 @@ def delete_task(task_id: str) -> str:
     Deletes a task.
     
     Args:
-        task_id: The UUID of the task to delete.
+        task_id: The UUID of the task to delete, or a unique prefix of it.
         
     Returns:
         Confirmation message.
     """
     try:
+        task_id = _storage.resolve_id(task_id)
         _storage.delete_task(task_id)
         return f"Task {task_id} deleted."
+    except AmbiguousIDError as e:
+        return f"Error: {e}"
     except KeyError:
         return f"Error: Task with ID {task_id} not found."
 
-def search_tasks(query: str) -> str:
+def _split_ids(task_ids: str) -> List[str]:
+    """Splits a comma- or whitespace-separated list of task IDs."""
+    return [t for t in task_ids.replace(',', ' ').split() if t]
+
+def bulk_complete(task_ids: str) -> str:
+    """
+    Marks several tasks as completed in one operation.
+    
+    Either every task is completed or, if any ID is unknown or ambiguous, none is.
+    
+    Args:
+        task_ids: Comma- or space-separated task UUIDs or unique prefixes.
+        
+    Returns:
+        Confirmation message.
+    """
+    ids = _split_ids(task_ids)
+    if not ids:
+        return "No task IDs given."
+    try:
+        ids = [_storage.resolve_id(task_id) for task_id in ids]
+        updated = _storage.update_tasks({task_id: {"status": "completed"} for task_id in ids})
+        return f"{len(updated)} task(s) marked as completed."
+    except AmbiguousIDError as e:
+        return f"Error: {e}. No tasks were changed."
+    except KeyError as e:
+        return f"Error: {e.args[0]} No tasks were changed."
+
+def bulk_delete(task_ids: str) -> str:
     """
-    Search tasks by query in title or description.
+    Deletes several tasks in one operation.
+    
+    Either every task is deleted or, if any ID is unknown or ambiguous, none is.
     
     Args:
-        query: Search query string.
+        task_ids: Comma- or space-separated task UUIDs or unique prefixes.
+        
+    Returns:
+        Confirmation message.
+    """
+    ids = _split_ids(task_ids)
+    if not ids:
+        return "No task IDs given."
+    try:
+        ids = [_storage.resolve_id(task_id) for task_id in ids]
+        deleted = _storage.delete_tasks(ids)
+        return f"{deleted} task(s) deleted."
+    except AmbiguousIDError as e:
+        return f"Error: {e}. No tasks were deleted."
+    except KeyError as e:
+        return f"Error: {e.args[0]} No tasks were deleted."
+
+@read_cache.cached(_generation)
+def search_tasks(query: str = None, ranked: bool = False, limit: int = None, after: str = None,
+                 where: str = None) -> str:
+    """
+    Search tasks by query in title or description, or by a filter expression.
+    
+    Args:
+        query: (Optional) Search query string.
+        ranked: (Optional) Order results by relevance instead of listing order; not used with `where`.
+        limit: (Optional) Maximum number of tasks to return.
+        after: (Optional) Cursor from a previous page's "Next cursor" line.
+        where: (Optional) Filter expression, e.g. 'tag:work and not priority=low'; combined with `query` if both are given.
         
     Returns:
         Formatted list of matching tasks.
     """
+    if not query and not where:
+        return "Error: A search query or filter expression is required."
     try:
-        tasks = _storage.search_tasks(query=query)
+        page_size = limit + 1 if limit else None
+        if where:
+            ranked = False
+            expression = f'({where}) and text:{quote_value(query)}' if query else where
+            tasks = _storage.filter_tasks(expression, limit=page_size, after=after)
+            query = expression
+        else:
+            tasks = _storage.search_tasks(query=query, ranked=ranked, limit=page_size, after=after)
         if not tasks:
             return f"No tasks found matching '{query}'."
+
+        has_more = bool(limit) and len(tasks) > limit
+        tasks = tasks[:limit] if limit else tasks
         
         output = [f"Found {len(tasks)} task(s) matching '{query}':"]
         for t in tasks:
             check = "[x]" if t.status == "completed" else "[ ]"
             prio = f"({t.priority})" if t.priority else ""
             output.append(f"{check} {t.title} {prio} - ID: {t.id}")
+        if has_more and not ranked:
+            output.append(f"Next cursor: {_storage.cursor_for(tasks[-1])}")
         
         return "\n".join(output)
     except Exception as e:
@@ -133,7 +333,7 @@ def update_task(task_id: str, title: str = None, description: str = None,
     Update a task's fields.
     
     Args:
-        task_id: The UUID of the task to update.
+        task_id: The UUID of the task to update, or a unique prefix of it.
         title: (Optional) New title.
         description: (Optional) New description.
         priority: (Optional) New priority ('high', 'medium', 'low').
@@ -152,6 +352,7 @@ def update_task(task_id: str, title: str = None, description: str = None,
         if not update_fields:
             return "No fields specified for update."
         
+        task_id = _storage.resolve_id(task_id)
         _storage.update_task(task_id, **update_fields)
         return f"Task {task_id} updated successfully."
     except KeyError:
@@ -164,13 +365,13 @@ def get_task_details(task_id: str) -> str:
     Get detailed information about a specific task.
     
     Args:
-        task_id: The UUID of the task.
+        task_id: The UUID of the task, or a unique prefix of it.
         
     Returns:
         Detailed task information.
     """
     try:
-        task = _storage.get_task(task_id)
+        task = _storage.get_task(_storage.resolve_id(task_id))
         output = [
             f"Task Details:",
             f"  ID: {task.id}",
@@ -184,27 +385,43 @@ def get_task_details(task_id: str) -> str:
             f"  Due Date: {task.due_date or 'No due date'}"
         ]
         return "\n".join(output)
+    except AmbiguousIDError as e:
+        return f"Error: {e}"
     except KeyError:
         return f"Error: Task with ID {task_id} not found."
 
+@read_cache.cached(_generation_this_minute)
 def get_statistics() -> str:
     """
     Get statistics about all tasks.
     
     Returns:
-        Task statistics summary.
+        Task statistics summary with priority, tag, overdue and creation breakdowns.
     """
-    tasks = _storage.list_tasks()
-    total = len(tasks)
-    completed = len([t for t in tasks if t.status == "completed"])
-    pending = total - completed
-    high_priority = len([t for t in tasks if t.priority == "high" and t.status == "pending"])
+    stats = _storage.statistics()
+    total = stats["total"]
+    completed = stats["by_status"]["completed"]
+    pending_by_priority = stats["pending_by_priority"]
     
     output = [
         "Task Statistics:",
         f"  Total tasks: {total}",
         f"  Completed: {completed}",
-        f"  Pending: {pending}",
-        f"  High priority (pending): {high_priority}"
+        f"  Pending: {total - completed}",
+        f"  High priority (pending): {pending_by_priority['high']}",
+        f"  Overdue (pending): {stats['overdue']}",
+        "By priority (pending/total):",
     ]
+    for priority, count in stats["by_priority"].items():
+        output.append(f"  {priority or 'none'}: {pending_by_priority.get(priority, 0)}/{count}")
+    if stats["by_tag"]:
+        output.append("By tag (pending/total):")
+        for tag, counts in stats["by_tag"].items():
+            output.append(f"  {tag}: {counts['pending']}/{counts['total']}")
+    if stats["overdue_by_week"]:
+        output.append("Overdue by weeks late:")
+        for week, count in stats["overdue_by_week"].items():
+            output.append(f"  {week}-{week + 1} weeks: {count}")
+    output.append("Created per week (most recent first): "
+                  + ", ".join(str(count) for count in stats["created_by_week"]))
     return "\n".join(output)
@@ -0,0 +1,245 @@
+"""
+Asyncio facade over the storage backends.
+
+``AsyncStorage`` runs every storage call in a worker thread, so file and
+database I/O never block the event loop. The calls go through one queue and
+run in the order they were made, one at a time, on a single thread: the
+backends are not thread-safe, and a session reads its own writes.
+
+Writes that pile up while the worker is busy are coalesced: a run of
+consecutive ``add``, ``update`` and ``delete`` calls is applied inside one
+``batch()``, so a file store takes its lock and writes to disk once for the
+whole run. A call that fails inside such a group only fails its own caller;
+the others still commit. If the group itself cannot be written, every call in
+it fails with that error and all of its changes are rolled back.
+
+Example::
+
+    store = AsyncStorage(FileStorage())
+    await asyncio.gather(*(store.add_task(Task(title=t)) for t in titles))
+    async for task in store.iter_tasks(status="pending"):
+        ...
+    await store.close()
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.todo.events import ChangeEvent, Subscriber
+from src.todo.models import Task
+from src.todo.query import TaskFilter, compile_filter
+
+
+class AsyncStorage:
+    """
+    Awaitable interface to a storage backend.
+
+    Args:
+        storage: An ``InMemoryStorage``, ``FileStorage`` or ``SQLiteStorage``.
+            It must not be used directly while the facade is in use.
+        executor: Runs the storage calls; it must run them one at a time.
+            Defaults to a private single-thread executor.
+    """
+    def __init__(self, storage, executor: Optional[Executor] = None):
+        self.storage = storage
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-storage")
+        self._owns_executor = executor is None
+        # (coalesce, call, future) in submission order.
+        self._queue: Deque[Tuple[bool, Callable[[], Any], asyncio.Future]] = deque()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'AsyncStorage':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _submit(self, call: Callable[[], Any], coalesce: bool = False) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((coalesce, call, future))
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._work())
+        return await future
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            coalesce, call, future = self._queue.popleft()
+            if not coalesce:
+                try:
+                    outcome = (True, await loop.run_in_executor(self._executor, call))
+                except Exception as e:
+                    outcome = (False, e)
+                _settle(future, outcome)
+                continue
+            group = [(call, future)]
+            while self._queue and self._queue[0][0]:
+                group.append(self._queue.popleft()[1:])
+            outcomes = await loop.run_in_executor(self._executor, self._write_group, [call for call, _ in group])
+            for (_, future), outcome in zip(group, outcomes):
+                _settle(future, outcome)
+
+    def _write_group(self, calls: List[Callable[[], Any]]) -> List[Tuple[bool, Any]]:
+        """Runs coalesced writes in one batch; runs in the worker thread."""
+        outcomes = []
+        try:
+            with self.storage.batch():
+                for call in calls:
+                    try:
+                        outcomes.append((True, call()))
+                    except Exception as e:
+                        # Every write validates before it changes anything, so a
+                        # failed one leaves nothing behind to roll back.
+                        outcomes.append((False, e))
+        except Exception as e:
+            return [(False, e)] * len(calls)
+        return outcomes
+
+    async def close(self) -> None:
+        """Waits for queued calls, flushes and closes the store, and stops the worker thread."""
+        if self._worker is not None:
+            await asyncio.shield(self._worker)
+        close = getattr(self.storage, 'close', None)
+        if close is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, close)
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    # --- Writes (coalesced) ---
+
+    async def add_task(self, task: Task) -> None:
+        await self._submit(partial(self.storage.add_task, task), coalesce=True)
+
+    async def update_task(self, task_id: str, **kwargs) -> Task:
+        return await self._submit(partial(self.storage.update_task, task_id, **kwargs), coalesce=True)
+
+    async def delete_task(self, task_id: str) -> None:
+        await self._submit(partial(self.storage.delete_task, task_id), coalesce=True)
+
+    async def add_tasks(self, tasks: Iterable[Task]) -> List[Task]:
+        return await self._submit(partial(self.storage.add_tasks, list(tasks)), coalesce=True)
+
+    async def update_tasks(self, updates: Dict[str, dict]) -> List[Task]:
+        return await self._submit(partial(self.storage.update_tasks, updates), coalesce=True)
+
+    async def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        return await self._submit(partial(self.storage.delete_tasks, list(task_ids)), coalesce=True)
+
+    async def undo(self) -> int:
+        """Runs ``undo`` on its own, since it cannot join a batch."""
+        return await self._submit(self.storage.undo)
+
+    async def redo(self) -> int:
+        return await self._submit(self.storage.redo)
+
+    async def flush(self) -> None:
+        """Writes out changes a write-behind file store still holds back."""
+        flush = getattr(self.storage, 'flush', None)
+        if flush is not None:
+            await self._submit(flush)
+
+    # --- Reads ---
+
+    async def get_task(self, task_id: str) -> Task:
+        return await self._submit(partial(self.storage.get_task, task_id))
+
+    async def resolve_id(self, prefix: str) -> str:
+        return await self._submit(partial(self.storage.resolve_id, prefix))
+
+    async def short_id(self, task_id: str, min_length: int = 8) -> str:
+        return await self._submit(partial(self.storage.short_id, task_id, min_length))
+
+    async def short_ids(self, task_ids: Iterable[str], min_length: int = 8) -> List[str]:
+        return await self._submit(partial(self.storage.short_ids, list(task_ids), min_length))
+
+    async def version(self) -> int:
+        """The store's change counter (a property on the backends)."""
+        return await self._submit(lambda: self.storage.version)
+
+    async def list_tasks(self, limit: Optional[int] = None, offset: int = 0,
+                         after: Optional[str] = None) -> List[Task]:
+        return await self._submit(partial(self.storage.list_tasks, limit=limit, offset=offset, after=after))
+
+    async def search_tasks(self, *args, **kwargs) -> List[Task]:
+        return await self._submit(partial(self.storage.search_tasks, *args, **kwargs))
+
+    async def filter_tasks(self, where: Union[str, TaskFilter], limit: Optional[int] = None,
+                           after: Optional[str] = None) -> List[Task]:
+        return await self._submit(partial(self.storage.filter_tasks, where, limit=limit, after=after))
+
+    async def statistics(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        return await self._submit(partial(self.storage.statistics, now, weeks))
+
+    async def due_between(self, start: Optional[int] = None, end: Optional[int] = None,
+                          limit: Optional[int] = None) -> List[Task]:
+        return await self._submit(partial(self.storage.due_between, start, end, limit))
+
+    async def overdue(self, now: Optional[int] = None, limit: Optional[int] = None) -> List[Task]:
+        return await self._submit(partial(self.storage.overdue, now, limit))
+
+    async def next_due(self, k: int = 1, now: Optional[int] = None) -> List[Task]:
+        return await self._submit(partial(self.storage.next_due, k, now))
+
+    async def state_at(self, timestamp: int) -> List[Task]:
+        return await self._submit(partial(self.storage.state_at, timestamp))
+
+    async def changes_since(self, version: int) -> Optional[List[ChangeEvent]]:
+        return await self._submit(partial(self.storage.changes_since, version))
+
+    async def iter_tasks(
+        self,
+        query: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        batch_size: int = 500,
+        where: Union[str, TaskFilter, None] = None
+    ) -> AsyncIterator[Task]:
+        """
+        Yields matching tasks in listing order, fetching one page per worker call.
+
+        Like ``iter_tasks`` of the backends, each page is requested with a
+        cursor, so the caller may change tasks while iterating and other
+        sessions' calls run between pages.
+        """
+        filtered = query or status or priority or tags
+        if where is not None:
+            where = compile_filter(where)
+        while True:
+            if where is not None:
+                page = await self.filter_tasks(where, limit=batch_size, after=after)
+            elif filtered:
+                page = await self.search_tasks(query=query, status=status, priority=priority, tags=tags,
+                                               limit=batch_size, after=after)
+            else:
+                page = await self.list_tasks(limit=batch_size, after=after)
+            if not page:
+                return
+            after = self.storage.cursor_for(page[-1])
+            for task in page:
+                yield task
+            if len(page) < batch_size:
+                return
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Calls ``callback`` on the running event loop with every batch of change events.
+
+        Must be called from the event loop. Returns a function that unsubscribes.
+        """
+        loop = asyncio.get_running_loop()
+        return self.storage.subscribe(lambda events: loop.call_soon_threadsafe(callback, events))
+
+
+def _settle(future: asyncio.Future, outcome: Tuple[bool, Any]) -> None:
+    if future.done():
+        return  # the caller gave up waiting
+    ok, value = outcome
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
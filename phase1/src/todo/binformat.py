@@ -0,0 +1,388 @@
+"""
+Compact binary snapshot format for ``FileStorage``.
+
+Layout (all integers little-endian)::
+
+    header      magic b"TODOBIN\\0", uint16 format version, uint16 flags,
+                uint32 number of strings, uint32 number of records
+    strings     the dictionary: status, priority and tag values, each as a
+                uint32 byte length followed by UTF-8
+    records     each one a uint32 byte length followed by the record body
+    sorted ids  (with ``FLAG_SORTED_IDS``) the uint64 record offsets again,
+                ordered by task ID
+    id index    (with ``FLAG_ID_INDEX``) one (uint32 CRC-32 of the ID, uint64
+                record offset) entry per record, sorted, followed by the
+                uint64 offset of the first entry
+
+A record body starts with a fixed-size part: the character lengths of the ID,
+title and description (``NONE`` for a missing description), status and
+priority as positions in the dictionary (``NONE`` for no priority), the tag
+count, and the three timestamps as a kind byte each plus an int64 each. Then
+come the tags as uint32 dictionary positions, and finally the ID, title,
+description and any textual timestamps as one UTF-8 string, which is decoded
+in one go and sliced by the stored lengths.
+
+A timestamp of kind ``TS_EPOCH`` holds seconds since the epoch and stands for a
+canonical ``YYYY-MM-DDTHH:MM:SSZ`` value. Anything else is stored verbatim as
+kind ``TS_TEXT`` (the int64 then holds its character length), so every task
+round-trips exactly.
+
+Because every record is length-prefixed, a reader can skip records without
+decoding them, and with the ID index ``Snapshot`` finds a single record by a
+binary search over the mapped file, without reading the others. The sorted ID
+section lets it resolve ID prefixes the same way. Both sections come after the
+records and the ID index keeps its place at the end, so readers that predate
+the sorted IDs still open newer files.
+"""
+from bisect import bisect_left
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.todo.models import Task
+
+MAGIC = b"TODOBIN\0"
+FORMAT_VERSION = 1
+NONE = 0xFFFFFFFF
+TS_NONE, TS_EPOCH, TS_TEXT = 0, 1, 2
+FLAG_ID_INDEX = 1
+FLAG_SORTED_IDS = 2
+
+_HEADER = struct.Struct("<8sHHII")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_INDEX_ENTRY = struct.Struct("<IQ")
+_FIXED = struct.Struct("<IIIIIH3B3q")
+
+
+class FormatError(ValueError):
+    """Raised when a file is not a readable binary task snapshot."""
+
+
+def _encode_timestamp(seconds: Optional[int], value: Optional[str], extra: List[str]) -> Tuple[int, int]:
+    """Returns the (kind, int64) pair for a timestamp, queueing text values on ``extra``."""
+    if seconds is not None:
+        return TS_EPOCH, seconds
+    if value is None:
+        return TS_NONE, 0
+    extra.append(value)
+    return TS_TEXT, len(value)
+
+
+_TAG_STRUCTS: Dict[int, struct.Struct] = {}
+
+
+def _tag_struct(count: int) -> struct.Struct:
+    packer = _TAG_STRUCTS.get(count)
+    if packer is None:
+        packer = _TAG_STRUCTS[count] = struct.Struct(f"<{count}I")
+    return packer
+
+
+def _id_hash(task_id: str) -> int:
+    return zlib.crc32(task_id.encode("utf-8"))
+
+
+def encode(tasks: Iterable[Task], base: Optional['Snapshot'] = None,
+           keep: Iterable[Tuple[str, int]] = ()) -> bytes:
+    """
+    Serializes tasks into a complete binary snapshot.
+
+    ``keep`` lists ``(id, offset)`` pairs of records in the ``base`` snapshot
+    that are copied into the new one verbatim, without decoding them.
+    """
+    strings: Dict[str, int] = dict.fromkeys(base.strings) if base is not None else {}
+    for position, value in enumerate(strings):
+        strings[value] = position
+
+    def ref(value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        position = strings.get(value)
+        if position is None:
+            position = strings[value] = len(strings)
+        return position
+
+    chunks: List[bytes] = []
+    entries: List[Tuple[int, int]] = []
+    by_id: List[Tuple[str, int]] = []
+    size = 0
+    for task_id, offset in keep:
+        record = base.raw_record(offset)
+        entries.append((_id_hash(task_id), size))
+        by_id.append((task_id, size))
+        chunks.append(record)
+        size += len(record)
+    for task in tasks:
+        extra: List[str] = []
+        # The *_ts properties give the epoch form without rendering a string;
+        # only non-canonical timestamps are read back as text.
+        created = task.created_ts
+        created = _encode_timestamp(created, None if created is not None else task.created_at, extra)
+        modified = task.modified_ts
+        modified = _encode_timestamp(modified, None if modified is not None else task.modified_at, extra)
+        due = task.due_ts
+        due = _encode_timestamp(due, None if due is not None else task.due_date, extra)
+        description = task.description
+        text = "".join([task.id, task.title, description or ""] + extra).encode("utf-8")
+        body = b"".join((
+            _FIXED.pack(
+                len(task.id), len(task.title), NONE if description is None else len(description),
+                ref(task.status), ref(task.priority), len(task.tags),
+                created[0], modified[0], due[0], created[1], modified[1], due[1],
+            ),
+            _tag_struct(len(task.tags)).pack(*map(ref, task.tags)),
+            text,
+        ))
+        entries.append((_id_hash(task.id), size))
+        by_id.append((task.id, size))
+        chunks.append(_U32.pack(len(body)))
+        chunks.append(body)
+        size += 4 + len(body)
+
+    table: List[bytes] = []
+    for value in strings:
+        data = value.encode("utf-8")
+        table.append(_U32.pack(len(data)))
+        table.append(data)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_ID_INDEX | FLAG_SORTED_IDS, len(strings), len(entries))
+    start = len(header) + sum(map(len, table))
+    by_id.sort()
+    sorted_ids = b"".join(_U64.pack(start + offset) for _, offset in by_id)
+    entries.sort()
+    index = b"".join(_INDEX_ENTRY.pack(crc, start + offset) for crc, offset in entries)
+    index_at = start + size + len(sorted_ids)
+    return b"".join([header] + table + chunks + [sorted_ids, index, _U64.pack(index_at)])
+
+
+def dump(tasks: Iterable[Task], f: BinaryIO) -> None:
+    """Writes a binary snapshot of ``tasks`` to an open binary file."""
+    f.write(encode(tasks))
+
+
+def read_header(data: bytes) -> Tuple[List[str], int, int]:
+    """
+    Checks the header of a snapshot and decodes its string dictionary.
+
+    Returns the dictionary, the number of records and the offset of the first.
+    """
+    if len(data) < _HEADER.size:
+        raise FormatError("File is too short to be a binary task snapshot")
+    magic, version, _, string_count, record_count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise FormatError("Not a binary task snapshot")
+    if version != FORMAT_VERSION:
+        raise FormatError(f"Unsupported binary snapshot version {version} (expected {FORMAT_VERSION})")
+    pos = _HEADER.size
+    strings = []
+    try:
+        for _ in range(string_count):
+            length = _U32.unpack_from(data, pos)[0]
+            pos += 4
+            strings.append(bytes(data[pos:pos + length]).decode("utf-8"))
+            pos += length
+    except (struct.error, UnicodeDecodeError):
+        raise FormatError("Corrupt dictionary in binary snapshot")
+    if pos > len(data):
+        raise FormatError("Truncated dictionary in binary snapshot")
+    return strings, record_count, pos
+
+
+def decode_record(data: bytes, pos: int, end: int, strings: List[str]) -> Task:
+    """Decodes the record body stored in ``data[pos:end]``."""
+    (id_len, title_len, description_len, status, priority, tag_count,
+     created_kind, modified_kind, due_kind, created, modified, due) = _FIXED.unpack_from(data, pos)
+    pos += _FIXED.size
+    if tag_count:
+        tags = [strings[i] for i in _tag_struct(tag_count).unpack_from(data, pos)]
+        pos += 4 * tag_count
+    else:
+        tags = []
+    text = bytes(data[pos:end]).decode("utf-8")
+    cut = id_len + title_len
+    if description_len == NONE:
+        description = None
+    else:
+        description = text[cut:cut + description_len]
+        cut += description_len
+
+    stamps = []
+    for kind, value in ((created_kind, created), (modified_kind, modified), (due_kind, due)):
+        if kind == TS_EPOCH:
+            stamps.append(value)
+        elif kind == TS_NONE:
+            stamps.append(None)
+        elif kind == TS_TEXT:
+            stamps.append(text[cut:cut + value])
+            cut += value
+        else:
+            raise FormatError(f"Unknown timestamp kind {kind} in binary snapshot")
+
+    return Task(
+        id=text[:id_len],
+        title=text[id_len:id_len + title_len],
+        description=description,
+        status=strings[status],
+        priority=None if priority == NONE else strings[priority],
+        tags=tags,
+        created_at=stamps[0],
+        modified_at=stamps[1],
+        due_date=stamps[2],
+    )
+
+
+def decode(data: bytes) -> Dict[str, Task]:
+    """Parses a complete binary snapshot into a dictionary of tasks keyed by ID."""
+    strings, record_count, pos = read_header(data)
+    tasks: Dict[str, Task] = {}
+    size = len(data)
+    try:
+        for _ in range(record_count):
+            end = pos + 4 + _U32.unpack_from(data, pos)[0]
+            if end > size:
+                raise FormatError("Truncated record in binary snapshot")
+            task = decode_record(data, pos + 4, end, strings)
+            tasks[task.id] = task
+            pos = end
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise FormatError(f"Corrupt record in binary snapshot: {e}")
+    return tasks
+
+
+class _SortedIds(Sequence):
+    """The IDs of a snapshot in sorted order, decoded one at a time from the sorted ID section."""
+    def __init__(self, snapshot: 'Snapshot', at: int):
+        self._snapshot = snapshot
+        self._at = at
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < self._snapshot.count:
+            raise IndexError(position)
+        return self._snapshot.record_id(_U64.unpack_from(self._snapshot.data, self._at + position * _U64.size)[0])
+
+
+class Snapshot:
+    """
+    Random access to the records of an encoded snapshot.
+
+    ``data`` may be ``bytes`` or an ``mmap``: only the header and dictionary are
+    read up front, single records are located through the ID index and ID
+    prefixes through the sorted ID section. Snapshots written without these
+    sections fall back to one scan of the record IDs.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.strings, self.count, self._start = read_header(data)
+        flags = _HEADER.unpack_from(data)[2]
+        self._index_at: Optional[int] = None
+        self._offsets: Optional[Dict[str, int]] = None
+        self._sorted_ids: Optional[Sequence[str]] = None
+        if flags & FLAG_ID_INDEX:
+            self._index_at = _U64.unpack_from(data, len(data) - _U64.size)[0]
+            if self._index_at + self.count * _INDEX_ENTRY.size + _U64.size != len(data):
+                raise FormatError("Corrupt ID index in binary snapshot")
+            if flags & FLAG_SORTED_IDS:
+                sorted_at = self._index_at - self.count * _U64.size
+                if sorted_at < self._start:
+                    raise FormatError("Corrupt sorted ID section in binary snapshot")
+                self._sorted_ids = _SortedIds(self, sorted_at)
+
+    def record_id(self, offset: int) -> str:
+        """Decodes just the ID of the record at ``offset``."""
+        data = self.data
+        id_len, _, _, _, _, tag_count = _FIXED.unpack_from(data, offset + 4)[:6]
+        start = offset + 4 + _FIXED.size + 4 * tag_count
+        # An ID of n characters takes at most 4n bytes; decode a prefix and cut.
+        end = min(start + 4 * id_len, offset + 4 + _U32.unpack_from(data, offset)[0])
+        return bytes(data[start:end]).decode("utf-8", "ignore")[:id_len]
+
+    def scan(self) -> Iterator[Tuple[str, int]]:
+        """Yields the ``(id, offset)`` of every record in file order."""
+        pos = self._start
+        for _ in range(self.count):
+            yield self.record_id(pos), pos
+            pos += 4 + _U32.unpack_from(self.data, pos)[0]
+
+    def find(self, task_id: str) -> Optional[int]:
+        """Returns the offset of the record for ``task_id``, or None."""
+        if self._index_at is None:
+            if self._offsets is None:
+                self._offsets = dict(self.scan())
+            return self._offsets.get(task_id)
+        crc = _id_hash(task_id)
+        data, base, entry = self.data, self._index_at, _INDEX_ENTRY
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entry.unpack_from(data, base + mid * entry.size)[0] < crc:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count:
+            found, offset = entry.unpack_from(data, base + lo * entry.size)
+            if found != crc:
+                break
+            if self.record_id(offset) == task_id:
+                return offset
+            lo += 1
+        return None
+
+    @property
+    def sorted_ids(self) -> Sequence[str]:
+        """Every record ID in sorted order, for binary searches with ``bisect``."""
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(task_id for task_id, _ in self.scan())
+        return self._sorted_ids
+
+    def ids_with_prefix(self, prefix: str) -> Iterator[str]:
+        """Yields the record IDs starting with ``prefix``, in sorted order."""
+        ids = self.sorted_ids
+        for position in range(bisect_left(ids, prefix), len(ids)):
+            task_id = ids[position]
+            if not task_id.startswith(prefix):
+                return
+            yield task_id
+
+    def task_at(self, offset: int) -> Task:
+        """Decodes the record at ``offset``."""
+        try:
+            end = offset + 4 + _U32.unpack_from(self.data, offset)[0]
+            return decode_record(self.data, offset + 4, end, self.strings)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise FormatError(f"Corrupt record in binary snapshot: {e}")
+
+    def raw_record(self, offset: int) -> bytes:
+        """Returns the encoded record at ``offset``, length prefix included."""
+        return bytes(self.data[offset:offset + 4 + _U32.unpack_from(self.data, offset)[0]])
+
+    def close(self) -> None:
+        """Releases the underlying buffer if it is an ``mmap``."""
+        close = getattr(self.data, "close", None)
+        if close is not None:
+            close()
+
+
+def load(f: BinaryIO) -> Dict[str, Task]:
+    """Reads a binary snapshot from an open binary file."""
+    return decode(f.read())
+
+
+def json_to_binary(source: Path, target: Path) -> int:
+    """Converts a ``tasks.json`` snapshot into the binary format. Returns the task count."""
+    with open(source, "r", encoding="utf-8") as f:
+        tasks = [Task(**data) for data in json.load(f).values()]
+    Path(target).write_bytes(encode(tasks))
+    return len(tasks)
+
+
+def binary_to_json(source: Path, target: Path) -> int:
+    """Converts a binary snapshot back into the JSON layout. Returns the task count."""
+    tasks = decode(Path(source).read_bytes())
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump({task_id: task.to_dict() for task_id, task in tasks.items()}, f, indent=4)
+    return len(tasks)
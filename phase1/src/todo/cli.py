@@ -1,14 +1,17 @@
 import argparse
+from contextlib import nullcontext
 import json
 import sys
+import textwrap
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich import print as rprint
 
-from src.todo.models import Task
-from src.todo.storage import FileStorage, InMemoryStorage
-from src.todo.utils import parse_tags, validate_priority, validate_uuid, now_iso
+from src.todo.client import connect
+from src.todo.models import ID_SCHEMES, Task, set_id_scheme
+from src.todo.transfer import TRANSFER_FORMATS, detect_format, read_tasks, write_tasks
+from src.todo.utils import now_epoch, now_iso, parse_date, parse_duration, parse_tags, validate_id_prefix, validate_priority
 
 """
 Command Line Interface (CLI) for the Todo Application.
@@ -21,23 +24,52 @@ terminal user interface.
 # Initialize Rich console
 console = Console()
 
-# Global storage (defaults to FileStorage for backwards compatibility)
-storage = FileStorage()
+# Commands that work on the store files themselves, never through a daemon:
+# import writes in large batches best done in-process, convert rewrites the files.
+DIRECT_COMMANDS = ('import', 'convert')
 
-def get_storage(storage_type='file'):
+# The storage backend the commands use. main() sets it once, after parsing
+# the arguments, to a daemon client or the backend chosen with --storage;
+# opening it at import time as well would load the task file twice.
+# The storage modules themselves are imported only where a command opens a
+# store directly, so commands a daemon serves start without them.
+storage = None
+
+def _get_storage():
+    """
+    Returns the storage backend of the commands.
+
+    Handlers called without main() (from tests or other code) open the
+    default file store on first use.
+    """
+    global storage
+    if storage is None:
+        storage = get_storage()
+    return storage
+
+def get_storage(storage_type='file', history=False):
     """
     Factory function to initialize the storage backend.
     
     Args:
-        storage_type (str): 'memory' for ephemeral storage, 'file' for persistent JSON storage.
+        storage_type (str): 'memory' for ephemeral storage, 'file' for persistent JSON storage,
+            'sqlite' for the indexed SQLite database.
+        history (bool): Record the event history behind undo, redo and list --at. A file
+            store that has been opened with history once keeps recording (see ``history_enabled``).
         
     Returns:
         StorageProtocol: An instance of the requested storage backend.
     """
+    from src.todo.storage import FileStorage, InMemoryStorage, SQLiteStorage, history_enabled
+
     if storage_type == 'memory':
-        return InMemoryStorage()
+        return InMemoryStorage(history=history)
+    elif storage_type == 'sqlite':
+        return SQLiteStorage()
     else:
-        return FileStorage()
+        # Binary stores are memory-mapped so single-task commands start instantly,
+        # and the journal keeps each mutation from rewriting the whole snapshot.
+        return FileStorage(journal=True, lazy=True, history=history or history_enabled())
 
 def format_task_rich(task: Task) -> Panel:
     """
@@ -74,23 +106,25 @@ def format_tasks_table(tasks: list[Task]) -> Table:
     - Priority (Color-coded)
     - Tags
     - Due Date
-    - Short ID
+    - Short ID (the shortest unique prefix, at least 8 characters)
     """
+    storage = _get_storage()
     table = Table(title="📋 Tasks", show_header=True, header_style="bold cyan")
     table.add_column("✓", style="green", width=3)
     table.add_column("Title", style="white")
     table.add_column("Priority", justify="center", width=10)
     table.add_column("Tags", style="dim")
     table.add_column("Due Date", style="yellow", width=12)
-    table.add_column("ID", style="dim", width=8)
+    table.add_column("ID", style="dim", min_width=8, no_wrap=True)
     
-    for task in tasks:
+    # One call for the whole table, which matters when the store is a daemon.
+    short_ids = storage.short_ids([task.id for task in tasks])
+    for task, short_id in zip(tasks, short_ids):
         emoji = task.get_status_emoji()
         priority_color = task.get_priority_color()
         priority_text = f"[{priority_color}]{task.priority}[/{priority_color}]"
         tags_text = ', '.join(task.tags[:2]) if task.tags else ""
         due_text = task.due_date[:10] if task.due_date else ""
-        short_id = task.id[:8]
         
         # Strikethrough for completed tasks
         title = f"[dim]{task.title}[/dim]" if task.status == "completed" else task.title
@@ -106,6 +140,7 @@ def add_task(args):
     Creates a new task with the provided arguments and saves it to storage.
     Prints a success message with the new Task ID.
     """
+    storage = _get_storage()
     try:
         if args.priority:
             validate_priority(args.priority)
@@ -137,40 +172,121 @@ def add_task(args):
         else:
             print(f"An unexpected error occurred: {e}", file=sys.stderr)
 
+def print_json_stream(dicts) -> None:
+    """
+    Prints an iterable of dicts as a JSON array, one element at a time.
+
+    The output is identical to ``json.dumps(list(dicts), indent=2)`` without
+    ever holding the whole list or its serialized form in memory.
+    """
+    first = True
+    for item in dicts:
+        sys.stdout.write("[\n" if first else ",\n")
+        sys.stdout.write(textwrap.indent(json.dumps(item, indent=2), "  "))
+        first = False
+    sys.stdout.write("[]\n" if first else "\n]\n")
+
 def list_tasks_command(args):
     """
     Handler for the 'list' command.
     
-    Retrieves all tasks and applies optional filters (key=value) and sorting.
+    Retrieves tasks and applies an optional filter expression and sorting.
     Outputs the result in the requested format (Rich Table, JSON, or Plain Text).
-    """
-    tasks = storage.list_tasks()
 
-    # Filtering
+    --filter takes an expression such as
+    'status=pending and (priority=high or tag:urgent) and due<2026-11-01'
+    (see src.todo.query). It is parsed once; storage plans it against its
+    indexes when listing, and the other listings are filtered with it.
+
+    Without --sort, tasks are streamed from storage in pages, so plain and JSON
+    output start before the whole listing is read. --limit and --after page
+    through the default order; the cursor for the next page is printed last.
+
+    --overdue and --due-within list pending tasks by due date instead, read
+    from the due-date index; given together they list everything due before
+    the end of the window.
+
+    --at lists the tasks as they were at a past date, rebuilt from the event
+    history.
+    """
+    storage = _get_storage()
+    task_filter = None
     if args.filter:
-        filter_key, filter_value = args.filter.split('=', 1)
-        tasks = [task for task in tasks if getattr(task, filter_key, None) == filter_value]
+        from src.todo.query import compile_filter
+        try:
+            task_filter = compile_filter(args.filter)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return
 
-    # Sorting
-    if args.sort:
+    if args.at:
+        if args.after or args.overdue or args.due_within:
+            print("Error: --at cannot be combined with --after, --overdue or --due-within.", file=sys.stderr)
+            return
+        at = parse_date(args.at)
+        try:
+            if at is None:
+                raise ValueError(f"Invalid date: {args.at}. Use ISO 8601 (e.g. 2025-12-31 or 2025-12-31T09:00:00Z).")
+            tasks = storage.state_at(at)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return
+        if task_filter:
+            tasks = [task for task in tasks if task_filter(task)]
+        if args.sort:
+            tasks.sort(key=lambda task: getattr(task, args.sort, ''))
+    elif args.overdue or args.due_within:
+        if args.after:
+            print("Error: --after cannot be combined with --overdue or --due-within.", file=sys.stderr)
+            return
+        try:
+            within = parse_duration(args.due_within) if args.due_within else 0
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return
+        now = now_epoch()
+        tasks = storage.due_between(None if args.overdue else now, now + within)
+        if task_filter:
+            tasks = [task for task in tasks if task_filter(task)]
+        if args.sort:
+            tasks.sort(key=lambda task: getattr(task, args.sort, ''))
+    elif args.sort:
+        if args.after:
+            print("Error: --after cannot be combined with --sort.", file=sys.stderr)
+            return
+        tasks = storage.filter_tasks(task_filter) if task_filter else storage.list_tasks()
         tasks.sort(key=lambda task: getattr(task, args.sort, ''))
+    else:
+        tasks = storage.iter_tasks(after=args.after, where=task_filter)
+
+    page = {'last': None, 'more': False}
 
+    def window(tasks):
+        for count, task in enumerate(tasks):
+            if args.limit and count == args.limit:
+                page['more'] = True
+                return
+            page['last'] = task
+            yield task
+
+    tasks = window(tasks)
     if args.format == 'json':
         # JSON output
-        tasks_dicts = [task.to_dict() for task in tasks]
-        print(json.dumps(tasks_dicts, indent=2))
+        print_json_stream(task.to_dict() for task in tasks)
+        if page['more']:
+            print(f"Next cursor: {storage.cursor_for(page['last'])}", file=sys.stderr)
     elif args.format == 'rich':
         # Rich table output
+        tasks = list(tasks)
         if not tasks:
             console.print("[yellow]No tasks found.[/yellow]")
             return
         table = format_tasks_table(tasks)
         console.print(table)
+        if page['more']:
+            console.print(f"[dim]Next cursor: {storage.cursor_for(page['last'])}[/dim]")
     else:
         # Plain text output
-        if not tasks:
-            print("No tasks found.")
-            return
         for task in tasks:
             print(f"ID: {task.id}")
             print(f"  Title: {task.title}")
@@ -182,16 +298,22 @@ def list_tasks_command(args):
             print(f"  Modified At: {task.modified_at or 'N/A'}")
             print(f"  Due Date: {task.due_date or 'N/A'}")
             print("-" * 20)
+        if page['last'] is None:
+            print("No tasks found.")
+        elif page['more']:
+            print(f"Next cursor: {storage.cursor_for(page['last'])}")
 
 def update_task_command(args):
     """
     Handler for the 'update' command.
     
     Updates specific fields of an existing task. Validates inputs like Priority and UUID.
-    only fields provided by the user are modified.
+    only fields provided by the user are modified. The ID may be any unique prefix.
     """
+    storage = _get_storage()
     try:
-        validate_uuid(args.id)
+        validate_id_prefix(args.id)
+        task_id = storage.resolve_id(args.id)
         update_fields = {}
         if args.title:
             update_fields['title'] = args.title
@@ -207,7 +329,7 @@ def update_task_command(args):
         if args.due is not None:
             update_fields['due_date'] = args.due
         
-        updated_task = storage.update_task(args.id, **update_fields)
+        updated_task = storage.update_task(task_id, **update_fields)
         
         if args.format == 'rich':
             console.print(f"[bold green]✓ Task updated successfully![/bold green]")
@@ -225,14 +347,16 @@ def update_task_command(args):
             print(f"An unexpected error occurred: {e}", file=sys.stderr)
 
 def delete_task_command(args):
+    storage = _get_storage()
     try:
-        validate_uuid(args.id)
-        storage.delete_task(args.id)
+        validate_id_prefix(args.id)
+        task_id = storage.resolve_id(args.id)
+        storage.delete_task(task_id)
         
         if args.format == 'rich':
             console.print(f"[bold green]✓ Task deleted successfully![/bold green]")
         else:
-            print(f"Task '{args.id}' deleted.")
+            print(f"Task '{task_id}' deleted.")
     except (ValueError, KeyError) as e:
         if args.format == 'rich':
             console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
@@ -245,9 +369,10 @@ def delete_task_command(args):
             print(f"An unexpected error occurred: {e}", file=sys.stderr)
 
 def complete_task_command(args):
+    storage = _get_storage()
     try:
-        validate_uuid(args.id)
-        updated_task = storage.update_task(args.id, status='completed')
+        validate_id_prefix(args.id)
+        updated_task = storage.update_task(storage.resolve_id(args.id), status='completed')
         
         if args.format == 'rich':
             console.print(f"[bold green]✓ Task marked as completed![/bold green]")
@@ -265,6 +390,250 @@ def complete_task_command(args):
         else:
             print(f"An unexpected error occurred: {e}", file=sys.stderr)
 
+def bulk_complete_command(args):
+    """
+    Handler for the 'bulk-complete' command.
+
+    Marks every given task as completed in a single batch that is persisted
+    once. IDs may be unique prefixes. If any ID is invalid, unknown or
+    ambiguous, no task is changed.
+    """
+    storage = _get_storage()
+    try:
+        for task_id in args.ids:
+            validate_id_prefix(task_id)
+        task_ids = [storage.resolve_id(task_id) for task_id in args.ids]
+        updated = storage.update_tasks({task_id: {'status': 'completed'} for task_id in task_ids})
+
+        if args.format == 'rich':
+            console.print(f"[bold green]✓ {len(updated)} task(s) marked as completed![/bold green]")
+        else:
+            print(f"{len(updated)} task(s) marked as completed.")
+    except (ValueError, KeyError) as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
+        else:
+            print(f"Error completing tasks: {e}", file=sys.stderr)
+    except Exception as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Unexpected error:[/bold red] {e}", style="red")
+        else:
+            print(f"An unexpected error occurred: {e}", file=sys.stderr)
+
+def bulk_delete_command(args):
+    """
+    Handler for the 'bulk-delete' command.
+
+    Deletes every given task in a single batch that is persisted once. IDs may
+    be unique prefixes. If any ID is invalid, unknown or ambiguous, no task is
+    deleted.
+    """
+    storage = _get_storage()
+    try:
+        for task_id in args.ids:
+            validate_id_prefix(task_id)
+        deleted = storage.delete_tasks([storage.resolve_id(task_id) for task_id in args.ids])
+
+        if args.format == 'rich':
+            console.print(f"[bold green]✓ {deleted} task(s) deleted![/bold green]")
+        else:
+            print(f"{deleted} task(s) deleted.")
+    except (ValueError, KeyError) as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
+        else:
+            print(f"Error deleting tasks: {e}", file=sys.stderr)
+    except Exception as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Unexpected error:[/bold red] {e}", style="red")
+        else:
+            print(f"An unexpected error occurred: {e}", file=sys.stderr)
+
+def stats_command(args):
+    """
+    Handler for the 'stats' command.
+
+    Prints counts by status, priority and tag, overdue pending tasks grouped
+    by how many weeks late they are, and tasks created in each recent week.
+    """
+    storage = _get_storage()
+    stats = storage.statistics(weeks=args.weeks)
+    if args.format == 'json':
+        print(json.dumps(stats, indent=2))
+        return
+
+    rows = [("Total", stats["total"])]
+    rows += [(f"Status: {name}", count) for name, count in stats["by_status"].items()]
+    rows += [(f"Priority: {name or 'none'}", f"{stats['pending_by_priority'].get(name, 0)} pending / {count}")
+             for name, count in stats["by_priority"].items()]
+    rows += [(f"Tag: {tag}", f"{counts['pending']} pending / {counts['total']}")
+             for tag, counts in stats["by_tag"].items()]
+    rows.append(("Overdue", stats["overdue"]))
+    rows += [(f"Overdue {week}-{week + 1} weeks", count) for week, count in stats["overdue_by_week"].items()]
+    rows += [(f"Created {week}-{week + 1} weeks ago", count) for week, count in enumerate(stats["created_by_week"])]
+
+    if args.format == 'rich':
+        table = Table(title="Task Statistics", show_header=True, header_style="bold magenta")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", justify="right")
+        for label, value in rows:
+            table.add_row(label, str(value))
+        console.print(table)
+    else:
+        for label, value in rows:
+            print(f"{label}: {value}")
+
+def history_command(args):
+    """
+    Handler for the 'undo' and 'redo' commands.
+
+    Reverts the most recent change (a bulk command counts as one change), or
+    re-applies the most recently undone one.
+    """
+    storage = _get_storage()
+    try:
+        count = storage.undo() if args.command == 'undo' else storage.redo()
+    except (ValueError, KeyError) as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
+        else:
+            print(f"Error running {args.command}: {e}", file=sys.stderr)
+        return
+    if not count:
+        message = f"Nothing to {args.command}."
+    else:
+        message = f"{'Undid' if args.command == 'undo' else 'Redid'} {count} change(s)."
+    if args.format == 'rich':
+        console.print(f"[bold green]✓ {message}[/bold green]" if count else f"[yellow]{message}[/yellow]")
+    else:
+        print(message)
+
+def convert_command(args):
+    """
+    Handler for the 'convert' command.
+
+    Rewrites the persistent file store in the JSON or the compact binary
+    snapshot format. Later runs detect the format on their own.
+    """
+    from src.todo.storage import convert_store
+
+    try:
+        count = convert_store(args.to, getattr(args, 'storage_dir', None))
+        if args.format == 'rich':
+            console.print(f"[bold green]✓ Converted {count} task(s) to the {args.to} format![/bold green]")
+        else:
+            print(f"Converted {count} task(s) to the {args.to} format.")
+    except (ValueError, OSError) as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
+        else:
+            print(f"Error converting tasks: {e}", file=sys.stderr)
+
+def export_command(args):
+    """
+    Handler for the 'export' command.
+
+    Streams tasks from storage to a file (or stdout) as NDJSON or CSV, one line
+    per task, so exporting a store of any size needs memory for one task at a
+    time. --filter takes the same expressions as 'list --filter'.
+    """
+    storage = _get_storage()
+    try:
+        task_filter = None
+        if args.filter:
+            from src.todo.query import compile_filter
+            task_filter = compile_filter(args.filter)
+        fmt = args.type or (detect_format(args.output) if args.output else 'ndjson')
+        tasks = storage.iter_tasks(where=task_filter)
+        if not args.output or args.output == '-':
+            write_tasks(tasks, sys.stdout, fmt)
+            return
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            count = write_tasks(tasks, f, fmt)
+    except (ValueError, OSError) as e:
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {e}", style="red")
+        else:
+            print(f"Error exporting tasks: {e}", file=sys.stderr)
+        return
+    if args.format == 'rich':
+        console.print(f"[bold green]✓ Exported {count} task(s) to {args.output}![/bold green]")
+    else:
+        print(f"Exported {count} task(s) to {args.output}.")
+
+def import_command(args):
+    """
+    Handler for the 'import' command.
+
+    Reads NDJSON or CSV (as written by 'export') from a file or stdin one row
+    at a time. Each row is validated; invalid rows and rows whose ID is already
+    taken are reported with their line number and skipped. Valid tasks are
+    written --batch-size at a time, with progress reported on stderr.
+
+    SQLite commits each batch on its own. The memory and file stores hold
+    every task in memory anyway, so the import runs as one batch there: the
+    task file is written once at the end rather than once per batch, and a
+    failed import leaves the store unchanged.
+    """
+    storage = _get_storage()
+    def report_error(message):
+        if args.format == 'rich':
+            console.print(f"[bold red]✗ Error:[/bold red] {message}", style="red")
+        else:
+            print(f"Error importing tasks: {message}", file=sys.stderr)
+
+    if args.batch_size < 1:
+        report_error("--batch-size must be at least 1.")
+        return
+    fmt = args.type or ('ndjson' if args.file == '-' else detect_format(args.file))
+    imported = skipped = 0
+    seen = set()
+    batch = []
+
+    def exists(task_id):
+        try:
+            storage.get_task(task_id)
+        except KeyError:
+            return False
+        return True
+
+    def write_batch():
+        nonlocal imported
+        storage.add_tasks(batch)
+        imported += len(batch)
+        batch.clear()
+        print(f"... {imported} task(s) imported", file=sys.stderr)
+
+    source = nullcontext(sys.stdin) if args.file == '-' else open(args.file, encoding='utf-8', newline='')
+    from src.todo.storage import InMemoryStorage
+
+    scope = storage.batch() if isinstance(storage, InMemoryStorage) else nullcontext()
+    try:
+        with source as lines, scope:
+            for line, task in read_tasks(lines, fmt):
+                if isinstance(task, ValueError):
+                    problem = task
+                elif task.id in seen or exists(task.id):
+                    problem = f"Task with ID {task.id} already exists."
+                else:
+                    seen.add(task.id)
+                    batch.append(task)
+                    if len(batch) >= args.batch_size:
+                        write_batch()
+                    continue
+                skipped += 1
+                print(f"Skipped line {line}: {problem}", file=sys.stderr)
+            if batch:
+                write_batch()
+    except (ValueError, OSError) as e:
+        report_error(e)
+        return
+    message = f"Imported {imported} task(s), skipped {skipped} invalid row(s)"
+    if args.format == 'rich':
+        console.print(f"[bold green]✓ {message}![/bold green]")
+    else:
+        print(f"{message}.")
+
 def main():
     parser = argparse.ArgumentParser(
         description="A simple console todo app with rich formatting.",
@@ -275,9 +644,9 @@ def main():
     parser.add_argument(
         '--storage',
         type=str,
-        choices=['memory', 'file'],
+        choices=['memory', 'file', 'sqlite'],
         default='file',
-        help='Storage backend: memory (in-memory, not persisted) or file (JSON file, persisted)'
+        help='Storage backend: memory (in-memory, not persisted), file (JSON file, persisted) or sqlite (indexed database, persisted)'
     )
     parser.add_argument(
         '--format',
@@ -286,6 +655,23 @@ def main():
         default='rich',
         help='Output format: plain, rich (with colors and tables), or json'
     )
+    parser.add_argument(
+        '--history',
+        action='store_true',
+        help='Record the change history behind undo, redo and list --at; a file store keeps recording once enabled'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Open the store directly even if a task daemon (python -m src.todo.daemon) is running'
+    )
+    parser.add_argument(
+        '--id-scheme',
+        type=str,
+        choices=list(ID_SCHEMES),
+        default='uuid4',
+        help='IDs for new tasks: uuid4 (random) or uuid7 (time-ordered, sorts in creation order)'
+    )
     
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
@@ -300,13 +686,18 @@ def main():
 
     # List command
     list_parser = subparsers.add_parser("list", help="List all todo tasks")
-    list_parser.add_argument("--filter", type=str, help="Filter tasks by key=value (e.g., status=pending)", default=None)
+    list_parser.add_argument("--filter", type=str, help="Filter expression (e.g., 'status=pending and (priority=high or tag:urgent) and due<2026-11-01')", default=None)
     list_parser.add_argument("--sort", type=str, help="Sort tasks by a field (e.g., created_at, due_date)", default=None)
+    list_parser.add_argument("--limit", type=int, help="Show at most this many tasks", default=None)
+    list_parser.add_argument("--after", type=str, help="Continue after the cursor printed by a previous --limit listing", default=None)
+    list_parser.add_argument("--overdue", action="store_true", help="Only pending tasks whose due date has passed")
+    list_parser.add_argument("--due-within", type=str, help="Only pending tasks due within a duration from now (e.g. 12h, 3d, 2w)", default=None)
+    list_parser.add_argument("--at", type=str, help="List the tasks as they were at a past date (ISO 8601)", default=None)
     list_parser.set_defaults(func=list_tasks_command)
 
     # Update command
     update_parser = subparsers.add_parser("update", help="Update an existing todo task")
-    update_parser.add_argument("id", type=str, help="ID of the task to update")
+    update_parser.add_argument("id", type=str, help="ID (or unique ID prefix) of the task to update")
     update_parser.add_argument("--title", type=str, help="New title of the task", default=None)
     update_parser.add_argument("--description", type=str, help="New description of the task", default=None)
     update_parser.add_argument("--status", type=str, choices=['pending', 'completed'], help="New status of the task", default=None)
@@ -317,20 +708,65 @@ def main():
 
     # Delete command
     delete_parser = subparsers.add_parser("delete", help="Delete a todo task")
-    delete_parser.add_argument("id", type=str, help="ID of the task to delete")
+    delete_parser.add_argument("id", type=str, help="ID (or unique ID prefix) of the task to delete")
     delete_parser.set_defaults(func=delete_task_command)
 
     # Complete command
     complete_parser = subparsers.add_parser("complete", help="Mark a todo task as completed")
-    complete_parser.add_argument("id", type=str, help="ID of the task to mark as completed")
+    complete_parser.add_argument("id", type=str, help="ID (or unique ID prefix) of the task to mark as completed")
     complete_parser.set_defaults(func=complete_task_command)
 
+    # Bulk commands
+    bulk_complete_parser = subparsers.add_parser("bulk-complete", help="Mark several tasks as completed at once")
+    bulk_complete_parser.add_argument("ids", nargs="+", help="IDs (or unique ID prefixes) of the tasks to mark as completed")
+    bulk_complete_parser.set_defaults(func=bulk_complete_command)
+
+    bulk_delete_parser = subparsers.add_parser("bulk-delete", help="Delete several tasks at once")
+    bulk_delete_parser.add_argument("ids", nargs="+", help="IDs (or unique ID prefixes) of the tasks to delete")
+    bulk_delete_parser.set_defaults(func=bulk_delete_command)
+
+    # Convert command
+    convert_parser = subparsers.add_parser("convert", help="Convert the task file to another on-disk format")
+    convert_parser.add_argument("to", choices=['json', 'binary'], help="Target format: json (readable) or binary (compact, fast to load)")
+    convert_parser.set_defaults(func=convert_command)
+
+    # Export and import commands
+    export_parser = subparsers.add_parser("export", help="Stream tasks to an NDJSON or CSV file")
+    export_parser.add_argument("--output", "-o", type=str, help="File to write (default: stdout)", default=None)
+    export_parser.add_argument("--type", type=str, choices=TRANSFER_FORMATS, help="File format (default: csv for .csv files, else ndjson)", default=None)
+    export_parser.add_argument("--filter", type=str, help="Only export tasks matching a filter expression (see 'list --filter')", default=None)
+    export_parser.set_defaults(func=export_command)
+
+    import_parser = subparsers.add_parser("import", help="Add tasks from an NDJSON or CSV file")
+    import_parser.add_argument("file", type=str, help="File to read, or - for stdin")
+    import_parser.add_argument("--type", type=str, choices=TRANSFER_FORMATS, help="File format (default: csv for .csv files, else ndjson)", default=None)
+    import_parser.add_argument("--batch-size", type=int, help="Tasks written per batch", default=1000)
+    import_parser.set_defaults(func=import_command)
+
+    # Stats command
+    stats_parser = subparsers.add_parser("stats", help="Show task statistics")
+    stats_parser.add_argument("--weeks", type=int, default=8, help="Number of recent weeks in the creation histogram")
+    stats_parser.set_defaults(func=stats_command)
+
+    # Undo and redo commands
+    undo_parser = subparsers.add_parser("undo", help="Revert the most recent change")
+    undo_parser.set_defaults(func=history_command)
+    redo_parser = subparsers.add_parser("redo", help="Re-apply the most recently undone change")
+    redo_parser.set_defaults(func=history_command)
+
     args = parser.parse_args()
+    set_id_scheme(args.id_scheme)
 
-    # Override storage if user explicitly specifies it
-    if args.storage:
-        global storage
-        storage = get_storage(args.storage)
+    # Use a running daemon's warm store if it serves the requested backend,
+    # otherwise open the store here. Either way it is opened exactly once.
+    global storage
+    client = None if args.no_daemon or args.command in DIRECT_COMMANDS else connect(args.storage)
+    if client is not None and args.history and not client.ping().get("history"):
+        # The daemon's store was opened with its own settings; do not silently drop the flag.
+        client.close()
+        parser.error("--history has no effect on the running task daemon, which was started without it; "
+                     "restart it with --history or pass --no-daemon")
+    storage = client or get_storage(args.storage, history=args.history)
 
     if args.command:
         args.func(args)
@@ -0,0 +1,253 @@
+"""
+Client of the task-store daemon (see ``src.todo.daemon``).
+
+``StoreClient`` has the storage methods the CLI uses and forwards them to a
+running daemon over its Unix socket; ``connect`` finds the daemon. This
+module only needs the task model and the standard library, not the storage
+backends or asyncio, so a CLI command served by the daemon starts without
+loading them.
+"""
+import itertools
+import json
+from pathlib import Path
+import socket
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from src.todo.cursors import encode_cursor, order_key
+from src.todo.models import Task
+
+if TYPE_CHECKING:
+    from src.todo.query import TaskFilter
+
+# Exceptions raised again by the client with the same type.
+ERRORS = {'KeyError': KeyError, 'ValueError': ValueError, 'AmbiguousIDError': ValueError, 'TypeError': TypeError}
+
+class DaemonError(RuntimeError):
+    """Raised by the client for a failure the daemon reports that is not a storage error."""
+
+
+def default_socket_path() -> Path:
+    """The daemon's socket next to the task files: ~/.todo_cli/daemon.sock."""
+    return Path.home() / ".todo_cli" / "daemon.sock"
+
+
+def to_wire(value: Any) -> Any:
+    """Converts a storage result or argument to JSON-compatible values."""
+    if isinstance(value, Task):
+        return {"task": value.to_dict()}
+    if isinstance(value, dict):
+        if all(type(key) is str for key in value):
+            return {"map": {key: to_wire(item) for key, item in value.items()}}
+        return {"pairs": [[key, to_wire(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [to_wire(item) for item in value]
+    return value
+
+
+def from_wire(value: Any) -> Any:
+    """Reverses ``to_wire``."""
+    if isinstance(value, list):
+        return [from_wire(item) for item in value]
+    if isinstance(value, dict):
+        if "task" in value:
+            return Task(**value["task"])
+        if "pairs" in value:
+            return {key: from_wire(item) for key, item in value["pairs"]}
+        return {key: from_wire(item) for key, item in value["map"].items()}
+    return value
+
+
+class StoreClient:
+    """
+    Storage backend that forwards every call to a ``StoreDaemon``.
+
+    One connection is opened and reused for every call the client makes, so a
+    command that issues several calls pays for a single connect.
+
+    Args:
+        socket_path: The daemon's socket. Defaults to ``default_socket_path()``.
+        timeout: Seconds to wait for the connection and for each answer.
+
+    Raises:
+        OSError: If no daemon accepts the connection.
+    """
+    def __init__(self, socket_path: Optional[Path] = None, timeout: Optional[float] = None):
+        self.socket_path = Path(socket_path or default_socket_path())
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(str(self.socket_path))
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile('rwb')
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Closes the connection; the daemon keeps running."""
+        self._file.close()
+        self._sock.close()
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Calls a daemon method and returns its result.
+
+        Raises:
+            KeyError, ValueError, TypeError: As raised by the daemon's store.
+            DaemonError: If the daemon rejects the request.
+            ConnectionError: If the daemon closes the connection.
+        """
+        request = {"jsonrpc": "2.0", "id": next(self._ids), "method": method,
+                   "params": {key: to_wire(value) for key, value in params.items()}}
+        with self._lock:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("The task daemon closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            error = response["error"]
+            kind = (error.get("data") or {}).get("type")
+            raise ERRORS.get(kind, DaemonError)(error["message"])
+        return from_wire(response["result"])
+
+    def ping(self) -> dict:
+        """Returns the daemon's storage type, process ID and whether its store records history."""
+        return self.call("ping")
+
+    # --- Writes ---
+
+    def add_task(self, task: Task) -> None:
+        self.call("add_task", task=task)
+
+    def add_tasks(self, tasks: Iterable[Task]) -> List[Task]:
+        return self.call("add_tasks", tasks=list(tasks))
+
+    def update_task(self, task_id: str, **kwargs) -> Task:
+        return self.call("update_task", task_id=task_id, **kwargs)
+
+    def update_tasks(self, updates: Dict[str, dict]) -> List[Task]:
+        return self.call("update_tasks", updates=updates)
+
+    def delete_task(self, task_id: str) -> None:
+        self.call("delete_task", task_id=task_id)
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        return self.call("delete_tasks", task_ids=list(task_ids))
+
+    def undo(self) -> int:
+        return self.call("undo")
+
+    def redo(self) -> int:
+        return self.call("redo")
+
+    def flush(self) -> None:
+        self.call("flush")
+
+    # --- Reads ---
+
+    @property
+    def version(self) -> int:
+        return self.call("version")
+
+    def get_task(self, task_id: str) -> Task:
+        return self.call("get_task", task_id=task_id)
+
+    def resolve_id(self, prefix: str) -> str:
+        return self.call("resolve_id", prefix=prefix)
+
+    def short_id(self, task_id: str, min_length: int = 8) -> str:
+        return self.call("short_id", task_id=task_id, min_length=min_length)
+
+    def short_ids(self, task_ids: Iterable[str], min_length: int = 8) -> List[str]:
+        return self.call("short_ids", task_ids=list(task_ids), min_length=min_length)
+
+    def list_tasks(self, limit: Optional[int] = None, offset: int = 0,
+                   after: Optional[str] = None) -> List[Task]:
+        return self.call("list_tasks", limit=limit, offset=offset, after=after)
+
+    def search_tasks(self, query: Optional[str] = None, status: Optional[str] = None,
+                     priority: Optional[str] = None, tags: Optional[List[str]] = None,
+                     ranked: bool = False, limit: Optional[int] = None, after: Optional[str] = None) -> List[Task]:
+        return self.call("search_tasks", query=query, status=status, priority=priority, tags=tags,
+                         ranked=ranked, limit=limit, after=after)
+
+    def filter_tasks(self, where: Union[str, 'TaskFilter'], limit: Optional[int] = None,
+                     after: Optional[str] = None) -> List[Task]:
+        if not isinstance(where, str):
+            where = where.expression
+        return self.call("filter_tasks", where=where, limit=limit, after=after)
+
+    def statistics(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        return self.call("statistics", now=now, weeks=weeks)
+
+    def due_between(self, start: Optional[int] = None, end: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Task]:
+        return self.call("due_between", start=start, end=end, limit=limit)
+
+    def overdue(self, now: Optional[int] = None, limit: Optional[int] = None) -> List[Task]:
+        return self.call("overdue", now=now, limit=limit)
+
+    def next_due(self, k: int = 1, now: Optional[int] = None) -> List[Task]:
+        return self.call("next_due", k=k, now=now)
+
+    def state_at(self, timestamp: int) -> List[Task]:
+        return self.call("state_at", timestamp=timestamp)
+
+    def cursor_for(self, task: Task) -> str:
+        """Returns a cursor that continues a listing right after ``task``."""
+        return encode_cursor(order_key(task))
+
+    def iter_tasks(
+        self,
+        query: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        batch_size: int = 500,
+        where: Union[str, 'TaskFilter', None] = None
+    ) -> Iterator[Task]:
+        """Yields matching tasks in listing order, fetching one page per call."""
+        filtered = query or status or priority or tags
+        while True:
+            if where is not None:
+                page = self.filter_tasks(where, limit=batch_size, after=after)
+            elif filtered:
+                page = self.search_tasks(query=query, status=status, priority=priority, tags=tags,
+                                         limit=batch_size, after=after)
+            else:
+                page = self.list_tasks(limit=batch_size, after=after)
+            if not page:
+                return
+            after = self.cursor_for(page[-1])
+            yield from page
+            if len(page) < batch_size:
+                return
+
+
+def connect(storage_type: str = 'file', socket_path: Optional[Path] = None) -> Optional[StoreClient]:
+    """
+    Returns a client of the daemon if one is running and serves ``storage_type``.
+
+    Returns None otherwise (no socket, nobody listening, or another storage
+    type), in which case the caller opens the store itself.
+    """
+    path = Path(socket_path or default_socket_path())
+    if not path.exists():
+        return None
+    try:
+        client = StoreClient(path, timeout=5.0)
+    except OSError:
+        return None
+    try:
+        if client.ping().get("storage") == storage_type:
+            client._sock.settimeout(None)
+            return client
+    except (OSError, ValueError, DaemonError):
+        pass
+    client.close()
+    return None
@@ -0,0 +1,181 @@
+"""
+Column-oriented snapshot of a set of tasks for computing statistics in bulk.
+
+``TaskColumns`` holds one row per task in flat ``array`` columns (status and
+priority codes, creation and due times in epoch seconds) plus a bitmap per tag,
+stored as a Python integer with one bit per row. Statistics are then computed
+over whole columns at once: with NumPy installed the arrays are viewed as
+NumPy arrays without copying, otherwise ``array.count`` and integer bit counts
+do most of the work in C.
+
+The stores answer ``statistics()`` from the running ``TaskCounters``; a table
+is built from scratch when the counters need checking (``check_statistics``),
+since it shares none of their bookkeeping.
+"""
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.todo.models import Task
+from src.todo.utils import now_epoch, parse_date
+
+try:
+    import numpy as np
+except ImportError:  # optional: the array fallback gives the same results
+    np = None
+
+WEEK = 7 * 86400
+NO_TIME = -2 ** 63
+# Always reported, even when no task currently has them.
+STATUSES = ('pending', 'completed')
+PRIORITIES = ('high', 'medium', 'low')
+
+
+def with_default_keys(stats: dict) -> dict:
+    """Adds zero counts for the standard statuses and priorities missing from ``stats``."""
+    stats["by_status"] = {**dict.fromkeys(STATUSES, 0), **stats["by_status"]}
+    for key in ("by_priority", "pending_by_priority"):
+        stats[key] = {**dict.fromkeys(PRIORITIES, 0), **stats[key]}
+    return stats
+
+
+def task_times(task: Task) -> Tuple[Optional[int], Optional[int]]:
+    """Returns the creation and due times of a task in epoch seconds (None if unset or unreadable)."""
+    created = task.created_ts
+    if created is None and task.created_at:
+        created = parse_date(task.created_at)
+    due = task.due_ts
+    if due is None and task.due_date:
+        due = parse_date(task.due_date)
+    return created, due
+
+
+def _set_bits(bitmaps: Dict[str, int], rows: Dict[str, List[int]], size: int) -> None:
+    """Builds one bitmap per key from row lists in a single pass each."""
+    for key, members in rows.items():
+        bitmap = bytearray((size + 7) // 8)
+        for row in members:
+            bitmap[row >> 3] |= 1 << (row & 7)
+        bitmaps[key] = int.from_bytes(bitmap, 'little')
+
+
+class TaskColumns:
+    """
+    Columns over a set of tasks, one row per task.
+
+    Status and priority values are stored as small integer codes assigned in
+    order of first appearance; ``None`` is a valid priority value.
+    """
+    def __init__(self):
+        self._status_codes: Dict[str, int] = {}
+        self._priority_codes: Dict[Optional[str], int] = {}
+        self.status = array('b')
+        self.priority = array('b')
+        self.created = array('q')
+        self.due = array('q')
+        self.tags: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, tasks: Iterable[Task]) -> 'TaskColumns':
+        """Builds the columns for ``tasks``, creating each tag bitmap in one step."""
+        columns = cls()
+        tag_rows: Dict[str, List[int]] = {}
+        for row, task in enumerate(tasks):
+            columns._append(task)
+            for tag in dict.fromkeys(task.tags):
+                tag_rows.setdefault(tag, []).append(row)
+        _set_bits(columns.tags, tag_rows, len(columns.status))
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @staticmethod
+    def _code(codes: Dict, value) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def _append(self, task: Task) -> None:
+        """Adds a row for ``task``, without touching the tag bitmaps."""
+        created, due = task_times(task)
+        self.status.append(self._code(self._status_codes, task.status))
+        self.priority.append(self._code(self._priority_codes, task.priority))
+        self.created.append(NO_TIME if created is None else created)
+        self.due.append(NO_TIME if due is None else due)
+
+    def stats(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        """
+        Computes the store statistics.
+
+        Returns a dictionary with the total, counts by status, by priority (for
+        all and for pending tasks), per-tag totals and pending counts, the number
+        of overdue pending tasks with a histogram of how many weeks they are
+        overdue, and how many tasks were created in each of the last ``weeks``
+        weeks (index 0 is the most recent seven days).
+        """
+        now = now_epoch() if now is None else now
+        compute = self._stats_numpy if np is not None else self._stats_python
+        return with_default_keys({"total": len(self), **compute(now, weeks)})
+
+    def _pending_code(self) -> int:
+        return self._status_codes.get('pending', -1)
+
+    def _stats_numpy(self, now: int, weeks: int) -> dict:
+        status = np.frombuffer(self.status, dtype=np.int8)
+        priority = np.frombuffer(self.priority, dtype=np.int8)
+        created = np.frombuffer(self.created, dtype=np.int64)
+        due = np.frombuffer(self.due, dtype=np.int64)
+
+        pending = status == self._pending_code()
+        status_counts = np.bincount(status, minlength=len(self._status_codes))
+        priority_counts = np.bincount(priority, minlength=len(self._priority_codes))
+        pending_priority = np.bincount(priority[pending], minlength=len(self._priority_codes))
+
+        overdue = pending & (due != NO_TIME) & (due < now)
+        overdue_weeks = np.bincount((now - due[overdue]) // WEEK) if overdue.any() else np.zeros(0, np.int64)
+        age = (now - created[created != NO_TIME]) // WEEK
+        created_weeks = np.bincount(age[(age >= 0) & (age < weeks)], minlength=weeks)
+
+        pending_bits = int.from_bytes(np.packbits(pending, bitorder='little').tobytes(), 'little')
+        return {
+            "by_status": {name: int(status_counts[code]) for name, code in self._status_codes.items()},
+            "by_priority": {name: int(priority_counts[code]) for name, code in self._priority_codes.items()},
+            "pending_by_priority": {name: int(pending_priority[code]) for name, code in self._priority_codes.items()},
+            "by_tag": self._tag_counts(pending_bits),
+            "overdue": int(overdue.sum()),
+            "overdue_by_week": {week: int(count) for week, count in enumerate(overdue_weeks) if count},
+            "created_by_week": [int(count) for count in created_weeks[:weeks]],
+        }
+
+    def _stats_python(self, now: int, weeks: int) -> dict:
+        pending_code = self._pending_code()
+        pending_priority: Counter = Counter()
+        overdue_weeks: Counter = Counter()
+        created_weeks = [0] * weeks
+        pending_bitmap = bytearray((len(self.status) + 7) // 8)
+        for row, (status, priority, created, due) in enumerate(zip(self.status, self.priority, self.created, self.due)):
+            if status == pending_code:
+                pending_priority[priority] += 1
+                pending_bitmap[row >> 3] |= 1 << (row & 7)
+                if due != NO_TIME and due < now:
+                    overdue_weeks[(now - due) // WEEK] += 1
+            if created != NO_TIME and 0 <= now - created < weeks * WEEK:
+                created_weeks[(now - created) // WEEK] += 1
+
+        return {
+            "by_status": {name: self.status.count(code) for name, code in self._status_codes.items()},
+            "by_priority": {name: self.priority.count(code) for name, code in self._priority_codes.items()},
+            "pending_by_priority": {name: pending_priority[code] for name, code in self._priority_codes.items()},
+            "by_tag": self._tag_counts(int.from_bytes(pending_bitmap, 'little')),
+            "overdue": sum(overdue_weeks.values()),
+            "overdue_by_week": dict(sorted(overdue_weeks.items())),
+            "created_by_week": created_weeks,
+        }
+
+    def _tag_counts(self, pending_bits: int) -> Dict[str, Dict[str, int]]:
+        return {
+            tag: {"total": bits.bit_count(), "pending": (bits & pending_bits).bit_count()}
+            for tag, bits in sorted(self.tags.items())
+        }
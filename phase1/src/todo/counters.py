@@ -0,0 +1,129 @@
+"""
+Running statistics counters for the in-process storage backends.
+
+``TaskCounters`` is updated on every add, update and delete, so reading the
+store statistics does not touch the tasks at all. Counts by status, priority
+and tag are plain counters. The time-based figures cannot be kept as fixed
+counts because they depend on the current time, so creation times and the due
+dates of pending tasks are kept in sorted lists instead: every histogram bucket
+is then the distance between two binary searches.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.todo.columns import WEEK, task_times, with_default_keys
+from src.todo.models import Task
+from src.todo.utils import now_epoch
+
+# (status, priority, unique tags, created, due) as last counted for a task.
+Entry = Tuple[str, Optional[str], Tuple[str, ...], Optional[int], Optional[int]]
+
+
+def _entry(task: Task) -> Entry:
+    created, due = task_times(task)
+    return (task.status, task.priority, tuple(dict.fromkeys(task.tags)), created, due)
+
+
+def _remove_sorted(values: List[int], value: int) -> None:
+    del values[bisect_left(values, value)]
+
+
+class TaskCounters:
+    """
+    Counters over a set of tasks, kept current by ``add`` and ``remove``.
+
+    Each counted task remembers the values it was counted under, so removing it
+    undoes exactly its contribution; an update is a removal plus an addition.
+    """
+    def __init__(self):
+        self._entries: Dict[str, Entry] = {}
+        self.by_status: Counter = Counter()
+        self.by_priority: Counter = Counter()
+        self.pending_by_priority: Counter = Counter()
+        self.tag_total: Counter = Counter()
+        self.tag_pending: Counter = Counter()
+        self.created: List[int] = []
+        self.pending_due: List[int] = []
+
+    @classmethod
+    def build(cls, tasks: Iterable[Task]) -> 'TaskCounters':
+        """Counts ``tasks`` in one pass, sorting the time lists once at the end."""
+        counters = cls()
+        for task in tasks:
+            counters._count(task.id, _entry(task), 1)
+        counters.created.sort()
+        counters.pending_due.sort()
+        return counters
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _count(self, task_id: str, entry: Entry, sign: int, sorted_insert: bool = False) -> None:
+        status, priority, tags, created, due = entry
+        pending = status == 'pending'
+        self.by_status[status] += sign
+        self.by_priority[priority] += sign
+        if pending:
+            self.pending_by_priority[priority] += sign
+        for tag in tags:
+            self.tag_total[tag] += sign
+            if pending:
+                self.tag_pending[tag] += sign
+        timed = [(self.created, created)]
+        if pending:
+            timed.append((self.pending_due, due))
+        for values, stamp in timed:
+            if stamp is None:
+                continue
+            if sign < 0:
+                _remove_sorted(values, stamp)
+            elif sorted_insert:
+                insort(values, stamp)
+            else:
+                values.append(stamp)
+        if sign > 0:
+            self._entries[task_id] = entry
+        else:
+            del self._entries[task_id]
+
+    def add(self, task: Task) -> None:
+        """Counts a newly stored task."""
+        self._count(task.id, _entry(task), 1, sorted_insert=True)
+
+    def remove(self, task_id: str) -> None:
+        """Uncounts a deleted task, using the values it was counted under."""
+        self._count(task_id, self._entries[task_id], -1)
+
+    def _created_by_week(self, now: int, weeks: int) -> List[int]:
+        # Week w holds creation times in (now - (w + 1) * WEEK, now - w * WEEK].
+        edges = [bisect_right(self.created, now - week * WEEK) for week in range(weeks + 1)]
+        return [edges[week] - edges[week + 1] for week in range(weeks)]
+
+    def _overdue_by_week(self, now: int) -> Dict[int, int]:
+        # Walk back from the latest overdue date one non-empty week at a time.
+        due = self.pending_due
+        histogram = {}
+        position = bisect_left(due, now)
+        while position:
+            week = (now - due[position - 1]) // WEEK
+            start = bisect_right(due, now - (week + 1) * WEEK, 0, position)
+            histogram[week] = position - start
+            position = start
+        return histogram
+
+    def stats(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        """Returns the statistics dictionary described in ``TaskColumns.stats``."""
+        now = now_epoch() if now is None else now
+        by_priority = {priority: count for priority, count in self.by_priority.items() if count}
+        return with_default_keys({
+            "total": len(self._entries),
+            "by_status": {status: count for status, count in self.by_status.items() if count},
+            "by_priority": by_priority,
+            "pending_by_priority": {priority: self.pending_by_priority[priority] for priority in by_priority},
+            "by_tag": {tag: {"total": count, "pending": self.tag_pending[tag]}
+                       for tag, count in sorted(self.tag_total.items()) if count},
+            "overdue": bisect_left(self.pending_due, now),
+            "overdue_by_week": self._overdue_by_week(now),
+            "created_by_week": self._created_by_week(now, weeks),
+        })
@@ -0,0 +1,35 @@
+"""
+Listing order and pagination cursors.
+
+Every backend lists tasks in the same order (pending first, then by creation
+date, ties broken by ID), and a cursor is just the order key of the last task
+of a page, encoded as an opaque string. This module has no dependencies on
+the storage code, so the daemon client can page through listings too.
+"""
+import base64
+import json
+from typing import Tuple
+
+from src.todo.models import Task
+
+# (task is completed, created_at, id) -- the default listing order.
+OrderKey = Tuple[bool, str, str]
+
+
+def order_key(task: Task) -> OrderKey:
+    """Returns the key that sorts pending tasks first, then by creation date."""
+    return (task.status == 'completed', task.created_at, task.id)
+
+
+def encode_cursor(key: OrderKey) -> str:
+    """Encodes an order key as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> OrderKey:
+    """Decodes a cursor produced by ``encode_cursor``."""
+    try:
+        completed, created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (bool(completed), str(created_at), str(task_id))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
@@ -0,0 +1,189 @@
+"""
+Local task-store daemon.
+
+A CLI invocation normally opens the store itself: it loads or maps the task
+file and builds the indexes before it can answer, which dominates scripted
+use of short commands. The daemon keeps one store open with warm indexes and
+serves it over a Unix socket; ``StoreClient`` (in ``src.todo.client``) has
+the storage methods the CLI uses and forwards them to the daemon.
+
+The protocol is JSON-RPC 2.0, one request or response object per line. Params
+are passed by name. Tasks travel as ``{"task": Task.to_dict()}`` and mappings
+with non-string keys (such as the ``statistics`` histograms) as
+``{"pairs": [[key, value], ...]}``. A failed call answers with an error whose
+``data.type`` names the exception, which the client raises again as
+``KeyError`` or ``ValueError`` like the backends do.
+
+Calls run on the daemon's store through ``AsyncStorage``: one at a time, in
+order per connection, with writes that arrive together from several clients
+coalesced into one batch. The daemon uses the store's normal locking, so
+processes that open the files directly still see its writes and it sees
+theirs.
+
+Usage (from the phase1 directory)::
+
+    python -m src.todo.daemon [--storage file|sqlite|memory] [--socket PATH]
+
+The CLI uses a running daemon on its own when the storage types match and
+opens the store directly otherwise (see ``src.todo.client.connect``).
+"""
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import signal
+import socket
+import sys
+from typing import Optional
+
+from src.todo.aio import AsyncStorage
+from src.todo.client import default_socket_path, from_wire, to_wire
+
+# Storage methods a client may call; everything else is rejected.
+METHODS = frozenset({
+    'add_task', 'add_tasks', 'update_task', 'update_tasks', 'delete_task', 'delete_tasks',
+    'undo', 'redo', 'flush', 'get_task', 'resolve_id', 'short_id', 'short_ids', 'version',
+    'list_tasks', 'search_tasks', 'filter_tasks', 'statistics', 'due_between',
+    'overdue', 'next_due', 'state_at',
+})
+# JSON-RPC error codes.
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, SERVER_ERROR = -32700, -32600, -32601, -32000
+# Longest request line; bulk calls such as add_tasks carry whole batches.
+MAX_LINE = 64 * 1024 * 1024
+
+
+class StoreDaemon:
+    """
+    Serves a storage backend to ``StoreClient`` connections on a Unix socket.
+
+    Args:
+        storage: The backend to serve; the daemon owns it and closes it on stop.
+        storage_type: 'file', 'sqlite' or 'memory'; clients only use a daemon
+            serving the type they asked for.
+        socket_path: Where to listen. Defaults to ``default_socket_path()``.
+    """
+    def __init__(self, storage, storage_type: str = 'file', socket_path: Optional[Path] = None):
+        self.store = AsyncStorage(storage)
+        self.storage_type = storage_type
+        self.socket_path = Path(socket_path or default_socket_path())
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """
+        Warms the indexes and starts listening.
+
+        Raises:
+            OSError: If another daemon is already listening on the socket.
+        """
+        if self.socket_path.exists():
+            if _is_listening(self.socket_path):
+                raise OSError(f"A daemon is already listening on {self.socket_path}.")
+            self.socket_path.unlink()  # left behind by a daemon that did not stop cleanly
+        await self.store.list_tasks(limit=1)
+        await self.store.statistics()
+        # Create the socket owner-only from the start; a chmod after binding
+        # would leave a moment in which other users could connect.
+        umask = os.umask(0o077)
+        try:
+            self._server = await asyncio.start_unix_server(self._serve, path=str(self.socket_path), limit=MAX_LINE)
+        finally:
+            os.umask(umask)
+
+    async def stop(self) -> None:
+        """Stops listening, removes the socket and closes the store."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        await self.store.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one connection in order until the client hangs up."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                writer.write(json.dumps(await self.handle(line)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # the client went away, or sent a line longer than MAX_LINE
+        finally:
+            writer.close()
+
+    async def handle(self, line: bytes) -> dict:
+        """Runs one JSON-RPC request and returns the response object."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            return _error(None, INVALID_REQUEST, "Expected a JSON object.")
+        request_id, method, params = request.get("id"), request.get("method"), request.get("params") or {}
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_REQUEST, "Params must be passed by name.")
+        if method == "ping":
+            history = getattr(self.store.storage, 'history', None) is not None
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "result": to_wire({"storage": self.storage_type, "pid": os.getpid(), "history": history})}
+        if method not in METHODS:
+            return _error(request_id, METHOD_NOT_FOUND, f"Unknown method: {method}")
+        try:
+            result = await getattr(self.store, method)(**{key: from_wire(value) for key, value in params.items()})
+        except Exception as e:
+            message = e.args[0] if len(e.args) == 1 and isinstance(e.args[0], str) else str(e)
+            return _error(request_id, SERVER_ERROR, message, type(e).__name__)
+        return {"jsonrpc": "2.0", "id": request_id, "result": to_wire(result)}
+
+
+def _error(request_id, code: int, message: str, kind: Optional[str] = None) -> dict:
+    error = {"code": code, "message": message}
+    if kind:
+        error["data"] = {"type": kind}
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+def _is_listening(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage", choices=['file', 'sqlite', 'memory'], default='file',
+                        help="Storage backend to serve (as the CLI's --storage)")
+    parser.add_argument("--history", action="store_true", help="Record the change history (as the CLI's --history)")
+    parser.add_argument("--socket", type=Path, default=None, help=f"Socket path (default: {default_socket_path()})")
+    args = parser.parse_args()
+
+    from src.todo.cli import get_storage  # the CLI imports this module
+
+    async def run():
+        daemon = StoreDaemon(get_storage(args.storage, history=args.history), args.storage, args.socket)
+        try:
+            await daemon.start()
+        except OSError as e:
+            await daemon.store.close()
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+        print(f"Serving the {args.storage} store on {daemon.socket_path} (pid {os.getpid()}).", file=sys.stderr)
+        await stopped.wait()
+        await daemon.stop()
+        return 0
+
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
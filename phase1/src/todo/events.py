@@ -0,0 +1,129 @@
+"""
+Change feed for the storage backends.
+
+Every mutation of a store is published as a ``ChangeEvent`` carrying a
+monotonically increasing version number. Consumers can either ``subscribe`` a
+callback, which receives each batch of events as it happens, or remember the
+last version they saw and ask ``changes_since`` for what happened after it.
+Mutations made inside ``batch()`` are published together when the batch
+commits, and not at all if it is rolled back.
+"""
+from collections import deque
+import sys
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from src.todo.models import Task
+
+ADDED = 'added'
+UPDATED = 'updated'
+DELETED = 'deleted'
+# The store was reloaded wholesale (e.g. after another process rewrote it);
+# anything may have changed, so consumers should re-read what they need.
+RELOADED = 'reloaded'
+
+
+class ChangeEvent(NamedTuple):
+    """
+    A single change to a store.
+
+    Attributes:
+        kind: ``'added'``, ``'updated'``, ``'deleted'`` or ``'reloaded'``.
+        task_id: ID of the changed task (None for ``'reloaded'``).
+        task: The task after the change, or the removed task for deletions.
+        changes: For updates, ``{field: (old value, new value)}`` of the fields that changed.
+        version: Store version right after this change.
+        external: True if the change was made by another process or connection.
+    """
+    kind: str
+    task_id: Optional[str]
+    task: Optional[Task]
+    changes: Dict[str, Tuple[Any, Any]]
+    version: int
+    external: bool = False
+
+
+Subscriber = Callable[[List[ChangeEvent]], None]
+
+
+def field_diff(task: Task, previous: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    """Returns ``{field: (old, new)}`` for the fields of ``task`` that differ from ``previous``."""
+    diff = {}
+    for key, old in previous.items():
+        new = getattr(task, key)
+        if new != old:
+            diff[key] = (old, new)
+    return diff
+
+
+class ChangeFeed:
+    """
+    Version counter, subscriber list and bounded event history of one store.
+
+    The storage classes call ``record`` for each mutation. Outside a batch the
+    event is published at once; between ``hold`` and ``release`` events are
+    collected and published as one list (or dropped by ``discard``).
+    """
+    def __init__(self, history: int = 1000):
+        self.version = 0
+        self._subscribers: List[Subscriber] = []
+        self._history: Deque[ChangeEvent] = deque(maxlen=history)
+        self._held: Optional[List[tuple]] = None
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Calls ``callback`` with every published list of events; returns an unsubscribe function."""
+        self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def changes_since(self, version: int) -> Optional[List[ChangeEvent]]:
+        """
+        Returns the events published after ``version``, oldest first.
+
+        Returns None if some of them are no longer in the history, in which
+        case the caller has to re-read the store.
+        """
+        if version >= self.version:
+            return []
+        missing = self.version - version
+        if missing > len(self._history):
+            return None
+        return list(self._history)[-missing:]
+
+    def hold(self) -> None:
+        """Starts collecting events instead of publishing them."""
+        self._held = []
+
+    def release(self) -> None:
+        """Publishes the events collected since ``hold`` as one batch."""
+        held, self._held = self._held, None
+        if held:
+            self._publish(held)
+
+    def discard(self) -> None:
+        """Drops the events collected since ``hold``."""
+        self._held = None
+
+    def record(self, kind: str, task_id: Optional[str], task: Optional[Task] = None,
+               changes: Optional[dict] = None, external: bool = False) -> None:
+        """Publishes one change, or collects it while events are held."""
+        change = (kind, task_id, task, changes or {}, external)
+        if self._held is not None:
+            self._held.append(change)
+        else:
+            self._publish([change])
+
+    def _publish(self, changes: List[tuple]) -> None:
+        events = []
+        for kind, task_id, task, diff, external in changes:
+            self.version += 1
+            events.append(ChangeEvent(kind, task_id, task, diff, self.version, external))
+        self._history.extend(events)
+        for callback in list(self._subscribers):
+            try:
+                callback(events)
+            except Exception as e:
+                # The change itself already happened; a failing consumer must not undo it.
+                print(f"Error in change subscriber {callback!r}: {e}", file=sys.stderr)
@@ -0,0 +1,345 @@
+"""
+Event-sourced task history for the in-process storage backends.
+
+``TaskHistory`` subscribes to a store's change feed and appends every local
+add, update and delete to an event log, together with the task state needed to
+reverse it. All events of one delivery (a single mutation, or a whole batch)
+form one transaction, which is the unit of ``undo`` and ``redo``. Undoing and
+redoing are recorded as events too, so the log is append-only and the undo and
+redo stacks can always be derived from it.
+
+Every so often the complete task state is written as a snapshot. ``state_at``
+rebuilds the store as of any moment from the nearest earlier snapshot plus the
+events recorded after it. A snapshot is due once the log has grown by as many
+events as the store holds tasks (and never before ``snapshot_every`` events),
+so, like journal compaction, snapshots cost O(1) amortized per change and no
+lookup replays more than one snapshot interval.
+
+With a directory the log is kept in ``events.jsonl`` and each snapshot in a
+``snapshot-<seq>-<time>.jsonl`` file, holding a JSON header line followed by
+one task per line. Several processes can share a directory as long as they
+append under the store lock. Without a directory everything stays in memory.
+"""
+import json
+import os
+from pathlib import Path
+import re
+from typing import IO, Callable, Iterator, List, Mapping, Optional, Tuple
+
+from src.todo.cursors import order_key
+from src.todo.events import ADDED, DELETED, RELOADED, UPDATED, ChangeEvent
+from src.todo.models import Task
+from src.todo.utils import format_iso, now_epoch
+
+DO = 'do'
+UNDO = 'undo'
+REDO = 'redo'
+_OPS = {ADDED: 'add', UPDATED: 'update', DELETED: 'delete'}
+_SNAPSHOT_RE = re.compile(r"snapshot-(\d+)-(\d+)\.jsonl")
+
+# A transaction on the undo or redo stack: its ID and its recorded events.
+Step = Tuple[int, List[dict]]
+
+
+def _task_state(task: Task) -> dict:
+    """Returns a dictionary of ``task`` that later changes to the task do not affect."""
+    state = task.to_dict()
+    state["tags"] = list(state["tags"])
+    return state
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+def step_changes(entries: List[dict], kind: str) -> Iterator[Tuple[str, str, object]]:
+    """
+    Yields the changes that undo (``kind='undo'``) or redo the events of a transaction.
+
+    Each change is ``('add', task_id, Task)``, ``('delete', task_id, None)`` or
+    ``('update', task_id, fields)``. Undoing walks the events backwards.
+    """
+    undo = kind == UNDO
+    for entry in (reversed(entries) if undo else entries):
+        op, task_id = entry["op"], entry["id"]
+        if op == 'update':
+            fields = {key: _copy(values[0 if undo else 1]) for key, values in entry["fields"].items()
+                      if key != 'modified_at'}
+            yield 'update', task_id, fields
+        elif op is not None:
+            if (op == 'add') == undo:
+                yield 'delete', task_id, None
+            else:
+                yield 'add', task_id, Task(**entry["task"])
+
+
+class TaskHistory:
+    """
+    Event log, undo and redo stacks, and snapshots of one store.
+
+    Args:
+        tasks: Returns the store's current task mapping, for snapshots.
+        directory: Where the log and snapshots are kept; None keeps them in memory.
+        write_file: ``write_file(path, write)`` atomically replaces ``path`` with
+            what ``write(f)`` writes; required with a directory.
+        snapshot_every: Minimum number of events between snapshots.
+        max_undo: How many transactions can be undone.
+        fsync: Whether appends to the log are forced to disk.
+    """
+    def __init__(self, tasks: Callable[[], Mapping[str, Task]], directory: Optional[Path] = None,
+                 write_file: Optional[Callable[[Path, Callable[[IO], None]], None]] = None,
+                 snapshot_every: int = 500, max_undo: int = 100, fsync: bool = False):
+        self._tasks = tasks
+        self._dir = Path(directory) if directory is not None else None
+        self._write_file = write_file
+        self.snapshot_every = snapshot_every
+        self.max_undo = max_undo
+        self._fsync = fsync
+        self._log: List[dict] = []
+        self._snapshots: List[Tuple[dict, List[dict]]] = []
+        self._undo: List[Step] = []
+        self._redo: List[Step] = []
+        # The stacks reflect the log up to _offset once loaded from a snapshot.
+        self._loaded = False
+        self._offset = 0
+        # Last sequence number in the log, valid while the log is _log_size long.
+        self._seq = 0
+        self._log_size = 0
+        self._snapshot_seq = 0
+        self._mode: Optional[Tuple[str, int]] = None
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._log_path = self._dir / "events.jsonl"
+            self._log_size = None
+        headers = self._snapshot_headers()
+        if headers:
+            self._snapshot_seq = headers[-1][0]
+        else:
+            # The base snapshot: history starts with the state the store has now.
+            self._write_snapshot({"seq": self._last_seq(), "ts": now_epoch(), "offset": self._end(),
+                                  "undo": [], "redo": []})
+
+    def record(self, events: List[ChangeEvent]) -> None:
+        """Change feed subscriber: appends the local changes of one delivery as a transaction."""
+        events = [event for event in events if not event.external and event.kind != RELOADED]
+        if not events:
+            return
+        kind, target = self._mode or (DO, None)
+        self._mode = None
+        ts = now_epoch()
+        seq = self._last_seq()
+        tx = seq + 1
+        entries = []
+        for event in events:
+            seq += 1
+            entry = {"seq": seq, "tx": tx, "ts": ts, "kind": kind, "target": target,
+                     "op": _OPS[event.kind], "id": event.task_id}
+            if event.kind == UPDATED:
+                entry["fields"] = {key: [_copy(old), _copy(new)] for key, (old, new) in event.changes.items()}
+            else:
+                entry["task"] = _task_state(event.task)
+            entries.append(entry)
+        self._append(entries)
+
+    def begin(self, kind: str) -> Optional[List[dict]]:
+        """
+        Picks the transaction that the next ``undo`` or ``redo`` reverts or re-applies.
+
+        Returns its events, or None if the stack is empty. The changes published
+        next are recorded as that step; call ``skip`` if there are none and
+        ``cancel`` if the step fails.
+        """
+        self.catch_up()
+        stack = self._undo if kind == UNDO else self._redo
+        if not stack:
+            return None
+        tx, entries = stack[-1]
+        self._mode = (kind, tx)
+        return entries
+
+    def skip(self) -> None:
+        """Records the step picked by ``begin`` as done although it changed no task."""
+        kind, target = self._mode
+        self._mode = None
+        seq = self._last_seq() + 1
+        self._append([{"seq": seq, "tx": seq, "ts": now_epoch(), "kind": kind, "target": target,
+                       "op": None, "id": None}])
+
+    def cancel(self) -> None:
+        """Forgets the step picked by ``begin``."""
+        self._mode = None
+
+    def catch_up(self) -> None:
+        """Brings the undo and redo stacks up to date with the log, including other processes' events."""
+        if not self._loaded:
+            header = self._snapshot_header(self._snapshot_headers()[-1][2])
+            self._undo = [tuple(step) for step in header["undo"]]
+            self._redo = [tuple(step) for step in header["redo"]]
+            self._offset = header["offset"]
+            self._loaded = True
+        group: List[dict] = []
+        for entry, offset in self._read(self._offset):
+            if group and entry["tx"] != group[0]["tx"]:
+                self._advance(group)
+                group = []
+            group.append(entry)
+            self._offset = offset
+        if group:
+            self._advance(group)
+
+    def state_at(self, timestamp: int) -> List[Task]:
+        """
+        Returns the tasks as they were at ``timestamp`` (epoch seconds), in listing order.
+
+        Loads the last snapshot taken at or before ``timestamp`` and replays the
+        events recorded after it up to that time.
+
+        Raises:
+            ValueError: If ``timestamp`` is before the history starts.
+        """
+        headers = self._snapshot_headers()
+        earlier = [ref for seq, ts, ref in headers if ts <= timestamp]
+        if not earlier:
+            raise ValueError(f"No history before {format_iso(headers[0][1])}.")
+        header = self._snapshot_header(earlier[-1])
+        tasks = {state["id"]: Task(**state) for state in self._snapshot_tasks(earlier[-1])}
+        for entry, _ in self._read(header["offset"]):
+            if entry["ts"] > timestamp:
+                break
+            op, task_id = entry["op"], entry["id"]
+            if op == 'add':
+                tasks[task_id] = Task(**entry["task"])
+            elif op == 'delete':
+                tasks.pop(task_id, None)
+            elif op == 'update' and task_id in tasks:
+                for key, (_, new) in entry["fields"].items():
+                    setattr(tasks[task_id], key, _copy(new))
+        return sorted(tasks.values(), key=order_key)
+
+    def _advance(self, entries: List[dict]) -> None:
+        """Moves the stacks past one transaction read from the log."""
+        first = entries[0]
+        if first["kind"] == DO:
+            self._undo.append((first["tx"], entries))
+            del self._undo[:-self.max_undo]
+            self._redo.clear()
+            return
+        source, target = (self._undo, self._redo) if first["kind"] == UNDO else (self._redo, self._undo)
+        for position in range(len(source) - 1, -1, -1):
+            if source[position][0] == first["target"]:
+                target.append(source.pop(position))
+                break
+
+    def _append(self, entries: List[dict]) -> None:
+        start = self._end()
+        if self._dir is None:
+            self._log.extend(entries)
+        else:
+            with open(self._log_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+                f.flush()
+                if self._fsync:
+                    os.fsync(f.fileno())
+        end = self._end()
+        if self._loaded and self._offset == start:
+            self._advance(entries)
+            self._offset = end
+        self._seq, self._log_size = entries[-1]["seq"], end
+        if self._seq - self._snapshot_seq >= max(self.snapshot_every, len(self._tasks())):
+            # Another process may have taken the snapshot already.
+            self._snapshot_seq = self._snapshot_headers()[-1][0]
+            if self._seq - self._snapshot_seq >= max(self.snapshot_every, len(self._tasks())):
+                self.catch_up()
+                self._write_snapshot({"seq": self._seq, "ts": now_epoch(), "offset": self._offset,
+                                      "undo": list(self._undo), "redo": list(self._redo)})
+
+    def _end(self) -> int:
+        """Returns the position after the last event in the log."""
+        if self._dir is None:
+            return len(self._log)
+        try:
+            return self._log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _last_seq(self) -> int:
+        """Returns the sequence number of the last complete event, cutting off a torn final line."""
+        size = self._end()
+        if size == self._log_size:
+            return self._seq
+        if not size:
+            self._seq, self._log_size = 0, 0
+            return 0
+        seq, block = 0, 4096
+        with open(self._log_path, 'rb') as f:
+            while True:
+                start = max(0, size - block)
+                f.seek(start)
+                data = f.read(size - start)
+                end = data.rfind(b"\n")
+                if end >= 0 and (data.rfind(b"\n", 0, end) >= 0 or start == 0):
+                    seq = json.loads(data[data.rfind(b"\n", 0, end) + 1:end + 1])["seq"]
+                    break
+                if start == 0:
+                    break
+                block *= 2
+        intact = start + end + 1
+        if intact < size:
+            # An interrupted append; later appends must not end up behind it.
+            os.truncate(self._log_path, intact)
+        self._seq, self._log_size = seq, intact
+        return seq
+
+    def _read(self, offset: int) -> Iterator[Tuple[dict, int]]:
+        """Yields the complete events after ``offset``, each with the offset following it."""
+        if self._dir is None:
+            for position in range(offset, len(self._log)):
+                yield self._log[position], position + 1
+            return
+        if not self._log_path.exists():
+            return
+        with open(self._log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                offset += len(line)
+                yield json.loads(line), offset
+
+    def _snapshot_headers(self) -> List[Tuple[int, int, object]]:
+        """Returns ``(seq, ts, ref)`` for every snapshot, oldest first."""
+        if self._dir is None:
+            return [(header["seq"], header["ts"], position)
+                    for position, (header, _) in enumerate(self._snapshots)]
+        found = []
+        for path in self._dir.glob("snapshot-*.jsonl"):
+            match = _SNAPSHOT_RE.fullmatch(path.name)
+            if match:
+                found.append((int(match[1]), int(match[2]), path))
+        return sorted(found, key=lambda snapshot: snapshot[:2])
+
+    def _snapshot_header(self, ref) -> dict:
+        if self._dir is None:
+            return self._snapshots[ref][0]
+        with open(ref, 'rb') as f:
+            return json.loads(f.readline())
+
+    def _snapshot_tasks(self, ref) -> Iterator[dict]:
+        if self._dir is None:
+            yield from self._snapshots[ref][1]
+            return
+        with open(ref, 'rb') as f:
+            f.readline()
+            for line in f:
+                yield json.loads(line)
+
+    def _write_snapshot(self, header: dict) -> None:
+        if self._dir is None:
+            self._snapshots.append((header, [_task_state(task) for task in self._tasks().values()]))
+        else:
+            def write(f):
+                f.write(json.dumps(header) + "\n")
+                for task in self._tasks().values():
+                    f.write(json.dumps(task.to_dict()) + "\n")
+            self._write_file(self._dir / f"snapshot-{header['seq']:010d}-{header['ts']}.jsonl", write)
+        self._snapshot_seq = header["seq"]
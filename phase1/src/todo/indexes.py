@@ -0,0 +1,500 @@
+"""
+Secondary indexes for the in-process storage backends.
+
+The storage classes keep every task in a dictionary keyed by ID. The structures
+in this module sit next to that dictionary and answer "which IDs match?" without
+walking every task, so the cost of a filtered search grows with the number of
+results rather than with the size of the store.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from itertools import islice
+import re
+from os.path import commonprefix
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.todo.columns import task_times
+from src.todo.counters import TaskCounters
+from src.todo.cursors import OrderKey, order_key
+from src.todo.lazy import LazyTasks
+from src.todo.models import Task
+
+
+def unique_prefix(task_id: str, neighbours: Iterable[Optional[str]], min_length: int = 8) -> str:
+    """
+    Returns the shortest prefix of ``task_id``, at least ``min_length`` long,
+    that is not also a prefix of its neighbours in sorted ID order.
+
+    A prefix that no neighbour shares cannot be shared by any other ID either,
+    since every ID between it and the neighbour would share it too.
+    """
+    length = min_length
+    for other in neighbours:
+        if other is not None:
+            common = len(commonprefix((task_id, other)))
+            length = max(length, common + 1)
+    return task_id[:length]
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits already lower-cased text into word tokens."""
+    return _TOKEN_RE.findall(text)
+
+
+class TextIndex:
+    """
+    Inverted index over task titles and descriptions.
+
+    Lower-cased titles and descriptions are split into word tokens, and each
+    token maps to the IDs containing it (with a per-field weight for ranking).
+    To keep substring matches working, the token vocabulary itself is indexed by
+    character n-grams (trigrams by default): a query fragment is resolved to the
+    vocabulary tokens containing it, and their postings give the candidate
+    tasks. Candidates are verified against cached lower-cased texts, so nothing
+    is re-lowercased at query time.
+    """
+    TITLE_WEIGHT = 3
+    DESCRIPTION_WEIGHT = 1
+    # Below this many candidates it is cheaper to verify them directly.
+    SCAN_THRESHOLD = 512
+
+    def __init__(self, n: int = 3):
+        self._n = n
+        self._texts: Dict[str, Tuple[str, str]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+
+    def _ngrams(self, text: str) -> Set[str]:
+        n = self._n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _token_weights(self, title: str, description: str) -> Dict[str, int]:
+        weights = dict.fromkeys(tokenize(title), self.TITLE_WEIGHT)
+        for token in set(tokenize(description)):
+            weights[token] = weights.get(token, 0) + self.DESCRIPTION_WEIGHT
+        return weights
+
+    def add(self, task: Task) -> None:
+        """Indexes the title and description of a task."""
+        title = task.title.lower()
+        description = (task.description or "").lower()
+        self._texts[task.id] = (title, description)
+        for token, weight in self._token_weights(title, description).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for gram in self._ngrams(token):
+                    self._grams[gram].add(token)
+            postings[task.id] = weight
+
+    def remove(self, task_id: str) -> None:
+        """Drops a task, using the texts it was indexed with."""
+        title, description = self._texts.pop(task_id)
+        for token in self._token_weights(title, description):
+            postings = self._postings[token]
+            del postings[task_id]
+            if not postings:
+                del self._postings[token]
+                for gram in self._ngrams(token):
+                    tokens = self._grams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._grams[gram]
+
+    def reindex(self, task: Task) -> None:
+        """Re-indexes a task whose title or description changed in place."""
+        if self._texts[task.id] != (task.title.lower(), (task.description or "").lower()):
+            self.remove(task.id)
+            self.add(task)
+
+    def _tokens_containing(self, fragment: str) -> List[str]:
+        """Returns the vocabulary tokens that contain ``fragment``."""
+        if len(fragment) < self._n:
+            return [token for token in self._postings if fragment in token]
+        gram_sets = sorted((self._grams.get(gram, set()) for gram in self._ngrams(fragment)), key=len)
+        tokens = set(gram_sets[0])
+        for other in gram_sets[1:]:
+            tokens &= other
+        return [token for token in tokens if fragment in token]
+
+    def _contains(self, task_id: str, needle: str) -> bool:
+        title, description = self._texts[task_id]
+        return needle in title or needle in description
+
+    def search(self, query: str, within: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Returns the IDs whose title or description contains ``query``, ignoring case.
+
+        If ``within`` is given, only those IDs are considered.
+        """
+        needle = query.lower()
+        fragments = sorted(set(tokenize(needle)), key=len, reverse=True)
+        if not fragments or (within is not None and len(within) <= self.SCAN_THRESHOLD):
+            pool = self._texts.keys() if within is None else within
+            return {task_id for task_id in pool if self._contains(task_id, needle)}
+
+        # Every word run in the needle lies inside some token of a matching text,
+        # so each fragment narrows the candidates to tasks holding such a token.
+        candidates: Optional[Set[str]] = within
+        for fragment in fragments:
+            matches: Set[str] = set()
+            for token in self._tokens_containing(fragment):
+                matches.update(self._postings[token])
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        return {task_id for task_id in candidates if self._contains(task_id, needle)}
+
+    def estimate(self, query: str) -> int:
+        """
+        Upper bound on the number of IDs ``search`` returns for ``query``.
+
+        Sums the postings of the tokens containing the query's rarest word
+        run, so nothing is intersected or verified.
+        """
+        fragments = set(tokenize(query.lower()))
+        if not fragments:
+            return len(self._texts)
+        return min(sum(len(self._postings[token]) for token in self._tokens_containing(fragment))
+                   for fragment in fragments)
+
+    def score(self, task_id: str, query: str) -> int:
+        """Relevance of a matching task: whole-word hits plus substring hits, title first."""
+        needle = query.lower()
+        title, description = self._texts[task_id]
+        score = sum(self._postings.get(token, {}).get(task_id, 0) for token in set(tokenize(needle)))
+        if needle in title:
+            score += self.TITLE_WEIGHT
+        if needle in description:
+            score += self.DESCRIPTION_WEIGHT
+        return score
+
+
+class TaskIndex:
+    """
+    Maintained secondary indexes over a collection of tasks.
+
+    Keeps status -> IDs, priority -> IDs and tag -> IDs maps, a sorted list of
+    ``order_key`` tuples, and a sorted list of ``(due, id)`` pairs for pending
+    tasks whose due date is readable, with due dates parsed once into epoch
+    seconds. The IDs themselves are kept sorted too, so short ID prefixes are
+    resolved by binary search. Each indexed task remembers the values it was indexed under, so ``reindex`` can move a task between buckets after its
+    fields were changed in place (e.g. by ``setattr`` in ``update_task``).
+
+    The ``TextIndex`` used for query matching is the most expensive part to
+    build, so it is only built from ``tasks`` on the first text search and then
+    maintained incrementally. The ``TaskCounters`` behind the store statistics
+    are always kept current.
+    """
+    def __init__(self, tasks: Optional[Dict[str, Task]] = None):
+        self._tasks = tasks if tasks is not None else {}
+        self._text: Optional[TextIndex] = None
+        self._counters = TaskCounters()
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        self._by_priority: Dict[Optional[str], Set[str]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self._order: List[OrderKey] = []
+        self._due: List[Tuple[int, str]] = []
+        self._ids: List[str] = []
+        self._entries: Dict[str, Tuple[str, Optional[str], Tuple[str, ...], OrderKey, Optional[int]]] = {}
+
+    @classmethod
+    def build(cls, tasks: Dict[str, Task]) -> 'TaskIndex':
+        """Builds an index over the ``tasks`` dictionary in one pass plus a single sort."""
+        index = cls(tasks)
+        for task in tasks.values():
+            index._link(task)
+        index._sort()
+        index._counters = TaskCounters.build(tasks.values())
+        return index
+
+    @property
+    def text(self) -> TextIndex:
+        """The full-text index, built on first access."""
+        if self._text is None:
+            text = TextIndex()
+            for task in self._tasks.values():
+                text.add(task)
+            self._text = text
+        return self._text
+
+    @property
+    def counters(self) -> TaskCounters:
+        """The running counters behind the store statistics."""
+        return self._counters
+
+    def _sort(self) -> None:
+        self._ids = sorted(self._entries)
+        self._order = sorted(entry[3] for entry in self._entries.values())
+        self._due = sorted((entry[4], task_id) for task_id, entry in self._entries.items()
+                           if entry[4] is not None and entry[0] == 'pending')
+
+    @staticmethod
+    def _entry(task: Task) -> Tuple[str, Optional[str], Tuple[str, ...], OrderKey, Optional[int]]:
+        return (task.status, task.priority, tuple(dict.fromkeys(task.tags)), order_key(task), task_times(task)[1])
+
+    def _link(self, task: Task) -> Tuple[str, Optional[str], Tuple[str, ...], OrderKey, Optional[int]]:
+        if self._text is not None:
+            self._text.add(task)
+        entry = self._entries[task.id] = self._entry(task)
+        tags = entry[2]
+        self._by_status[task.status].add(task.id)
+        self._by_priority[task.priority].add(task.id)
+        for tag in tags:
+            self._by_tag[tag].add(task.id)
+        return entry
+
+    @staticmethod
+    def _discard(buckets: Dict, value, task_id: str) -> None:
+        bucket = buckets.get(value)
+        if bucket is not None:
+            bucket.discard(task_id)
+            if not bucket:
+                del buckets[value]
+
+    def add(self, task: Task) -> None:
+        """Indexes a newly stored task."""
+        status, _, _, key, due = self._link(task)
+        insort(self._ids, task.id)
+        insort(self._order, key)
+        if due is not None and status == 'pending':
+            insort(self._due, (due, task.id))
+        self._counters.add(task)
+
+    def remove(self, task_id: str) -> None:
+        """Drops a task from every index, using the values it was indexed under."""
+        if self._text is not None:
+            self._text.remove(task_id)
+        self._counters.remove(task_id)
+        status, priority, tags, key, due = self._entries.pop(task_id)
+        self._discard(self._by_status, status, task_id)
+        self._discard(self._by_priority, priority, task_id)
+        for tag in tags:
+            self._discard(self._by_tag, tag, task_id)
+        del self._ids[bisect_left(self._ids, task_id)]
+        del self._order[bisect_left(self._order, key)]
+        if due is not None and status == 'pending':
+            del self._due[bisect_left(self._due, (due, task_id))]
+
+    def reindex(self, task: Task) -> None:
+        """Brings the index up to date after ``task`` was modified in place."""
+        if self._entries[task.id] != self._entry(task):
+            self.remove(task.id)
+            self.add(task)
+        elif self._text is not None:
+            self._text.reindex(task)
+
+    def candidates(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Optional[Set[str]]:
+        """
+        Returns the IDs matching every given filter, or None if no filter was given.
+
+        A task matches ``tags`` if it carries any of them. The smallest ID set is
+        copied and then intersected with the others.
+        """
+        sets = []
+        if status:
+            sets.append(self._by_status.get(status, set()))
+        if priority:
+            sets.append(self._by_priority.get(priority, set()))
+        if tags:
+            sets.append(set().union(*(self._by_tag.get(tag, set()) for tag in tags)))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+        return result
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def count(self, field: str, value) -> int:
+        """Returns how many tasks have ``value`` as their status, priority or tag, without copying IDs."""
+        buckets = {'status': self._by_status, 'priority': self._by_priority, 'tag': self._by_tag}[field]
+        bucket = buckets.get(value)
+        return len(bucket) if bucket else 0
+
+    def ids_where(self, field: str, value) -> Set[str]:
+        """Returns a copy of the IDs whose status, priority or tag is ``value`` (None is a priority too)."""
+        buckets = {'status': self._by_status, 'priority': self._by_priority, 'tag': self._by_tag}[field]
+        return set(buckets.get(value, ()))
+
+    def due_count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Returns how many IDs ``due_ids(start, end)`` would return, by binary search alone."""
+        low = 0 if start is None else bisect_left(self._due, (start,))
+        high = len(self._due) if end is None else bisect_left(self._due, (end,))
+        return max(0, high - low)
+
+    def key_for(self, task_id: str) -> OrderKey:
+        """Returns the order key a task is currently indexed under."""
+        return self._entries[task_id][3]
+
+    def ids_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Returns up to ``limit`` indexed IDs starting with ``prefix``, in sorted order."""
+        ids = self._ids
+        position = bisect_left(ids, prefix)
+        stop = len(ids) if limit is None else min(len(ids), position + limit)
+        matches = []
+        while position < stop and ids[position].startswith(prefix):
+            matches.append(ids[position])
+            position += 1
+        return matches
+
+    def id_neighbours(self, task_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the indexed IDs sorting just before and just after ``task_id``."""
+        position = bisect_left(self._ids, task_id)
+        before = self._ids[position - 1] if position else None
+        if position < len(self._ids) and self._ids[position] == task_id:
+            position += 1
+        after = self._ids[position] if position < len(self._ids) else None
+        return before, after
+
+    def due_ids(self, start: Optional[int] = None, end: Optional[int] = None,
+                limit: Optional[int] = None) -> List[str]:
+        """
+        Returns the IDs of pending tasks due in ``[start, end)``, earliest first.
+
+        A missing bound leaves that side of the range open. Ties are broken by ID.
+        """
+        low = 0 if start is None else bisect_left(self._due, (start,))
+        high = len(self._due) if end is None else bisect_left(self._due, (end,))
+        if limit is not None:
+            high = min(high, low + limit)
+        return [task_id for _, task_id in self._due[low:high]]
+
+    def ordered_ids(self, offset: int = 0, limit: Optional[int] = None,
+                    after: Optional[OrderKey] = None) -> List[str]:
+        """Returns indexed IDs in default listing order, optionally a window of them."""
+        start = offset if after is None else bisect_right(self._order, after) + offset
+        stop = None if limit is None else start + limit
+        return [key[2] for key in self._order[start:stop]]
+
+    def order(self, ids: Optional[Set[str]], limit: Optional[int] = None,
+              after: Optional[OrderKey] = None,
+              where: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        Puts a subset of IDs into default listing order, keeping at most
+        ``limit`` of those that sort after the ``after`` key.
+
+        Small subsets are sorted by their keys; subsets covering a large part of
+        the store are instead filtered out of the already ordered key list.
+        ``ids=None`` stands for every indexed ID. If ``where`` is given, only
+        IDs it accepts are kept; it is called lazily, in order, until ``limit``
+        IDs were accepted.
+        """
+        if ids is not None and len(ids) * 8 < len(self._order):
+            keys = sorted(self.key_for(task_id) for task_id in ids)
+            start = 0 if after is None else bisect_right(keys, after)
+            if where is None:
+                stop = None if limit is None else start + limit
+                return [key[2] for key in keys[start:stop]]
+            matches = (key[2] for key in islice(keys, start, None) if where(key[2]))
+            return list(islice(matches, limit))
+        order = self._order
+        start = 0 if after is None else bisect_right(order, after)
+        # Indexing rather than islice, which would step through the skipped keys.
+        matches = (order[position][2] for position in range(start, len(order)))
+        if ids is not None:
+            matches = (task_id for task_id in matches if task_id in ids)
+        if where is not None:
+            matches = filter(where, matches)
+        return list(islice(matches, limit))
+
+
+class DeferredTaskIndex(TaskIndex):
+    """
+    ``TaskIndex`` that is only built when a query first needs it.
+
+    Until then, maintenance calls are no-ops: the eventual build reads the
+    tasks mapping as it is at that point. Stores that load tasks lazily use it
+    so that looking up or changing a single task never touches the others, and
+    ID prefixes are resolved by ``LazyTasks`` itself while the index is unbuilt.
+    """
+    def __init__(self, tasks: LazyTasks):
+        super().__init__(tasks)
+        self._built = False
+
+    def _ensure_built(self) -> None:
+        if not self._built:
+            self._built = True
+            for task in self._tasks.values():
+                self._link(task)
+            self._sort()
+            self._counters = TaskCounters.build(self._tasks.values())
+
+    @property
+    def text(self) -> TextIndex:
+        self._ensure_built()
+        return TaskIndex.text.fget(self)
+
+    @property
+    def counters(self) -> TaskCounters:
+        self._ensure_built()
+        return self._counters
+
+    def add(self, task: Task) -> None:
+        if self._built:
+            super().add(task)
+
+    def remove(self, task_id: str) -> None:
+        if self._built:
+            super().remove(task_id)
+
+    def reindex(self, task: Task) -> None:
+        if self._built:
+            super().reindex(task)
+
+    def candidates(self, *args, **kwargs) -> Optional[Set[str]]:
+        self._ensure_built()
+        return super().candidates(*args, **kwargs)
+
+    def __len__(self) -> int:
+        self._ensure_built()
+        return super().__len__()
+
+    def count(self, *args, **kwargs) -> int:
+        self._ensure_built()
+        return super().count(*args, **kwargs)
+
+    def ids_where(self, *args, **kwargs) -> Set[str]:
+        self._ensure_built()
+        return super().ids_where(*args, **kwargs)
+
+    def due_count(self, *args, **kwargs) -> int:
+        self._ensure_built()
+        return super().due_count(*args, **kwargs)
+
+    def key_for(self, task_id: str) -> OrderKey:
+        self._ensure_built()
+        return super().key_for(task_id)
+
+    def ordered_ids(self, *args, **kwargs) -> List[str]:
+        self._ensure_built()
+        return super().ordered_ids(*args, **kwargs)
+
+    def ids_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        if not self._built:
+            return self._tasks.ids_with_prefix(prefix, limit)
+        return super().ids_with_prefix(prefix, limit)
+
+    def id_neighbours(self, task_id: str) -> Tuple[Optional[str], Optional[str]]:
+        if not self._built:
+            return self._tasks.id_neighbours(task_id)
+        return super().id_neighbours(task_id)
+
+    def due_ids(self, *args, **kwargs) -> List[str]:
+        self._ensure_built()
+        return super().due_ids(*args, **kwargs)
+
+    def order(self, *args, **kwargs) -> List[str]:
+        self._ensure_built()
+        return super().order(*args, **kwargs)
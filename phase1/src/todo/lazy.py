@@ -0,0 +1,162 @@
+"""
+Lazily decoded task mapping for memory-mapped binary snapshots.
+
+``LazyTasks`` stands in for the ``Dict[str, Task]`` that the storage classes
+keep. Opening it only reads the snapshot header; a task is decoded the first
+time it is looked up and then kept in a small LRU cache. Tasks added or changed
+since the snapshot was written live in a plain dictionary next to it, and
+deleted IDs are remembered, so the snapshot itself is never modified.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterator, List, MutableMapping, Optional, Set, Tuple
+
+from src.todo.binformat import Snapshot, encode
+from src.todo.models import Task
+
+
+class LazyTasks(MutableMapping):
+    """
+    Task mapping over an optional ``Snapshot`` plus in-memory changes.
+
+    Storage code must assign a task back (``tasks[task.id] = task``) after
+    changing it in place, so the change is kept rather than living only in a
+    cache entry that may be evicted.
+    """
+    def __init__(self, snapshot: Optional[Snapshot] = None, cache_size: int = 1024):
+        self._snapshot = snapshot
+        self._cache_size = cache_size
+        self._cache: 'OrderedDict[str, Task]' = OrderedDict()
+        self._changed: Dict[str, Task] = {}
+        self._deleted: Set[str] = set()
+        self._added = 0
+
+    def _on_disk(self, task_id: str) -> bool:
+        return self._snapshot is not None and self._snapshot.find(task_id) is not None
+
+    def __getitem__(self, task_id: str) -> Task:
+        task = self._changed.get(task_id)
+        if task is not None:
+            return task
+        task = self._cache.get(task_id)
+        if task is not None:
+            self._cache.move_to_end(task_id)
+            return task
+        offset = None
+        if self._snapshot is not None and task_id not in self._deleted:
+            offset = self._snapshot.find(task_id)
+        if offset is None:
+            raise KeyError(task_id)
+        task = self._snapshot.task_at(offset)
+        self._cache[task_id] = task
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return task
+
+    def __contains__(self, task_id) -> bool:
+        if task_id in self._changed or task_id in self._cache:
+            return True
+        return task_id not in self._deleted and self._on_disk(task_id)
+
+    # Invariant: ``_deleted`` holds snapshot IDs only and never an ID in
+    # ``_changed``; ``_added`` counts the IDs in ``_changed`` not in the snapshot.
+    def __setitem__(self, task_id: str, task: Task) -> None:
+        if task_id not in self._changed:
+            self._cache.pop(task_id, None)
+            if task_id in self._deleted:
+                self._deleted.discard(task_id)
+            elif not self._on_disk(task_id):
+                self._added += 1
+        self._changed[task_id] = task
+
+    def __delitem__(self, task_id: str) -> None:
+        if task_id not in self:
+            raise KeyError(task_id)
+        self._cache.pop(task_id, None)
+        if self._on_disk(task_id):
+            self._deleted.add(task_id)
+        else:
+            self._added -= 1
+        self._changed.pop(task_id, None)
+
+    def __len__(self) -> int:
+        on_disk = self._snapshot.count if self._snapshot is not None else 0
+        return on_disk - len(self._deleted) + self._added
+
+    def _unchanged(self) -> Iterator[Tuple[str, int]]:
+        """Yields ``(id, offset)`` of snapshot records that are still current."""
+        if self._snapshot is None:
+            return
+        for task_id, offset in self._snapshot.scan():
+            if task_id not in self._deleted and task_id not in self._changed:
+                yield task_id, offset
+
+    def __iter__(self) -> Iterator[str]:
+        for task_id, _ in self._unchanged():
+            yield task_id
+        yield from list(self._changed)
+
+    def values(self) -> Iterator[Task]:
+        """Yields every task; snapshot records are decoded without filling the cache."""
+        for task_id, offset in self._unchanged():
+            task = self._cache.get(task_id)
+            yield task if task is not None else self._snapshot.task_at(offset)
+        yield from list(self._changed.values())
+
+    def items(self) -> Iterator[Tuple[str, Task]]:
+        for task in self.values():
+            yield task.id, task
+
+    def ids_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Returns up to ``limit`` current IDs starting with ``prefix``, in sorted order.
+
+        Snapshot IDs come from a binary search of its sorted ID section, so no
+        record other than the matching ones is read.
+        """
+        on_disk: List[str] = []
+        if self._snapshot is not None:
+            matches = (task_id for task_id in self._snapshot.ids_with_prefix(prefix)
+                       if task_id not in self._deleted)
+            on_disk = list(islice(matches, limit))
+        added = [task_id for task_id in self._changed if task_id.startswith(prefix)]
+        return sorted(set(on_disk).union(added))[:limit]
+
+    def id_neighbours(self, task_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the current IDs sorting just before and just after ``task_id``."""
+        before = max((other for other in self._changed if other < task_id), default=None)
+        after = min((other for other in self._changed if other > task_id), default=None)
+        if self._snapshot is not None:
+            ids = self._snapshot.sorted_ids
+            position = bisect_left(ids, task_id)
+            below = position - 1
+            while below >= 0 and ids[below] in self._deleted:
+                below -= 1
+            if below >= 0 and (before is None or ids[below] > before):
+                before = ids[below]
+            above = position
+            while above < len(ids) and (ids[above] == task_id or ids[above] in self._deleted):
+                above += 1
+            if above < len(ids) and (after is None or ids[above] < after):
+                after = ids[above]
+        return before, after
+
+    def encode(self) -> bytes:
+        """Encodes the current tasks, copying unchanged records over undecoded."""
+        return encode(self._changed.values(), base=self._snapshot, keep=self._unchanged())
+
+    def rebase(self, snapshot: Snapshot) -> None:
+        """Switches to a snapshot that already contains every change made so far."""
+        self.close()
+        self._snapshot = snapshot
+        self._cache.clear()
+        self._changed.clear()
+        self._deleted.clear()
+        self._added = 0
+
+    def close(self) -> None:
+        """Releases the mapped snapshot."""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
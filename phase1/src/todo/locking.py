@@ -0,0 +1,69 @@
+"""
+Advisory inter-process file locking.
+
+Several processes (the CLI, the TUI, agent workers) may share one task store.
+``FileLock`` serializes their read-modify-write cycles with an exclusive lock on
+a dedicated lock file: ``fcntl.flock`` on POSIX systems and ``msvcrt.locking``
+on Windows.
+"""
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Re-entrant exclusive lock backed by a lock file.
+
+    The lock is only held by this object while at least one ``with`` block is
+    active; nested blocks in the same process simply increase a counter.
+    """
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        self._fd = None
+        self._depth = 0
+
+    @property
+    def held(self) -> bool:
+        """Whether this process currently holds the lock."""
+        return self._depth > 0
+
+    def acquire(self) -> None:
+        """Blocks until the lock is held."""
+        if self._depth == 0:
+            if self._fd is None:
+                self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        self._depth += 1
+
+    def release(self) -> None:
+        """Releases one level of the lock, unlocking the file at the outermost level."""
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def close(self) -> None:
+        """Closes the lock file descriptor. The lock must not be held."""
+        if self._fd is not None and self._depth == 0:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -1,19 +1,73 @@
-from dataclasses import dataclass, field
-from typing import Optional, Literal, List
+import sys
+from typing import Callable, Dict, Iterable, Optional, Literal, List, Union
 import uuid
-from src.todo.utils import now_iso # Import now_iso
+from src.todo.utils import format_iso, now_epoch, parse_iso, uuid7
+
+# The public data attributes of a Task, in constructor order.
+TASK_FIELDS = ('title', 'id', 'description', 'status', 'priority', 'tags',
+               'created_at', 'modified_at', 'due_date')
+
+# How new task IDs are generated. 'uuid7' IDs sort in creation order.
+ID_SCHEMES: Dict[str, Callable[[], str]] = {
+    'uuid4': lambda: str(uuid.uuid4()),
+    'uuid7': uuid7,
+}
+_new_id = ID_SCHEMES['uuid4']
+
+
+def set_id_scheme(name: str) -> None:
+    """
+    Selects how new task IDs are generated: random 'uuid4' (the default) or time-ordered 'uuid7'.
+
+    Raises:
+        ValueError: If the scheme is unknown.
+    """
+    global _new_id
+    if name not in ID_SCHEMES:
+        raise ValueError(f"Invalid ID scheme: {name}. Must be one of {', '.join(ID_SCHEMES)}.")
+    _new_id = ID_SCHEMES[name]
+
+
+# A timestamp as stored on a Task: epoch seconds for values in the canonical
+# ``now_iso()`` format, the original string for anything else, or None.
+Stamp = Optional[Union[int, str]]
+
+
+def _intern(value):
+    """Interns strings so that repeated status, priority and tag values share one object."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _to_stamp(value) -> Stamp:
+    if value is None or type(value) is int:
+        return value
+    seconds = parse_iso(value)
+    return value if seconds is None else seconds
+
+
+def _render(stamp: Stamp) -> Optional[str]:
+    return format_iso(stamp) if type(stamp) is int else stamp
+
 
-@dataclass
 class Task:
     """
     Represents a single todo item in the system.
-    
-    This dataclass serves as the core data model. It automatically generates
+
+    This class serves as the core data model. It automatically generates
     unique IDs and creation timestamps for new tasks.
-    
+
+    Stores can hold millions of tasks, so the representation is compact:
+    instances use ``__slots__`` instead of a ``__dict__``, status, priority and
+    tag strings are interned so equal values share one object, and timestamps
+    are kept as integer epoch seconds. The attributes still read and accept
+    ISO 8601 strings; the string form is only rendered when an attribute is
+    read. Timestamps that are not in the ``now_iso()`` format (e.g. a due date
+    of ``2025-12-31``) are kept verbatim. The ``*_ts`` properties expose the
+    integer form directly.
+
     Attributes:
         title (str): The main summary of the task.
-        id (str): Unique UUID v4 identifier.
+        id (str): Unique UUID identifier (v4, or v7 with ``set_id_scheme('uuid7')``).
         description (Optional[str]): Detailed notes about the task.
         status (Literal['pending', 'completed']): Current state of execution.
         priority (Optional[Literal['high', 'medium', 'low']]): Urgency level.
@@ -22,15 +76,112 @@ class Task:
         modified_at (Optional[str]): ISO 8601 timestamp of last update.
         due_date (Optional[str]): Optional deadline.
     """
-    title: str
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    description: Optional[str] = None
-    status: Literal['pending', 'completed'] = 'pending'
-    priority: Optional[Literal['high', 'medium', 'low']] = 'medium'
-    tags: List[str] = field(default_factory=list)
-    created_at: str = field(default_factory=now_iso) # Use now_iso
-    modified_at: Optional[str] = None
-    due_date: Optional[str] = None
+    __slots__ = ('title', 'id', 'description', '_status', '_priority', '_tags',
+                 '_created_at', '_modified_at', '_due_date')
+
+    def __init__(
+        self,
+        title: str,
+        id: Optional[str] = None,
+        description: Optional[str] = None,
+        status: Literal['pending', 'completed'] = 'pending',
+        priority: Optional[Literal['high', 'medium', 'low']] = 'medium',
+        tags: Optional[Iterable[str]] = None,
+        created_at: Union[str, int, None] = None,
+        modified_at: Union[str, int, None] = None,
+        due_date: Union[str, int, None] = None,
+    ):
+        self.title = title
+        self.id = _new_id() if id is None else id
+        self.description = description
+        self._status = _intern(status)
+        self._priority = _intern(priority)
+        self._tags = [_intern(tag) for tag in tags] if tags else []
+        self._created_at = now_epoch() if created_at is None else _to_stamp(created_at)
+        self._modified_at = _to_stamp(modified_at)
+        self._due_date = _to_stamp(due_date)
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._status = _intern(value)
+
+    @property
+    def priority(self) -> Optional[str]:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: Optional[str]) -> None:
+        self._priority = _intern(value)
+
+    @property
+    def tags(self) -> List[str]:
+        return self._tags
+
+    @tags.setter
+    def tags(self, value: Iterable[str]) -> None:
+        self._tags = [_intern(tag) for tag in value]
+
+    @property
+    def created_at(self) -> str:
+        return _render(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value: Union[str, int]) -> None:
+        self._created_at = _to_stamp(value)
+
+    @property
+    def modified_at(self) -> Optional[str]:
+        return _render(self._modified_at)
+
+    @modified_at.setter
+    def modified_at(self, value: Union[str, int, None]) -> None:
+        self._modified_at = _to_stamp(value)
+
+    @property
+    def due_date(self) -> Optional[str]:
+        return _render(self._due_date)
+
+    @due_date.setter
+    def due_date(self, value: Union[str, int, None]) -> None:
+        self._due_date = _to_stamp(value)
+
+    @property
+    def created_ts(self) -> Optional[int]:
+        """Creation time in epoch seconds, or None if it is not in the canonical format."""
+        stamp = self._created_at
+        return stamp if type(stamp) is int else None
+
+    @property
+    def modified_ts(self) -> Optional[int]:
+        """Last modification time in epoch seconds, or None."""
+        stamp = self._modified_at
+        return stamp if type(stamp) is int else None
+
+    @property
+    def due_ts(self) -> Optional[int]:
+        """Due date in epoch seconds, or None if unset or not in the canonical format."""
+        stamp = self._due_date
+        return stamp if type(stamp) is int else None
+
+    def _fields(self) -> tuple:
+        return (self.title, self.id, self.description, self._status, self._priority, self._tags,
+                self._created_at, self._modified_at, self._due_date)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return (f"Task(title={self.title!r}, id={self.id!r}, description={self.description!r}, "
+                f"status={self._status!r}, priority={self._priority!r}, tags={self._tags!r}, "
+                f"created_at={self.created_at!r}, modified_at={self.modified_at!r}, due_date={self.due_date!r})")
 
     def to_dict(self):
         """Converts the task to a dictionary for JSON serialization."""
@@ -38,18 +189,18 @@ class Task:
             "id": self.id,
             "title": self.title,
             "description": self.description,
-            "status": self.status,
-            "priority": self.priority,
-            "tags": self.tags,
-            "created_at": self.created_at,
-            "modified_at": self.modified_at,
-            "due_date": self.due_date,
+            "status": self._status,
+            "priority": self._priority,
+            "tags": self._tags,
+            "created_at": _render(self._created_at),
+            "modified_at": _render(self._modified_at),
+            "due_date": _render(self._due_date),
         }
-    
+
     def get_status_emoji(self) -> str:
         """Returns a checkmark '✓' for completed tasks, space for pending."""
         return "✓" if self.status == "completed" else " "
-    
+
     def get_priority_color(self) -> str:
         """Returns a UI color string based on the task's priority."""
         if self.priority == "high":
@@ -59,4 +210,3 @@ class Task:
         elif self.priority == "low":
             return "green"
         return "white"
-
@@ -0,0 +1,483 @@
+"""
+Filter expressions over tasks.
+
+A filter is a boolean expression of field comparisons::
+
+    status=pending and (priority=high or tag:urgent) and due<2026-11-01
+
+``and`` binds tighter than ``or``, ``not`` negates the term after it and
+parentheses group; two terms written next to each other are joined by
+``and``. Keywords are case-insensitive. A value that contains spaces or
+parentheses is quoted with ``"`` or ``'``; inside quotes a backslash escapes
+the quote character or another backslash. ``quote_value`` quotes any string
+this way, for building expressions from user input.
+
+Fields and the operators they accept:
+
+    status, priority          = != :   (``priority=none`` matches tasks without one)
+    tag                       = != :   (the task carries the tag)
+    title, description, text  = != :   (``:`` is a case-insensitive substring match;
+                                        ``text`` is the title or the description)
+    due, created, modified    = != : < <= > >=   (ISO 8601; a plain date covers the
+                                        whole day, ``due=none`` matches tasks without one)
+    id                        = != :   (``:`` matches an ID prefix)
+
+``compile_filter`` parses an expression once into a ``TaskFilter``. Calling the
+filter tests a task; ``candidates`` plans it against a ``TaskIndex`` and
+``sql`` translates it for ``SQLiteStorage``.
+"""
+from functools import lru_cache
+import re
+from typing import Callable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from src.todo.columns import task_times
+from src.todo.indexes import TaskIndex
+from src.todo.models import Task
+from src.todo.utils import parse_date, validate_priority
+
+DAY = 86400
+
+_ALIASES = {'tags': 'tag', 'due_date': 'due', 'created_at': 'created', 'modified_at': 'modified'}
+_EQUALITY = {'=', '!=', ':'}
+_ORDERING = _EQUALITY | {'<', '<=', '>', '>='}
+FIELDS = {
+    'status': _EQUALITY, 'priority': _EQUALITY, 'tag': _EQUALITY, 'id': _EQUALITY,
+    'title': _EQUALITY, 'description': _EQUALITY, 'text': _EQUALITY,
+    'due': _ORDERING, 'created': _ORDERING, 'modified': _ORDERING,
+}
+TEXT_FIELDS = ('title', 'description', 'text')
+DATE_FIELDS = ('due', 'created', 'modified')
+STATUSES = ('pending', 'completed')
+
+_SPACE_RE = re.compile(r"\s*")
+_WORD_RE = re.compile(r"[A-Za-z_]+")
+_OPERATOR_RE = re.compile(r"!=|<=|>=|=|<|>|:")
+_VALUE_RE = re.compile(r"\"((?:[^\"\\]|\\.)*)\"|'((?:[^'\\]|\\.)*)'|([^\s()]+)")
+_ESCAPE_RE = re.compile(r"\\([\"'\\])")
+_PLAIN_DATE_RE = re.compile(r"\d{4}-\d\d-\d\d\Z")
+_FILTER_HINT_RE = re.compile(
+    r"\b(?:%s)\s*(?:!=|<=|>=|=|<|>|:)" % "|".join(sorted(set(FIELDS) | set(_ALIASES))), re.IGNORECASE)
+
+
+class Compare(NamedTuple):
+    """``field op value``; the value is already normalized for the field (see ``_normalize``)."""
+    field: str
+    op: str
+    value: object
+
+
+class And(NamedTuple):
+    terms: Tuple
+
+
+class Or(NamedTuple):
+    terms: Tuple
+
+
+class Not(NamedTuple):
+    term: object
+
+
+Node = Union[Compare, And, Or, Not]
+
+
+def quote_value(value: str) -> str:
+    """Quotes a comparison value so that the parser reads it back unchanged, whatever it contains."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def looks_like_filter(text: str) -> bool:
+    """True if ``text`` contains a field comparison, i.e. is meant as a filter expression."""
+    return bool(_FILTER_HINT_RE.search(text))
+
+
+def _normalize(field: str, op: str, value: str):
+    """
+    Validates a comparison value and converts it to the form the predicates use.
+
+    Priorities and due dates map ``none`` to None, dates become a half-open
+    ``(start, end)`` range in epoch seconds, and substring needles are lower-cased.
+    """
+    if field == 'status':
+        if value not in STATUSES:
+            raise ValueError(f"Invalid status: {value}. Must be 'pending' or 'completed'.")
+    elif field == 'priority':
+        if value.lower() == 'none':
+            return None
+        validate_priority(value)
+    elif field in DATE_FIELDS:
+        if value.lower() == 'none':
+            if op not in ('=', '!=', ':'):
+                raise ValueError(f"Only = and != can compare {field} with none.")
+            return None
+        start = parse_date(value)
+        if start is None:
+            raise ValueError(f"Invalid date: {value}. Use ISO 8601 (e.g. 2025-12-31 or 2025-12-31T09:00:00Z).")
+        return (start, start + (DAY if _PLAIN_DATE_RE.match(value.strip()) else 1))
+    elif field in TEXT_FIELDS and op == ':':
+        return value.lower()
+    return value
+
+
+class _Parser:
+    """Recursive-descent parser producing a ``Node`` tree."""
+    def __init__(self, expression: str):
+        self.text = expression
+        self.pos = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid filter {self.text!r} at position {self.pos + 1}: {message}")
+
+    def skip_space(self) -> None:
+        self.pos = _SPACE_RE.match(self.text, self.pos).end()
+
+    def at_end(self) -> bool:
+        self.skip_space()
+        return self.pos >= len(self.text)
+
+    def keyword(self, word: str) -> bool:
+        """Consumes ``word`` if it comes next as a whole keyword."""
+        self.skip_space()
+        match = _WORD_RE.match(self.text, self.pos)
+        if match and match.group().lower() == word:
+            self.pos = match.end()
+            return True
+        return False
+
+    def parse(self) -> Node:
+        if self.at_end():
+            raise self.error("empty expression")
+        node = self.parse_or()
+        if not self.at_end():
+            raise self.error(f"unexpected {self.text[self.pos]!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        terms = [self.parse_and()]
+        while self.keyword('or'):
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Or(tuple(terms))
+
+    def parse_and(self) -> Node:
+        terms = [self.parse_not()]
+        while True:
+            if self.keyword('and'):
+                terms.append(self.parse_not())
+            elif self.at_end() or self.text[self.pos] == ')' or self.keyword_ahead('or'):
+                break
+            else:
+                terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else And(tuple(terms))
+
+    def keyword_ahead(self, word: str) -> bool:
+        start = self.pos
+        found = self.keyword(word)
+        self.pos = start
+        return found
+
+    def parse_not(self) -> Node:
+        if self.keyword('not'):
+            return Not(self.parse_not())
+        self.skip_space()
+        if self.text.startswith('(', self.pos):
+            self.pos += 1
+            node = self.parse_or()
+            self.skip_space()
+            if not self.text.startswith(')', self.pos):
+                raise self.error("missing ')'")
+            self.pos += 1
+            return node
+        return self.parse_compare()
+
+    def parse_compare(self) -> Compare:
+        start = self.pos
+        match = _WORD_RE.match(self.text, self.pos)
+        if not match:
+            raise self.error("expected a field name")
+        field = match.group().lower()
+        field = _ALIASES.get(field, field)
+        if field not in FIELDS:
+            raise self.error(f"unknown field {match.group()!r}")
+        self.pos = match.end()
+        self.skip_space()
+        match = _OPERATOR_RE.match(self.text, self.pos)
+        if not match:
+            raise self.error(f"expected an operator after {field!r}")
+        op = match.group()
+        if op not in FIELDS[field]:
+            raise self.error(f"{field} does not support {op!r}")
+        self.pos = match.end()
+        self.skip_space()
+        match = _VALUE_RE.match(self.text, self.pos)
+        if not match:
+            raise self.error(f"expected a value after {field}{op}")
+        double, single, bare = match.groups()
+        value = bare if bare is not None else _ESCAPE_RE.sub(r"\1", single if double is None else double)
+        self.pos = match.end()
+        try:
+            return Compare(field, op, _normalize(field, op, value))
+        except ValueError as e:
+            self.pos = start
+            raise self.error(str(e))
+
+
+# --- Predicates ---
+
+def _date_getter(field: str) -> Callable[[Task], Optional[int]]:
+    if field == 'due':
+        return lambda task: task_times(task)[1]
+    if field == 'created':
+        return lambda task: task_times(task)[0]
+    return lambda task: task.modified_ts if task.modified_ts is not None else (
+        parse_date(task.modified_at) if task.modified_at else None)
+
+
+def _compile_compare(node: Compare) -> Callable[[Task], bool]:
+    field, op, value = node
+    if field in DATE_FIELDS:
+        when = _date_getter(field)
+        if value is None:
+            test = lambda task: when(task) is None
+        else:
+            start, end = value
+            low, high = _date_range('=' if op == '!=' else op, start, end)
+
+            def test(task: Task) -> bool:
+                seconds = when(task)
+                return seconds is not None and (low is None or seconds >= low) and (high is None or seconds < high)
+    elif field == 'tag':
+        test = lambda task: value in task.tags
+    elif field == 'id':
+        test = (lambda task: task.id.startswith(value)) if op == ':' else (lambda task: task.id == value)
+    elif field in TEXT_FIELDS:
+        if op == ':':
+            in_title = lambda task: value in task.title.lower()
+            in_description = lambda task: value in (task.description or "").lower()
+            test = {
+                'title': in_title,
+                'description': in_description,
+                'text': lambda task: in_title(task) or in_description(task),
+            }[field]
+        elif field == 'text':
+            test = lambda task: task.title == value or task.description == value
+        else:
+            test = lambda task: getattr(task, field) == value
+    else:
+        test = lambda task: getattr(task, field) == value
+    if op == '!=':
+        return lambda task: not test(task)
+    return test
+
+
+def _compile(node: Node) -> Callable[[Task], bool]:
+    if isinstance(node, Compare):
+        return _compile_compare(node)
+    if isinstance(node, Not):
+        inner = _compile(node.term)
+        return lambda task: not inner(task)
+    terms = [_compile(term) for term in node.terms]
+    if isinstance(node, And):
+        return lambda task: all(term(task) for term in terms)
+    return lambda task: any(term(task) for term in terms)
+
+
+# --- Planning against a TaskIndex ---
+
+def _required_status(node: Node) -> Optional[str]:
+    """Returns the status ``node`` requires of every matching task, or None."""
+    if isinstance(node, Compare):
+        return node.value if node.field == 'status' and node.op != '!=' else None
+    if isinstance(node, And):
+        return next((status for status in map(_required_status, node.terms) if status), None)
+    return None
+
+
+# An index access path: (upper bound on the number of IDs, function fetching them).
+Access = Tuple[int, Callable[[], Set[str]]]
+
+
+def _date_range(op: str, start: int, end: int) -> Tuple[Optional[int], Optional[int]]:
+    """Converts a comparison with the ``[start, end)`` range of a date to a half-open bound pair."""
+    return {
+        '=': (start, end), ':': (start, end),
+        '<': (None, start), '<=': (None, end), '>': (end, None), '>=': (start, None),
+    }[op]
+
+
+def _access(node: Node, index: TaskIndex, pending: bool = False) -> Optional[Access]:
+    """
+    Returns the cheapest way to fetch a superset of the IDs matching ``node``,
+    or None if no index narrows it.
+
+    An ``and`` uses its most selective indexed term, since the predicate checks
+    the others anyway; an ``or`` unites its terms' IDs and needs every term
+    indexed. ``pending`` is set below an ``and`` that also requires
+    ``status=pending``: only then can the due-date index, which holds pending
+    tasks alone, answer a comparison on ``due``.
+    """
+    if isinstance(node, Not):
+        return None
+    if isinstance(node, And):
+        pending = pending or _required_status(node) == 'pending'
+        paths = [path for path in (_access(term, index, pending) for term in node.terms) if path is not None]
+        return min(paths, key=lambda path: path[0]) if paths else None
+    if isinstance(node, Or):
+        paths = []
+        for term in node.terms:
+            path = _access(term, index, pending)
+            if path is None:
+                return None  # one unindexed branch may match anything
+            paths.append(path)
+        return sum(size for size, _ in paths), lambda: set().union(*(fetch() for _, fetch in paths))
+
+    field, op, value = node
+    if op == '!=':
+        return None
+    if field in ('status', 'priority', 'tag'):
+        return index.count(field, value), lambda: index.ids_where(field, value)
+    if field in TEXT_FIELDS:
+        # Exact title and description matches contain the value too.
+        return index.text.estimate(value), lambda: index.text.search(value)
+    if field == 'id':
+        ids = set(index.ids_with_prefix(value))
+        return len(ids), lambda: ids
+    if field == 'due' and pending and value is not None:
+        low, high = _date_range(op, *value)
+        return index.due_count(low, high), lambda: set(index.due_ids(low, high))
+    return None
+
+
+# --- SQL translation ---
+
+# The due expression must match idx_tasks_pending_due in SQLiteStorage for the index to be used.
+_SQL_DATES = {
+    'due': "CAST(strftime('%s', due_date) AS INTEGER)",
+    'created': "CAST(strftime('%s', t.created_at) AS INTEGER)",
+    'modified': "CAST(strftime('%s', t.modified_at) AS INTEGER)",
+}
+_SQL_CONTAINS = {
+    'title': "instr(lower(t.title), ?) > 0",
+    'description': "instr(lower(coalesce(t.description, '')), ?) > 0",
+}
+
+
+def _sql_compare(node: Compare) -> Tuple[str, List[object]]:
+    field, op, value = node
+    if field in DATE_FIELDS:
+        column = _SQL_DATES[field]
+        if value is None:
+            return f"{column} IS NULL", []
+        start, end = value
+        return {
+            '=': (f"{column} >= ? AND {column} < ?", [start, end]),
+            ':': (f"{column} >= ? AND {column} < ?", [start, end]),
+            '!=': (f"{column} >= ? AND {column} < ?", [start, end]),
+            '<': (f"{column} < ?", [start]),
+            '<=': (f"{column} < ?", [end]),
+            '>': (f"{column} >= ?", [end]),
+            '>=': (f"{column} >= ?", [start]),
+        }[op]
+    if field == 'tag':
+        return "EXISTS (SELECT 1 FROM task_tags tt WHERE tt.task_id = t.id AND tt.tag = ?)", [value]
+    if field == 'id':
+        if op == ':':
+            return "t.id >= ? AND t.id < ?", [value, value + "\uffff"]
+        return "t.id = ?", [value]
+    if field in TEXT_FIELDS:
+        if op == ':':
+            if field == 'text':
+                return f"({_SQL_CONTAINS['title']} OR {_SQL_CONTAINS['description']})", [value, value]
+            return _SQL_CONTAINS[field], [value]
+        if field == 'text':
+            return "(t.title = ? OR t.description = ?)", [value, value]
+        return f"t.{field} = ?", [value]
+    if value is None:
+        return f"t.{field} IS NULL", []
+    return f"t.{field} = ?", [value]
+
+
+def _sql(node: Node, negated: bool = False) -> Tuple[str, List[object]]:
+    """
+    Translates ``node`` to an SQL condition over ``tasks t``.
+
+    A comparison on a missing value is NULL in SQL but false in Python. That
+    only makes a difference under a negation, so only there are comparisons
+    wrapped in ``coalesce``; elsewhere they stay plain for the indexes to match.
+    """
+    if isinstance(node, Not):
+        condition, params = _sql(node.term, not negated)
+        return f"NOT ({condition})", params
+    if isinstance(node, (And, Or)):
+        parts = [_sql(term, negated) for term in node.terms]
+        joiner = " AND " if isinstance(node, And) else " OR "
+        return "(" + joiner.join(f"({condition})" for condition, _ in parts) + ")", [
+            param for _, params in parts for param in params]
+    condition, params = _sql_compare(node)
+    if node.op == '!=':
+        return f"NOT coalesce(({condition}), 0)", params
+    if negated:
+        return f"coalesce(({condition}), 0)", params
+    return condition, params
+
+
+class TaskFilter:
+    """
+    A parsed filter expression.
+
+    Calling the filter with a task tells whether the task matches. The parse
+    tree is kept in ``tree``; ``expression`` is the source text, and
+    ``status`` the status every matching task has, if the expression requires one.
+    """
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tree = _Parser(expression).parse()
+        self.status = _required_status(self.tree)
+        self._matches = _compile(self.tree)
+
+    def __call__(self, task: Task) -> bool:
+        return self._matches(task)
+
+    def __repr__(self) -> str:
+        return f"TaskFilter({self.expression!r})"
+
+    def candidates(self, index: TaskIndex, limit: Optional[int] = None) -> Optional[Set[str]]:
+        """
+        Plans the filter against a ``TaskIndex``.
+
+        Returns a superset of the matching IDs, fetched from the status,
+        priority, tag, text, ID or due-date index, or None if the store should
+        be scanned in listing order instead. That is the case when no index
+        narrows the expression (``not``, ``!=`` and dates other than pending
+        due dates are never indexed), and also when only ``limit`` matches are
+        wanted and the index would return so many IDs that a scan, which stops
+        after ``limit`` matches, is expected to be cheaper.
+        """
+        path = _access(self.tree, index)
+        if path is None:
+            return None
+        size, fetch = path
+        # A scan visits about limit * total / size tasks to find limit matches.
+        if limit is not None and size * size > limit * len(index):
+            return None
+        return fetch()
+
+    def sql(self) -> Tuple[str, List[object]]:
+        """Returns an SQL condition over ``tasks t`` and its parameters."""
+        return _sql(self.tree)
+
+
+@lru_cache(maxsize=128)
+def _parse(expression: str) -> TaskFilter:
+    return TaskFilter(expression)
+
+
+def compile_filter(where: Union[str, TaskFilter]) -> TaskFilter:
+    """
+    Returns the ``TaskFilter`` for an expression, reusing recently parsed ones.
+
+    Raises:
+        ValueError: If the expression is not a valid filter.
+    """
+    if isinstance(where, TaskFilter):
+        return where
+    return _parse(where)
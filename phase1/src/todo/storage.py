@@ -1,9 +1,101 @@
-from typing import List, Optional, Dict
-from src.todo.models import Task
-from src.todo.utils import now_iso, validate_priority
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional, Dict, Iterator, Tuple, Union
+from src.todo import binformat
+from src.todo.columns import WEEK, TaskColumns, with_default_keys
+from src.todo.cursors import decode_cursor, encode_cursor, order_key
+from src.todo.events import ADDED, DELETED, RELOADED, UPDATED, ChangeEvent, ChangeFeed, Subscriber, field_diff
+from src.todo.history import REDO, UNDO, TaskHistory, step_changes
+from src.todo.models import TASK_FIELDS, Task
+from src.todo.query import TaskFilter, compile_filter
+from src.todo.indexes import DeferredTaskIndex, TaskIndex, unique_prefix
+from src.todo.lazy import LazyTasks
+from src.todo.locking import FileLock
+from src.todo.utils import now_epoch, now_iso, validate_priority
+import atexit
+from itertools import takewhile
 import json
+import mmap
 from pathlib import Path
 import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+DURABILITY_LEVELS = ('none', 'flush', 'fsync')
+STORAGE_FORMATS = ('json', 'binary')
+SNAPSHOT_NAMES = {'json': 'tasks.json', 'binary': 'tasks.bin'}
+
+
+def _sync(f, durability: str) -> None:
+    """Pushes an open file's buffered writes as far down as ``durability`` asks."""
+    if durability in ('flush', 'fsync'):
+        f.flush()
+    if durability == 'fsync':
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Makes a rename inside ``directory`` durable, where the platform allows it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: Path, write: Callable, durability: str = 'fsync', mode: str = 'w') -> None:
+    """
+    Replaces ``path`` with the output of ``write(f)`` without ever exposing a partial file.
+
+    The data goes to a temporary file in the same directory, which is synced
+    according to ``durability`` and then renamed over ``path`` in one step. A
+    crash at any point leaves either the old or the new file in place.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+            _sync(f, durability)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    if durability == 'fsync':
+        _fsync_dir(path.parent)
+
+# How many candidates an ambiguous ID prefix error lists.
+AMBIGUOUS_SHOWN = 5
+# Sorts before the order key of every completed task and after every pending one.
+_COMPLETED_START = (True, '', '')
+
+
+class AmbiguousIDError(ValueError):
+    """Raised when a short ID prefix matches more than one task."""
+    def __init__(self, prefix: str, candidates: List[str]):
+        self.prefix = prefix
+        self.candidates = candidates
+        shown = ", ".join(candidates[:AMBIGUOUS_SHOWN]) + (", ..." if len(candidates) > AMBIGUOUS_SHOWN else "")
+        super().__init__(f"ID prefix '{prefix}' is ambiguous; it matches {shown}")
+
+
+def _pick_id(prefix: str, candidates: List[str]) -> str:
+    """Returns the single candidate for ``prefix``, or raises KeyError / AmbiguousIDError."""
+    if not prefix or not candidates:
+        raise KeyError(f"Task with ID {prefix} not found.")
+    if len(candidates) > 1:
+        raise AmbiguousIDError(prefix, candidates)
+    return candidates[0]
+
 
 class InMemoryStorage:
     """
@@ -12,9 +104,165 @@ class InMemoryStorage:
     This class stores tasks in a Python dictionary. It is primarily used for
     testing or for temporary sessions where persistence is not required.
     All data is lost when the application terminates.
+
+    Status, priority and tag lookups go through a maintained ``TaskIndex`` so
+    filtered searches only touch matching tasks.
+
+    Mutations made inside ``batch()`` are applied immediately but can be rolled
+    back as a unit; persistent subclasses also defer writing them until the
+    batch ends.
+
+    Every mutation is published on a change feed (see ``src.todo.events``):
+    ``subscribe`` registers a callback for batches of change events, and
+    ``version`` / ``changes_since`` let a consumer catch up by polling. The
+    events of a batch are published together when it commits.
+
+    With ``history=True`` the changes are also kept in an event history (see
+    ``src.todo.history``), which backs ``undo``, ``redo`` and ``state_at``.
     """
-    def __init__(self):
+    def __init__(self, history: bool = False):
         self._tasks: Dict[str, Task] = {}
+        self._index = TaskIndex(self._tasks)
+        self._undo_log: Optional[List[Callable[[], None]]] = None
+        self._feed = ChangeFeed()
+        self._history: Optional[TaskHistory] = None
+        if history:
+            self._start_history()
+
+    def _rebuild_index(self) -> None:
+        """Rebuilds the secondary indexes from the current task dictionary."""
+        self._index = TaskIndex.build(self._tasks)
+
+    def _record_undo(self, undo: Callable[[], None]) -> None:
+        """Remembers how to revert a mutation while a batch is open."""
+        if self._undo_log is not None:
+            self._undo_log.append(undo)
+
+    def _begin_batch(self) -> None:
+        """Called once when the outermost batch starts."""
+
+    def _commit_batch(self) -> None:
+        """Called once when the outermost batch succeeds. Nothing to persist in memory."""
+
+    def _abort_batch(self) -> None:
+        """Called once when the outermost batch is rolled back."""
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups mutations into a single unit.
+
+        If the block raises, or the batch cannot be committed, every mutation
+        made inside it is reverted and the exception propagates. Nested
+        batches join the outermost one.
+        """
+        if self._undo_log is not None:
+            yield self
+            return
+        self._undo_log = []
+        self._feed.hold()
+        self._begin_batch()
+        try:
+            yield self
+            self._commit_batch()
+        except BaseException:
+            undo_log, self._undo_log = self._undo_log, None
+            for undo in reversed(undo_log):
+                undo()
+            self._feed.discard()
+            self._abort_batch()
+            raise
+        self._undo_log = None
+        self._feed.release()
+
+    @property
+    def version(self) -> int:
+        """Number of changes published so far; it only ever grows."""
+        return self._feed.version
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Calls ``callback`` with a list of ``ChangeEvent`` after every change.
+
+        A batch (or a bulk operation) is delivered as one list. Returns a
+        function that unsubscribes the callback.
+        """
+        return self._feed.subscribe(callback)
+
+    def changes_since(self, version: int) -> Optional[List[ChangeEvent]]:
+        """Returns the change events after ``version``, or None if they are too old to replay."""
+        return self._feed.changes_since(version)
+
+    def _start_history(self, directory: Optional[Path] = None, **options) -> None:
+        self._history = TaskHistory(lambda: self._tasks, directory, **options)
+        self._feed.subscribe(self._history.record)
+
+    @property
+    def history(self) -> Optional[TaskHistory]:
+        """The event history of this store, or None if it was opened without ``history=True``."""
+        return self._history
+
+    def _require_history(self) -> TaskHistory:
+        if self._history is None:
+            raise ValueError("History is not enabled for this store.")
+        return self._history
+
+    def undo(self) -> int:
+        """
+        Reverts the most recent change, or batch of changes, that is not undone yet.
+
+        Returns the number of task changes made, 0 if there is nothing to undo.
+        Tasks that were deleted (or re-added) since are left as they are.
+
+        Raises:
+            ValueError: If history is disabled or a batch is open.
+        """
+        return self._history_step(UNDO)
+
+    def redo(self) -> int:
+        """Re-applies the most recently undone change or batch; returns the number of task changes made."""
+        return self._history_step(REDO)
+
+    def _history_step(self, kind: str) -> int:
+        history = self._require_history()
+        if self._undo_log is not None:
+            raise ValueError(f"Cannot {kind} inside a batch.")
+        applied = 0
+        try:
+            with self.batch():
+                entries = history.begin(kind)
+                if entries is None:
+                    return 0
+                for op, task_id, value in step_changes(entries, kind):
+                    if op == 'update':
+                        if task_id in self._tasks and value:
+                            self.update_task(task_id, **value)
+                            applied += 1
+                    elif op == 'delete':
+                        if task_id in self._tasks:
+                            self.delete_task(task_id)
+                            applied += 1
+                    elif task_id not in self._tasks:
+                        self.add_task(value)
+                        applied += 1
+                if not applied:
+                    history.skip()
+        except BaseException:
+            history.cancel()
+            raise
+        return applied
+
+    def state_at(self, timestamp: int) -> List[Task]:
+        """
+        Returns the tasks as they were at ``timestamp`` (epoch seconds), in listing order.
+
+        The state is rebuilt from the nearest history snapshot taken before that
+        time plus the events recorded after it.
+
+        Raises:
+            ValueError: If history is disabled or ``timestamp`` is before it starts.
+        """
+        return self._require_history().state_at(timestamp)
 
     def add_task(self, task: Task) -> None:
         """Add a new task to storage."""
@@ -23,35 +271,126 @@ class InMemoryStorage:
         if task.id in self._tasks:
             raise ValueError(f"Task with ID {task.id} already exists.")
         self._tasks[task.id] = task
+        self._index.add(task)
+        self._record_undo(lambda: self._unlink(task.id))
+        self._feed.record(ADDED, task.id, task)
+
+    def _unlink(self, task_id: str) -> None:
+        del self._tasks[task_id]
+        self._index.remove(task_id)
 
     def delete_task(self, task_id: str) -> None:
         """Delete a task by ID."""
         if task_id not in self._tasks:
             raise KeyError(f"Task with ID {task_id} not found.")
-        del self._tasks[task_id]
+        task = self._tasks[task_id]
+        self._unlink(task_id)
+        self._record_undo(lambda: self._relink(task))
+        self._feed.record(DELETED, task_id, task)
 
-    def update_task(self, task_id: str, **kwargs) -> Task:
-        """Update a task's fields."""
+    def _relink(self, task: Task) -> None:
+        self._tasks[task.id] = task
+        self._index.add(task)
+
+    def _apply_update(self, task_id: str, fields: dict) -> Tuple[Task, dict]:
+        """Validates and applies ``fields`` to a task, returning it with the changed fields."""
         if task_id not in self._tasks:
             raise KeyError(f"Task with ID {task_id} not found.")
 
         task = self._tasks[task_id]
-        updated = False
-        for key, value in kwargs.items():
-            if hasattr(task, key):
-                if key == 'priority':
-                    validate_priority(value)
-                setattr(task, key, value)
-                updated = True
-        
-        if updated:
-            task.modified_at = now_iso()
+        if 'priority' in fields:
+            validate_priority(fields['priority'])
+        # The ID is the dictionary key and cannot be changed in place.
+        changed = {key: value for key, value in fields.items() if key in TASK_FIELDS and key != 'id'}
+        if not changed:
+            return task, changed
+
+        previous = {key: getattr(task, key) for key in changed}
+        previous.setdefault('modified_at', task.modified_at)
+        for key, value in changed.items():
+            setattr(task, key, value)
+        task.modified_at = now_iso()
+        changed['modified_at'] = task.modified_at
+        # Store it back: a lazily loaded task dictionary only keeps changes made this way.
+        self._tasks[task_id] = task
+        self._index.reindex(task)
+        self._record_undo(lambda: self._restore(task, previous))
+        self._feed.record(UPDATED, task_id, task, field_diff(task, previous))
+        return task, changed
+
+    def _restore(self, task: Task, fields: dict) -> None:
+        for key, value in fields.items():
+            setattr(task, key, value)
+        self._tasks[task.id] = task
+        self._index.reindex(task)
+
+    def update_task(self, task_id: str, **kwargs) -> Task:
+        """Update a task's fields."""
+        task, _ = self._apply_update(task_id, kwargs)
         return task
 
-    def list_tasks(self) -> List[Task]:
-        """List all tasks, sorted by completion status and creation date."""
-        return sorted(list(self._tasks.values()), 
-                     key=lambda task: (task.status == 'completed', task.created_at))
+    def add_tasks(self, tasks: Iterable[Task]) -> List[Task]:
+        """
+        Add several tasks at once.
+
+        Every task is validated before any is stored, and the whole set is
+        persisted once. Returns the added tasks.
+        """
+        tasks = list(tasks)
+        with self.batch():
+            seen = set()
+            for task in tasks:
+                if not task.title:
+                    raise ValueError("Task title cannot be empty.")
+                if task.id in self._tasks or task.id in seen:
+                    raise ValueError(f"Task with ID {task.id} already exists.")
+                seen.add(task.id)
+            for task in tasks:
+                self.add_task(task)
+        return tasks
+
+    def update_tasks(self, updates: Dict[str, dict]) -> List[Task]:
+        """
+        Update several tasks at once, given a mapping of task ID to fields.
+
+        Every ID and priority is validated before any task is changed, and the
+        changes are persisted once. Returns the updated tasks.
+        """
+        with self.batch():
+            for task_id, fields in updates.items():
+                if task_id not in self._tasks:
+                    raise KeyError(f"Task with ID {task_id} not found.")
+                if 'priority' in fields:
+                    validate_priority(fields['priority'])
+            return [self.update_task(task_id, **fields) for task_id, fields in updates.items()]
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        """
+        Delete several tasks at once.
+
+        Every ID is checked before any task is removed, and the deletions are
+        persisted once. Returns the number of tasks deleted (repeated IDs count once).
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        with self.batch():
+            for task_id in task_ids:
+                if task_id not in self._tasks:
+                    raise KeyError(f"Task with ID {task_id} not found.")
+            for task_id in task_ids:
+                self.delete_task(task_id)
+        return len(task_ids)
+
+    def list_tasks(self, limit: Optional[int] = None, offset: int = 0,
+                   after: Optional[str] = None) -> List[Task]:
+        """
+        List tasks, sorted by completion status and creation date.
+
+        The order is maintained by the index, so returning the first ``limit``
+        tasks after ``offset`` (or after the ``after`` cursor) does not sort or
+        copy the whole store.
+        """
+        after_key = decode_cursor(after) if after else None
+        return [self._tasks[task_id] for task_id in self._index.ordered_ids(offset, limit, after_key)]
 
     def get_task(self, task_id: str) -> Task:
         """Get a single task by ID."""
@@ -59,135 +398,1122 @@ class InMemoryStorage:
             raise KeyError(f"Task with ID {task_id} not found.")
         return self._tasks[task_id]
 
+    def resolve_id(self, prefix: str) -> str:
+        """
+        Expands a unique prefix of a task ID (such as a short ID) to the full ID.
+
+        An exact ID is returned as is. The prefix is looked up in the sorted ID
+        index, in O(log N).
+
+        Raises:
+            KeyError: If no task ID starts with ``prefix``.
+            AmbiguousIDError: If several do; the error lists some candidates.
+        """
+        if prefix in self._tasks:
+            return prefix
+        return _pick_id(prefix, self._index.ids_with_prefix(prefix, AMBIGUOUS_SHOWN + 1))
+
+    def short_id(self, task_id: str, min_length: int = 8) -> str:
+        """Returns the shortest prefix of ``task_id`` (at least ``min_length`` long) that ``resolve_id`` accepts."""
+        return unique_prefix(task_id, self._index.id_neighbours(task_id), min_length)
+
+    def short_ids(self, task_ids: Iterable[str], min_length: int = 8) -> List[str]:
+        """Returns the ``short_id`` of each ID, in order; a listing needs one call instead of one per row."""
+        index = self._index
+        return [unique_prefix(task_id, index.id_neighbours(task_id), min_length) for task_id in task_ids]
+
     def search_tasks(
         self,
         query: Optional[str] = None,
         status: Optional[str] = None,
         priority: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        ranked: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
     ) -> List[Task]:
-        """Search tasks with optional filters."""
-        results = []
-        for task in self._tasks.values():
-            match = True
-            if query:
-                if query.lower() not in task.title.lower() and \
-                   (task.description is None or query.lower() not in task.description.lower()):
-                    match = False
-            if status and task.status != status:
-                match = False
-            if priority and task.priority != priority:
-                match = False
-            if tags and not any(tag in task.tags for tag in tags):
-                match = False
-            
-            if match:
-                results.append(task)
-        
-        return sorted(results, key=lambda task: (task.status == 'completed', task.created_at))
-
-
-
-class FileStorage:
+        """
+        Search tasks with optional filters.
+
+        With ``ranked=True`` and a ``query``, results are ordered by relevance
+        (whole-word and title matches first) instead of the default listing order.
+        ``limit`` and the ``after`` cursor page through results in listing order.
+        """
+        after_key = decode_cursor(after) if after else None
+        if status == 'completed' and not ranked and (after_key is None or after_key < _COMPLETED_START):
+            after_key = _COMPLETED_START
+        candidates = self._index.candidates(status=status, priority=priority, tags=tags)
+        if query:
+            candidates = self._index.text.search(query, within=candidates)
+
+        if candidates is None:
+            ordered = self._index.ordered_ids(limit=limit, after=after_key)
+        elif ranked and query:
+            if after_key is not None:
+                raise ValueError("Cursor pagination is not supported for ranked search.")
+            score = self._index.text.score
+            key_for = self._index.key_for
+            ordered = sorted(candidates, key=lambda task_id: (-score(task_id, query), key_for(task_id)))[:limit]
+        else:
+            ordered = self._index.order(candidates, limit=limit, after=after_key)
+        return [self._tasks[task_id] for task_id in ordered]
+
+    def filter_tasks(self, where: Union[str, TaskFilter], limit: Optional[int] = None,
+                     after: Optional[str] = None) -> List[Task]:
+        """
+        Lists the tasks matching a filter expression (see ``src.todo.query``), in listing order.
+
+        The expression is planned against the indexes (see
+        ``TaskFilter.candidates``): the candidate IDs they yield are checked
+        with the compiled predicate in listing order until ``limit`` tasks
+        matched. Without candidates, the listing order is scanned the same way.
+
+        Raises:
+            ValueError: If the expression is not a valid filter.
+        """
+        task_filter = compile_filter(where)
+        after_key = decode_cursor(after) if after else None
+        if task_filter.status == 'completed' and (after_key is None or after_key < _COMPLETED_START):
+            # Completed tasks sort after every pending one; a scan can skip those.
+            after_key = _COMPLETED_START
+        tasks = self._tasks
+        ordered = self._index.order(task_filter.candidates(self._index, limit), limit=limit, after=after_key,
+                                    where=lambda task_id: task_filter(tasks[task_id]))
+        return [tasks[task_id] for task_id in ordered]
+
+    def statistics(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        """
+        Returns counts and histograms over all tasks, as described in ``TaskColumns.stats``.
+
+        They are read from the running counters kept next to the other indexes,
+        so the cost does not grow with the number of tasks.
+        """
+        return self._index.counters.stats(now, weeks)
+
+    def due_between(self, start: Optional[int] = None, end: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Task]:
+        """
+        Returns pending tasks due in ``[start, end)`` (epoch seconds), earliest first.
+
+        Either bound may be None to leave the range open on that side. Tasks
+        whose due date cannot be read as a date are never returned. The range is
+        read from the due-date index, so a reminder job can ask for what fell
+        due since its last run without scanning the store.
+        """
+        return [self._tasks[task_id] for task_id in self._index.due_ids(start, end, limit)]
+
+    def overdue(self, now: Optional[int] = None, limit: Optional[int] = None) -> List[Task]:
+        """Returns pending tasks whose due date has passed, most overdue first."""
+        return self.due_between(None, now_epoch() if now is None else now, limit)
+
+    def next_due(self, k: int = 1, now: Optional[int] = None) -> List[Task]:
+        """Returns the ``k`` pending tasks that fall due next, from ``now`` on."""
+        return self.due_between(now_epoch() if now is None else now, None, k)
+
+    def check_statistics(self, now: Optional[int] = None, weeks: int = 8) -> Dict[str, Tuple[object, object]]:
+        """
+        Recomputes the statistics from scratch and compares them with the running counters.
+
+        Returns ``{key: (counted, recomputed)}`` for every value that differs,
+        so an empty dictionary means the counters are consistent.
+        """
+        now = now_epoch() if now is None else now
+        counted = self.statistics(now, weeks)
+        recomputed = TaskColumns.build(self._tasks.values()).stats(now, weeks)
+        return {key: (counted.get(key), recomputed.get(key))
+                for key in counted.keys() | recomputed.keys()
+                if counted.get(key) != recomputed.get(key)}
+
+    def cursor_for(self, task: Task) -> str:
+        """Returns a cursor that continues a listing right after ``task``."""
+        return encode_cursor(order_key(task))
+
+    def iter_tasks(
+        self,
+        query: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        batch_size: int = 500,
+        where: Union[str, TaskFilter, None] = None
+    ) -> Iterator[Task]:
+        """
+        Yields matching tasks in listing order, one page at a time.
+
+        Each page is fetched with a cursor taken before the page is yielded, so
+        the caller may modify or delete the tasks it receives while iterating.
+        ``where`` is a filter expression, used instead of the other filters.
+        """
+        filtered = query or status or priority or tags
+        if where is not None:
+            where = compile_filter(where)
+        while True:
+            if where is not None:
+                page = self.filter_tasks(where, limit=batch_size, after=after)
+            elif filtered:
+                page = self.search_tasks(query=query, status=status, priority=priority, tags=tags,
+                                         limit=batch_size, after=after)
+            else:
+                page = self.list_tasks(limit=batch_size, after=after)
+            if not page:
+                return
+            after = self.cursor_for(page[-1])
+            yield from page
+            if len(page) < batch_size:
+                return
+
+
+
+class FileStorage(InMemoryStorage):
     """
     Persistent, file-based storage backend.
     
     This class saves tasks to a JSON file in the user's home directory
     (~/.todo_cli/tasks.json). It ensures that data survives application restarts.
     It loads data on initialization and saves on every modification.
+
+    In journaled mode (``journal=True``) a mutation no longer rewrites the whole
+    file. Instead a single record is appended to ``tasks.journal`` and the
+    snapshot in ``tasks.json`` is only rewritten during compaction, which runs
+    once the journal holds at least as many records as the store holds tasks
+    (and never before ``compact_every`` records). This keeps the amortized write
+    cost per operation constant regardless of store size.
+
+    Snapshots are written to a temporary file and atomically renamed over
+    ``tasks.json``, so an interrupted write never leaves a truncated store.
+    ``durability`` trades throughput for safety: ``'none'`` leaves buffering to
+    Python and the OS, ``'flush'`` (the default) hands every write to the OS so
+    it survives a crash of this process, and ``'fsync'`` also forces it to disk
+    so it survives a power loss. A snapshot that still fails to parse is moved
+    aside instead of being overwritten by the next save.
+
+    Several processes can share one store. With ``locking`` enabled (the
+    default), every mutation runs under an exclusive lock on ``tasks.lock`` and
+    first catches up with changes made by other processes. Those changes are
+    detected by comparing the inode, mtime and size of the store files with the
+    values seen after the last load or write, so an unchanged store is never
+    re-read; if only the journal grew, just its new tail is replayed.
+
+    In write-behind mode (``write_behind=True``) mutations only change memory
+    and return. A background thread persists the accumulated changes every
+    ``flush_interval`` seconds, or as soon as ``flush_threshold`` of them are
+    waiting. Changes made in the last interval are lost on a hard crash;
+    ``flush()``, ``close()`` and an ``atexit`` hook write them out otherwise. If
+    another process changes the store meanwhile, the held-back changes are
+    re-applied on top of its state before they are written.
+
+    ``format='binary'`` keeps the snapshot in ``tasks.bin`` using the compact
+    record format of ``src.todo.binformat`` instead of indented JSON. Without an
+    explicit format the store uses ``tasks.bin`` if it exists, so a store
+    converted with ``convert_store`` is picked up automatically.
+
+    With ``lazy=True`` a binary snapshot is memory-mapped instead of parsed:
+    opening the store reads only its header, a task is decoded when it is first
+    looked up (through the ID index at the end of the file) and the
+    ``cache_size`` most recently used tasks stay decoded. The secondary indexes
+    are built on the first listing or search, so commands that touch a single
+    task stay fast regardless of the store size. Laziness never picks the
+    format: a new lazy store is JSON, loaded eagerly, unless ``format='binary'``
+    is given or the store has been converted.
+    Lazily loaded tasks may be decoded afresh on each lookup, so change them
+    through ``update_task`` rather than by mutating a returned object.
+
+    With ``history=True`` the event history lives in the ``history``
+    subdirectory and is shared by every process that opens the store with
+    history enabled, so ``undo`` in one process reverts a change made in
+    another. Changes made by processes without history are not recorded.
     """
-    def __init__(self):
-        self._storage_dir = Path.home() / ".todo_cli"
+    def __init__(self, storage_dir: Optional[Path] = None, journal: bool = False,
+                 compact_every: int = 1000, durability: str = 'flush', locking: bool = True,
+                 write_behind: bool = False, flush_interval: float = 1.0, flush_threshold: int = 100,
+                 format: Optional[str] = None, lazy: bool = False, cache_size: int = 1024,
+                 history: bool = False):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Invalid durability: {durability}. Must be one of {', '.join(DURABILITY_LEVELS)}.")
+        if format is not None and format not in STORAGE_FORMATS:
+            raise ValueError(f"Invalid format: {format}. Must be one of {', '.join(STORAGE_FORMATS)}.")
+        self._storage_dir = Path(storage_dir) if storage_dir else Path.home() / ".todo_cli"
         self._storage_dir.mkdir(parents=True, exist_ok=True)
-        self._filepath = self._storage_dir / "tasks.json"
-        self._tasks: Dict[str, Task] = {}
-        self._load_tasks()
+        if format is None:
+            # New stores are JSON, so every process opening an empty directory
+            # agrees on one snapshot file whatever other options it uses.
+            format = 'binary' if (self._storage_dir / SNAPSHOT_NAMES['binary']).exists() else 'json'
+        self._format = format
+        self._lazy = lazy and format == 'binary'
+        self._cache_size = cache_size
+        self._filepath = self._storage_dir / SNAPSHOT_NAMES[format]
+        self._journal_path = self._storage_dir / "tasks.journal"
+        self._journal = journal
+        self._compact_every = compact_every
+        self._journal_records = 0
+        self._journal_file = None
+        self._durability = durability
+        self._pending: List[dict] = []
+        self._lock = FileLock(self._storage_dir / "tasks.lock") if locking else None
+        self._signature = None
+        # Serializes the flusher thread with callers; re-entrant like the file lock.
+        self._mutex = threading.RLock()
+        self._wakeup = threading.Condition(self._mutex)
+        self._write_behind = write_behind
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+        self._batch_mark = 0
+        self._closed = False
+        self._flusher = None
+        super().__init__()
+        with self._locked(refresh=False):
+            self._load_tasks()
+            if history:
+                self._start_history(
+                    self._storage_dir / "history",
+                    write_file=lambda path, write: _atomic_write(path, write, self._durability),
+                    fsync=self._durability == 'fsync',
+                )
+        if write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, name="todo-write-behind", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
 
     def _load_tasks(self) -> None:
-        """Loads tasks from the JSON file into memory."""
+        """Loads the snapshot and replays any journal tail into memory."""
+        if isinstance(self._tasks, LazyTasks):
+            self._tasks.close()
+        self._tasks = LazyTasks(cache_size=self._cache_size) if self._lazy else {}
         if self._filepath.exists():
             try:
-                with open(self._filepath, 'r', encoding='utf-8') as f:
-                    tasks_data = json.load(f)
-                    for task_id, task_data in tasks_data.items():
-                        self._tasks[task_id] = Task(**task_data)
-            except json.JSONDecodeError:
-                # Handle empty or corrupted JSON file
-                self._tasks = {}
+                if self._lazy:
+                    self._tasks = LazyTasks(self._map_snapshot(), self._cache_size)
+                elif self._format == 'binary':
+                    self._tasks = binformat.decode(self._filepath.read_bytes())
+                else:
+                    with open(self._filepath, 'r', encoding='utf-8') as f:
+                        tasks_data = json.load(f)
+                        for task_id, task_data in tasks_data.items():
+                            self._tasks[task_id] = Task(**task_data)
             except Exception as e:
-                print(f"Error loading tasks: {e}")
-                self._tasks = {}
+                # Keep the unreadable file for recovery instead of letting the
+                # next save overwrite it with an empty store.
+                self._tasks = LazyTasks(cache_size=self._cache_size) if self._lazy else {}
+                self._quarantine(self._filepath, e)
+        self._replay_journal()
+        self._rebuild_index()
+        self._signature = self._stat_signature()
+
+    def _map_snapshot(self) -> binformat.Snapshot:
+        """Memory-maps the binary snapshot for lazy access."""
+        with open(self._filepath, 'rb') as f:
+            return binformat.Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _rebuild_index(self) -> None:
+        if self._lazy:
+            self._index = DeferredTaskIndex(self._tasks)
         else:
-            self._tasks = {}
+            super()._rebuild_index()
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _stat_signature(self) -> tuple:
+        """Identifies the current on-disk state of the snapshot and the journal."""
+        return (self._stat(self._filepath), self._stat(self._journal_path))
+
+    def _refresh_if_changed(self) -> None:
+        """Catches up with changes another process made to the store files."""
+        current = self._stat_signature()
+        if current == self._signature:
+            return
+        snapshot, journal = current
+        old_snapshot, old_journal = self._signature or (None, None)
+        if self._pending:
+            # Held-back write-behind changes: reload, then re-apply them on top.
+            self._load_tasks()
+            for record in self._pending:
+                self._apply_record(record, indexed=True)
+            self._feed.record(RELOADED, None, external=True)
+        elif (snapshot == old_snapshot and journal and old_journal
+                and journal[0] == old_journal[0] and journal[2] > old_journal[2]):
+            # Only appends happened since we last looked: replay the new records
+            # and publish them like local changes.
+            self._close_journal()
+            self._feed.hold()
+            try:
+                for record in self._read_journal(old_journal[2]):
+                    self._apply_record(record, indexed=True, notify=True)
+                    self._journal_records += 1
+            finally:
+                self._feed.release()
+            self._signature = self._stat_signature()
+        else:
+            self._load_tasks()
+            self._feed.record(RELOADED, None, external=True)
+
+    @contextmanager
+    def _locked(self, refresh: bool = True):
+        """
+        Holds the inter-process lock for a read-modify-write cycle.
+
+        On the outermost entry the in-memory state is refreshed from disk; on the
+        outermost exit buffered journal writes are flushed so other processes
+        see them, and the on-disk signature is recorded.
+        """
+        with self._mutex:
+            if self._lock is None:
+                yield
+                return
+            outer = not self._lock.held
+            with self._lock:
+                if outer and refresh:
+                    self._refresh_if_changed()
+                try:
+                    yield
+                finally:
+                    if outer:
+                        if self._journal_file is not None:
+                            self._journal_file.flush()
+                        self._signature = self._stat_signature()
+
+    def _sync_for_read(self) -> None:
+        """Reloads before a read if another process changed the store files."""
+        if self._lock is not None and not self._lock.held and self._stat_signature() != self._signature:
+            with self._locked():
+                pass
+
+    def _quarantine(self, path: Path, error: Exception) -> None:
+        """Moves an unreadable store file aside and reports where it went."""
+        if path.stat().st_size == 0:
+            path.unlink()
+            return
+        target = path.with_name(f"{path.name}.corrupt-{time.strftime('%Y%m%d%H%M%S')}")
+        os.replace(path, target)
+        print(f"Error loading tasks: {error}. The unreadable file was moved to {target}.", file=sys.stderr)
+
+    def _replay_journal(self) -> None:
+        """Applies the records of the journal file on top of the loaded snapshot."""
+        self._close_journal()
+        self._journal_records = 0
+        if not self._journal_path.exists():
+            return
+        for record in self._read_journal():
+            self._apply_record(record)
+            self._journal_records += 1
+
+    def _read_journal(self, offset: int = 0) -> Iterator[dict]:
+        """Yields the complete journal records stored after ``offset``."""
+        intact = offset
+        with open(self._journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                yield record
+                intact += len(line)
+        # A torn final line from an interrupted append: everything before it is
+        # intact and everything after it never happened. Cut it off so later
+        # appends do not end up behind it.
+        if intact < self._journal_path.stat().st_size:
+            os.truncate(self._journal_path, intact)
+
+    def _apply_record(self, record: dict, indexed: bool = False, notify: bool = False) -> None:
+        """
+        Applies a single journal record to the in-memory tasks.
+
+        During a full load the index is rebuilt afterwards; when catching up
+        with another process (``indexed=True``) it is maintained per record,
+        and with ``notify`` the change is also published on the change feed.
+        """
+        op = record["op"]
+        if op == "add":
+            task = Task(**record["task"])
+            if indexed:
+                if task.id in self._tasks:
+                    self._unlink(task.id)
+                self._relink(task)
+            else:
+                self._tasks[task.id] = task
+            if notify:
+                self._feed.record(ADDED, task.id, task, external=True)
+        elif op == "update":
+            task = self._tasks.get(record["id"])
+            if task is not None:
+                previous = {key: getattr(task, key) for key in record["fields"]}
+                for key, value in record["fields"].items():
+                    setattr(task, key, value)
+                self._tasks[task.id] = task
+                if indexed:
+                    self._index.reindex(task)
+                if notify:
+                    self._feed.record(UPDATED, task.id, task, field_diff(task, previous), external=True)
+        elif op == "delete":
+            task = self._tasks.get(record["id"])
+            if indexed:
+                if task is not None:
+                    self._unlink(record["id"])
+            else:
+                self._tasks.pop(record["id"], None)
+            if notify and task is not None:
+                self._feed.record(DELETED, task.id, task, external=True)
 
     def _save_tasks(self) -> None:
-        """Persists the current in-memory tasks to the JSON file."""
-        with open(self._filepath, 'w', encoding='utf-8') as f:
-            json.dump({task_id: task.to_dict() for task_id, task in self._tasks.items()}, f, indent=4)
+        """Atomically replaces the snapshot file with the current in-memory tasks."""
+        if self._lazy:
+            _atomic_write(self._filepath, lambda f: f.write(self._tasks.encode()), self._durability, 'wb')
+            self._tasks.rebase(self._map_snapshot())
+        elif self._format == 'binary':
+            _atomic_write(self._filepath, lambda f: binformat.dump(self._tasks.values(), f), self._durability, 'wb')
+        else:
+            _atomic_write(
+                self._filepath,
+                lambda f: json.dump({task_id: task.to_dict() for task_id, task in self._tasks.items()}, f, indent=4),
+                self._durability,
+            )
+        # The snapshot now covers everything the journal recorded. Should we
+        # crash before the unlink, replaying the journal over the new snapshot
+        # reproduces the same final state.
+        self._close_journal()
+        if self._journal_path.exists():
+            self._journal_path.unlink()
+        self._journal_records = 0
+
+    def _close_journal(self) -> None:
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def flush(self) -> None:
+        """Writes out every mutation still held back by write-behind mode."""
+        with self._locked():
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                self._write_records(pending)
+            except BaseException:
+                self._pending = pending + self._pending
+                raise
+
+    def _flush_loop(self) -> None:
+        """Body of the write-behind thread."""
+        with self._mutex:
+            while not self._closed:
+                self._wakeup.wait_for(
+                    lambda: self._closed or len(self._pending) >= self._flush_threshold,
+                    timeout=self._flush_interval,
+                )
+                if self._closed:
+                    return
+                try:
+                    self.flush()
+                except Exception as e:
+                    # Keep the changes queued and retry on the next round.
+                    print(f"Error saving tasks in the background: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        """Stops the write-behind thread, flushes, and releases file handles."""
+        with self._mutex:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+            atexit.unregister(self.close)
+        self.flush()
+        self._close_journal()
+        if self._lock is not None:
+            self._lock.close()
+
+    def _persist(self, record: dict) -> None:
+        """Persists a single mutation, or queues it while a batch is open or writes are behind."""
+        if self._undo_log is not None:
+            self._pending.append(record)
+            return
+        if self._write_behind and not self._closed:
+            self._pending.append(record)
+            if len(self._pending) >= self._flush_threshold:
+                self._wakeup.notify()
+            return
+        self._write_records([record])
+
+    def _write_records(self, records: List[dict]) -> None:
+        """Writes mutations, either as journal records or as one full rewrite."""
+        if not self._journal:
+            self._save_tasks()
+            return
+        if self._journal_file is None:
+            self._journal_file = open(self._journal_path, 'a', encoding='utf-8')
+        self._journal_file.flush()
+        offset = os.fstat(self._journal_file.fileno()).st_size
+        try:
+            self._journal_file.write("".join(json.dumps(record) + "\n" for record in records))
+            _sync(self._journal_file, self._durability)
+        except BaseException:
+            # The caller rolls these mutations back in memory, so none of them
+            # may survive on disk to be replayed on the next load.
+            try:
+                self._close_journal()
+            finally:
+                os.truncate(self._journal_path, offset)
+            raise
+        self._journal_records += len(records)
+        if self._journal_records >= max(self._compact_every, len(self._tasks)):
+            try:
+                self.compact()
+            except Exception as e:
+                # The records are already safe in the journal; compaction is
+                # retried on the next write instead of failing this one.
+                print(f"Error compacting the task journal: {e}", file=sys.stderr)
+
+    def _begin_batch(self) -> None:
+        self._batch_mark = len(self._pending)
+
+    def _commit_batch(self) -> None:
+        if self._write_behind and not self._closed:
+            if len(self._pending) >= self._flush_threshold:
+                self._wakeup.notify()
+            return
+        self.flush()
+
+    def _abort_batch(self) -> None:
+        del self._pending[self._batch_mark:]
+
+    def compact(self) -> None:
+        """Folds the journal into a fresh snapshot and truncates the journal."""
+        with self._locked():
+            self._save_tasks()
+
+    @contextmanager
+    def batch(self):
+        """Groups mutations under one lock acquisition and one write."""
+        with self._locked():
+            with super().batch():
+                yield self
 
     def add_task(self, task: Task) -> None:
+        with self._locked():
+            super().add_task(task)
+            self._persist({"op": "add", "task": task.to_dict()})
+
+    def delete_task(self, task_id: str) -> None:
+        with self._locked():
+            super().delete_task(task_id)
+            self._persist({"op": "delete", "id": task_id})
+
+    def update_task(self, task_id: str, **kwargs) -> Task:
+        with self._locked():
+            task, changed = self._apply_update(task_id, kwargs)
+            self._persist({"op": "update", "id": task_id, "fields": changed})
+        return task
+
+    def get_task(self, task_id: str) -> Task:
+        self._sync_for_read()
+        return super().get_task(task_id)
+
+    @property
+    def version(self) -> int:
+        """Number of changes seen so far, including those made by other processes."""
+        self._sync_for_read()
+        return self._feed.version
+
+    def changes_since(self, version: int) -> Optional[List[ChangeEvent]]:
+        self._sync_for_read()
+        return super().changes_since(version)
+
+    def resolve_id(self, prefix: str) -> str:
+        self._sync_for_read()
+        return super().resolve_id(prefix)
+
+    def short_id(self, task_id: str, min_length: int = 8) -> str:
+        self._sync_for_read()
+        return super().short_id(task_id, min_length)
+
+    def short_ids(self, task_ids: Iterable[str], min_length: int = 8) -> List[str]:
+        self._sync_for_read()
+        return super().short_ids(task_ids, min_length)
+
+    def list_tasks(self, limit: Optional[int] = None, offset: int = 0,
+                   after: Optional[str] = None) -> List[Task]:
+        self._sync_for_read()
+        return super().list_tasks(limit=limit, offset=offset, after=after)
+
+    def search_tasks(self, *args, **kwargs) -> List[Task]:
+        self._sync_for_read()
+        return super().search_tasks(*args, **kwargs)
+
+    def filter_tasks(self, where: Union[str, TaskFilter], limit: Optional[int] = None,
+                     after: Optional[str] = None) -> List[Task]:
+        self._sync_for_read()
+        return super().filter_tasks(where, limit=limit, after=after)
+
+    def statistics(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        self._sync_for_read()
+        return super().statistics(now, weeks)
+
+    def due_between(self, start: Optional[int] = None, end: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Task]:
+        self._sync_for_read()
+        return super().due_between(start, end, limit)
+
+
+def history_enabled(storage_dir: Optional[Path] = None) -> bool:
+    """
+    Tells whether the file store in ``storage_dir`` has opted in to the event history.
+
+    History is off by default, since its log and snapshots grow with every
+    change. A store opened once with ``history=True`` gets a ``history``
+    directory, and the CLI and the agent keep recording for as long as it
+    exists; deleting the directory turns the history off again.
+    """
+    directory = Path(storage_dir) if storage_dir else Path.home() / ".todo_cli"
+    return (directory / "history").is_dir()
+
+
+def convert_store(to: str, storage_dir: Optional[Path] = None) -> int:
+    """
+    Rewrites a file store's snapshot in another format and returns its task count.
+
+    The store is opened in its current format (journal included) under the
+    store lock, written out as a new snapshot in format ``to``, and the old
+    snapshot is removed, so every later ``FileStorage`` picks up the new one.
+    Processes that already have the store open must reopen it.
+    """
+    if to not in STORAGE_FORMATS:
+        raise ValueError(f"Invalid format: {to}. Must be one of {', '.join(STORAGE_FORMATS)}.")
+    source = FileStorage(storage_dir=storage_dir)
+    try:
+        with source._locked():
+            old_path = source._filepath
+            source._format = to
+            source._filepath = source._storage_dir / SNAPSHOT_NAMES[to]
+            source._save_tasks()
+            if old_path != source._filepath and old_path.exists():
+                old_path.unlink()
+            return len(source._tasks)
+    finally:
+        source.close()
+
+
+class SQLiteStorage:
+    """
+    Persistent, SQLite-backed storage backend.
+
+    Tasks live in ``~/.todo_cli/tasks.db`` (or ``storage_dir/tasks.db``) and are
+    only materialized as ``Task`` objects when a query returns them. Filtering
+    and ordering are pushed into SQL: ``status``, ``priority``, ``created_at``
+    and ``due_date`` are indexed, the default listing order has its own
+    expression index, and tags live in a separate join table indexed by tag.
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            status TEXT NOT NULL,
+            priority TEXT,
+            created_at TEXT NOT NULL,
+            modified_at TEXT,
+            due_date TEXT
+        );
+        CREATE TABLE IF NOT EXISTS task_tags (
+            task_id TEXT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (task_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+        CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+        CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
+        CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks((status = 'completed'), created_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_pending_due ON tasks(CAST(strftime('%s', due_date) AS INTEGER), id)
+            WHERE status = 'pending';
+        CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag, task_id);
+    """
+
+    # Tags are aggregated per row so a listing needs a single query.
+    _SELECT = """
+        SELECT t.id, t.title, t.description, t.status, t.priority,
+               t.created_at, t.modified_at, t.due_date,
+               (SELECT json_group_array(tag) FROM
+                   (SELECT tag FROM task_tags WHERE task_id = t.id ORDER BY position)) AS tags
+        FROM tasks t
+    """
+    _ORDER = " ORDER BY (t.status = 'completed'), t.created_at, t.id"
+    # Must match the idx_tasks_pending_due expression for the index to be used.
+    _DUE = "CAST(strftime('%s', due_date) AS INTEGER)"
+    # Without ANALYZE data the planner prefers the status index and sorts.
+    _SELECT_DUE = _SELECT.replace("FROM tasks t", "FROM tasks t INDEXED BY idx_tasks_pending_due")
+    _AFTER = "((t.status = 'completed'), t.created_at, t.id) > (?, ?, ?)"
+
+    _COLUMNS = ("title", "description", "status", "priority", "created_at", "modified_at", "due_date")
+
+    def __init__(self, storage_dir: Optional[Path] = None):
+        self._storage_dir = Path(storage_dir) if storage_dir else Path.home() / ".todo_cli"
+        self._storage_dir.mkdir(parents=True, exist_ok=True)
+        self._filepath = self._storage_dir / "tasks.db"
+        # The connection may be handed to another thread (see src.todo.aio), but
+        # is never used by two threads at once.
+        self._conn = sqlite3.connect(self._filepath, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(self._SCHEMA)
+        self._batch_depth = 0
+        self._feed = ChangeFeed()
+        # Changes only when another connection commits, so it reveals writes by other processes.
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._conn.close()
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups mutations into a single transaction.
+
+        The transaction commits when the outermost batch exits and is rolled
+        back entirely if the block raises. Change events are published once the
+        transaction has committed.
+        """
+        self._batch_depth += 1
+        try:
+            if self._batch_depth > 1:
+                yield self
+            else:
+                self._feed.hold()
+                try:
+                    with self._conn:
+                        yield self
+                except BaseException:
+                    self._feed.discard()
+                    raise
+                self._feed.release()
+        finally:
+            self._batch_depth -= 1
+
+    def _check_external_changes(self) -> None:
+        """Publishes a 'reloaded' event if another connection committed since the last check."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._feed.record(RELOADED, None, external=True)
+
+    @property
+    def version(self) -> int:
+        """Number of changes seen so far; writes by other connections count as one 'reloaded' change."""
+        self._check_external_changes()
+        return self._feed.version
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Calls ``callback`` with a list of ``ChangeEvent`` after every committed change."""
+        return self._feed.subscribe(callback)
+
+    def changes_since(self, version: int) -> Optional[List[ChangeEvent]]:
+        """Returns the change events after ``version``, or None if they are too old to replay."""
+        self._check_external_changes()
+        return self._feed.changes_since(version)
+
+    # The event history is only kept by the in-process backends.
+    history = None
+
+    def undo(self) -> int:
+        raise ValueError("History is not supported by the SQLite storage.")
+
+    def redo(self) -> int:
+        raise ValueError("History is not supported by the SQLite storage.")
+
+    def state_at(self, timestamp: int) -> List[Task]:
+        raise ValueError("History is not supported by the SQLite storage.")
+
+    @staticmethod
+    def _row_to_task(row) -> Task:
+        task_id, title, description, status, priority, created_at, modified_at, due_date, tags = row
+        return Task(
+            id=task_id,
+            title=title,
+            description=description,
+            status=status,
+            priority=priority,
+            tags=json.loads(tags),
+            created_at=created_at,
+            modified_at=modified_at,
+            due_date=due_date,
+        )
+
+    def _write_tags(self, task_id: str, tags: List[str]) -> None:
+        self._conn.execute("DELETE FROM task_tags WHERE task_id = ?", (task_id,))
+        self._conn.executemany(
+            "INSERT INTO task_tags (task_id, position, tag) VALUES (?, ?, ?)",
+            [(task_id, position, tag) for position, tag in enumerate(tags)],
+        )
+
+    def add_task(self, task: Task) -> None:
+        """Add a new task to storage."""
         if not task.title:
             raise ValueError("Task title cannot be empty.")
-        if task.id in self._tasks:
-            raise ValueError(f"Task with ID {task.id} already exists.")
-        self._tasks[task.id] = task
-        self._save_tasks()
+        with self.batch():
+            try:
+                self._conn.execute(
+                    "INSERT INTO tasks (id, title, description, status, priority, created_at, modified_at, due_date) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task.id, task.title, task.description, task.status, task.priority,
+                     task.created_at, task.modified_at, task.due_date),
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Task with ID {task.id} already exists.")
+            self._write_tags(task.id, task.tags)
+            self._feed.record(ADDED, task.id, task)
 
     def delete_task(self, task_id: str) -> None:
-        if task_id not in self._tasks:
-            raise KeyError(f"Task with ID {task_id} not found.")
-        del self._tasks[task_id]
-        self._save_tasks()
+        """Delete a task by ID."""
+        with self.batch():
+            task = self.get_task(task_id)
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self._feed.record(DELETED, task_id, task)
 
     def update_task(self, task_id: str, **kwargs) -> Task:
-        if task_id not in self._tasks:
-            raise KeyError(f"Task with ID {task_id} not found.")
-
-        task = self._tasks[task_id]
-        updated = False
+        """Update a task's fields."""
+        task = self.get_task(task_id)
+        changed = []
+        previous = {'modified_at': task.modified_at}
         for key, value in kwargs.items():
-            if hasattr(task, key):
+            # The ID is the primary key and cannot be changed, as in the other backends.
+            if key in TASK_FIELDS and key != 'id':
                 if key == 'priority':
                     validate_priority(value)
+                previous.setdefault(key, getattr(task, key))
                 setattr(task, key, value)
-                updated = True
-        
-        if updated:
-            task.modified_at = now_iso()
-        self._save_tasks()
+                changed.append(key)
+
+        if not changed:
+            return task
+        task.modified_at = now_iso()
+        with self.batch():
+            columns = [key for key in self._COLUMNS if key in changed or key == 'modified_at']
+            self._conn.execute(
+                f"UPDATE tasks SET {', '.join(f'{key} = ?' for key in columns)} WHERE id = ?",
+                [getattr(task, key) for key in columns] + [task_id],
+            )
+            if 'tags' in changed:
+                self._write_tags(task_id, task.tags)
+            self._feed.record(UPDATED, task_id, task, field_diff(task, previous))
         return task
 
-    def list_tasks(self) -> List[Task]:
-        # Sort by completion status (incomplete first), then by creation date
-        return sorted(list(self._tasks.values()), key=lambda task: (task.status == 'completed', task.created_at))
+    def add_tasks(self, tasks: Iterable[Task]) -> List[Task]:
+        """Add several tasks in one transaction. Returns the added tasks."""
+        tasks = list(tasks)
+        with self.batch():
+            for task in tasks:
+                self.add_task(task)
+        return tasks
+
+    def update_tasks(self, updates: Dict[str, dict]) -> List[Task]:
+        """Update several tasks in one transaction, given a mapping of task ID to fields."""
+        with self.batch():
+            return [self.update_task(task_id, **fields) for task_id, fields in updates.items()]
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        """Delete several tasks in one transaction. Returns the number of tasks deleted."""
+        task_ids = list(dict.fromkeys(task_ids))
+        with self.batch():
+            for task_id in task_ids:
+                self.delete_task(task_id)
+        return len(task_ids)
+
+    def list_tasks(self, limit: Optional[int] = None, offset: int = 0,
+                   after: Optional[str] = None) -> List[Task]:
+        """List tasks, sorted by completion status and creation date."""
+        sql, params = self._SELECT, []
+        if after:
+            sql += " WHERE " + self._AFTER
+            params += list(decode_cursor(after))
+        rows = self._conn.execute(sql + self._ORDER + " LIMIT ? OFFSET ?",
+                                  params + [-1 if limit is None else limit, offset])
+        return [self._row_to_task(row) for row in rows]
 
     def get_task(self, task_id: str) -> Task:
-        if task_id not in self._tasks:
+        """Get a single task by ID."""
+        row = self._conn.execute(self._SELECT + " WHERE t.id = ?", (task_id,)).fetchone()
+        if row is None:
             raise KeyError(f"Task with ID {task_id} not found.")
-        return self._tasks[task_id]
+        return self._row_to_task(row)
+
+    def resolve_id(self, prefix: str) -> str:
+        """Expands a unique ID prefix to the full ID with a range scan of the primary key."""
+        ids = [task_id for (task_id,) in self._conn.execute(
+            "SELECT id FROM tasks WHERE id >= ? ORDER BY id LIMIT ?", (prefix, AMBIGUOUS_SHOWN + 2))]
+        if ids and ids[0] == prefix:
+            return prefix
+        return _pick_id(prefix, list(takewhile(lambda task_id: task_id.startswith(prefix), ids))[:AMBIGUOUS_SHOWN + 1])
+
+    def short_id(self, task_id: str, min_length: int = 8) -> str:
+        """Returns the shortest prefix of ``task_id`` (at least ``min_length`` long) that ``resolve_id`` accepts."""
+        before = self._conn.execute("SELECT MAX(id) FROM tasks WHERE id < ?", (task_id,)).fetchone()[0]
+        after = self._conn.execute("SELECT MIN(id) FROM tasks WHERE id > ?", (task_id,)).fetchone()[0]
+        return unique_prefix(task_id, (before, after), min_length)
+
+    def short_ids(self, task_ids: Iterable[str], min_length: int = 8) -> List[str]:
+        """Returns the ``short_id`` of each ID, in order."""
+        return [self.short_id(task_id, min_length) for task_id in task_ids]
 
     def search_tasks(
         self,
         query: Optional[str] = None,
         status: Optional[str] = None,
         priority: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        ranked: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
     ) -> List[Task]:
-        results = []
-        for task in self._tasks.values():
-            match = True
-            if query:
-                if query.lower() not in task.title.lower() and \
-                   (task.description is None or query.lower() not in task.description.lower()):
-                    match = False
-            if status and task.status != status:
-                match = False
-            if priority and task.priority != priority:
-                match = False
-            if tags and not any(tag in task.tags for tag in tags):
-                match = False
-            
-            if match:
-                results.append(task)
-        
-        return sorted(results, key=lambda task: (task.status == 'completed', task.created_at))
+        """Search tasks with optional filters, evaluated by SQLite."""
+        clauses, params = [], []
+        if query:
+            needle = query.lower()
+            clauses.append("(instr(lower(t.title), ?) > 0 OR instr(lower(coalesce(t.description, '')), ?) > 0)")
+            params += [needle, needle]
+        if status:
+            clauses.append("t.status = ?")
+            params.append(status)
+        if priority:
+            clauses.append("t.priority = ?")
+            params.append(priority)
+        if tags:
+            placeholders = ", ".join("?" for _ in tags)
+            clauses.append(f"EXISTS (SELECT 1 FROM task_tags tt WHERE tt.task_id = t.id AND tt.tag IN ({placeholders}))")
+            params += list(tags)
+
+        order = self._ORDER
+        if ranked and query:
+            if after:
+                raise ValueError("Cursor pagination is not supported for ranked search.")
+            order = (" ORDER BY 2 * (instr(lower(t.title), ?) > 0)"
+                     " + (instr(lower(coalesce(t.description, '')), ?) > 0) DESC, "
+                     + self._ORDER[len(" ORDER BY "):])
+        elif after:
+            clauses.append(self._AFTER)
+            params += list(decode_cursor(after))
+
+        sql = self._SELECT
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if ranked and query:
+            params += [needle, needle]
+        rows = self._conn.execute(sql + order + " LIMIT ?", params + [-1 if limit is None else limit])
+        return [self._row_to_task(row) for row in rows]
+
+    def filter_tasks(self, where: Union[str, TaskFilter], limit: Optional[int] = None,
+                     after: Optional[str] = None) -> List[Task]:
+        """Lists the tasks matching a filter expression, translated to an SQL condition."""
+        condition, params = compile_filter(where).sql()
+        if after:
+            condition = f"({condition}) AND {self._AFTER}"
+            params = params + list(decode_cursor(after))
+        rows = self._conn.execute(self._SELECT + " WHERE " + condition + self._ORDER + " LIMIT ?",
+                                  params + [-1 if limit is None else limit])
+        return [self._row_to_task(row) for row in rows]
+
+    def due_between(self, start: Optional[int] = None, end: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Task]:
+        """Returns pending tasks due in ``[start, end)``, earliest first, via the due-date index."""
+        conditions = ["t.status = 'pending'"]
+        params: List[object] = []
+        if start is not None:
+            conditions.append(f"{self._DUE} >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{self._DUE} < ?")
+            params.append(end)
+        if start is None:
+            conditions.append(f"{self._DUE} IS NOT NULL")
+        sql = self._SELECT_DUE + " WHERE " + " AND ".join(conditions) + f" ORDER BY {self._DUE}, t.id LIMIT ?"
+        rows = self._conn.execute(sql, params + [-1 if limit is None else limit])
+        return [self._row_to_task(row) for row in rows]
+
+    def overdue(self, now: Optional[int] = None, limit: Optional[int] = None) -> List[Task]:
+        """Returns pending tasks whose due date has passed, most overdue first."""
+        return self.due_between(None, now_epoch() if now is None else now, limit)
+
+    def next_due(self, k: int = 1, now: Optional[int] = None) -> List[Task]:
+        """Returns the ``k`` pending tasks that fall due next, from ``now`` on."""
+        return self.due_between(now_epoch() if now is None else now, None, k)
+
+    def statistics(self, now: Optional[int] = None, weeks: int = 8) -> dict:
+        """Computes the statistics of ``InMemoryStorage.statistics`` with SQL aggregates."""
+        now = now_epoch() if now is None else now
+        conn = self._conn
+        by_status = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+        by_priority, pending_by_priority = {}, {}
+        for priority, total, pending in conn.execute(
+                "SELECT priority, COUNT(*), SUM(status = 'pending') FROM tasks GROUP BY priority"):
+            by_priority[priority] = total
+            pending_by_priority[priority] = pending
+        by_tag = {
+            tag: {"total": total, "pending": pending}
+            for tag, total, pending in conn.execute(
+                "SELECT tt.tag, COUNT(DISTINCT t.id), COUNT(DISTINCT CASE WHEN t.status = 'pending' THEN t.id END)"
+                " FROM task_tags tt JOIN tasks t ON t.id = tt.task_id GROUP BY tt.tag ORDER BY tt.tag")
+        }
+        overdue_by_week = dict(conn.execute(
+            "SELECT (? - due) / ? AS week, COUNT(*) FROM"
+            " (SELECT CAST(strftime('%s', due_date) AS INTEGER) AS due FROM tasks"
+            "  WHERE status = 'pending' AND due_date IS NOT NULL)"
+            " WHERE due < ? GROUP BY week ORDER BY week", (now, WEEK, now)))
+        created_by_week = [0] * weeks
+        for week, count in conn.execute(
+                "SELECT (? - created) / ? AS week, COUNT(*) FROM"
+                " (SELECT CAST(strftime('%s', created_at) AS INTEGER) AS created FROM tasks)"
+                " WHERE created <= ? AND ? - created < ? GROUP BY week", (now, WEEK, now, now, weeks * WEEK)):
+            created_by_week[week] = count
+        return with_default_keys({
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_priority": by_priority,
+            "pending_by_priority": pending_by_priority,
+            "by_tag": by_tag,
+            "overdue": sum(overdue_by_week.values()),
+            "overdue_by_week": overdue_by_week,
+            "created_by_week": created_by_week,
+        })
+
+    def cursor_for(self, task: Task) -> str:
+        """Returns a cursor that continues a listing right after ``task``."""
+        return encode_cursor(order_key(task))
+
+    def iter_tasks(
+        self,
+        query: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        batch_size: int = 500,
+        where: Union[str, TaskFilter, None] = None
+    ) -> Iterator[Task]:
+        """
+        Yields matching tasks in listing order, fetching one keyset page at a time.
+
+        ``where`` is a filter expression, used instead of the other filters.
+        """
+        if where is not None:
+            where = compile_filter(where)
+        while True:
+            if where is not None:
+                page = self.filter_tasks(where, limit=batch_size, after=after)
+            else:
+                page = self.search_tasks(query=query, status=status, priority=priority, tags=tags,
+                                         limit=batch_size, after=after)
+            if not page:
+                return
+            after = self.cursor_for(page[-1])
+            yield from page
+            if len(page) < batch_size:
+                return
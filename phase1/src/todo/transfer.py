@@ -0,0 +1,170 @@
+"""
+Streaming bulk import and export of tasks.
+
+Tasks are exchanged one per line, either as NDJSON (one ``Task.to_dict()``
+object per line) or as CSV with a header row of ``TASK_FIELDS`` (tags are
+joined with commas, missing values are empty cells). Both directions work one
+task at a time, so moving a store of any size needs memory for a single row,
+not for the whole listing.
+
+``write_tasks`` writes an iterable of tasks, typically ``iter_tasks()`` of a
+store. ``read_tasks`` parses and validates rows, yielding each row's line
+number with either a ``Task`` or the ``ValueError`` describing what is wrong
+with it, so an import can report bad rows and carry on.
+"""
+import csv
+import json
+from typing import IO, Iterable, Iterator, Tuple, Union
+
+from src.todo.models import TASK_FIELDS, Task
+from src.todo.utils import parse_date, parse_tags, validate_priority, validate_uuid
+
+TRANSFER_FORMATS = ('ndjson', 'csv')
+
+
+def detect_format(path: str) -> str:
+    """Guesses the transfer format from a file name: '.csv' files are CSV, anything else NDJSON."""
+    return 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+
+
+def write_tasks(tasks: Iterable[Task], out: IO[str], fmt: str = 'ndjson') -> int:
+    """
+    Writes tasks to a text stream, one line per task. Returns the number written.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Invalid format: {fmt}. Must be one of {', '.join(TRANSFER_FORMATS)}.")
+    count = 0
+    if fmt == 'ndjson':
+        for task in tasks:
+            out.write(json.dumps(task.to_dict()) + "\n")
+            count += 1
+        return count
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(TASK_FIELDS)
+    for task in tasks:
+        row = task.to_dict()
+        row['tags'] = ",".join(row['tags'])
+        writer.writerow(["" if row[field] is None else row[field] for field in TASK_FIELDS])
+        count += 1
+    return count
+
+
+def task_from_record(record: dict) -> Task:
+    """
+    Builds a task from an imported record, validating every field.
+
+    Only ``title`` is required. A missing ID is generated, a missing status is
+    'pending' and a missing creation date is now. An empty description stays
+    empty; only a missing one is None (CSV cannot tell the two apart, as both
+    are written as an empty cell). ``created_at`` and
+    ``modified_at`` must be ISO 8601 dates; ``due_date`` is kept as given, as
+    with ``add --due``.
+
+    Raises:
+        ValueError: If a field is unknown, has the wrong type or an invalid value.
+    """
+    unknown = [key for key in record if key not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(map(str, unknown))}.")
+    for field, value in record.items():
+        if value is not None and field != 'tags' and not isinstance(value, str):
+            raise ValueError(f"Invalid {field}: expected a string, got {type(value).__name__}.")
+
+    title = (record.get('title') or '').strip()
+    if not title:
+        raise ValueError("Task title cannot be empty.")
+    fields = {'title': title, 'description': record.get('description')}
+
+    if record.get('id'):
+        validate_uuid(record['id'])
+        fields['id'] = record['id']
+    status = record.get('status') or 'pending'
+    if status not in ('pending', 'completed'):
+        raise ValueError(f"Invalid status: {status}. Must be 'pending' or 'completed'.")
+    fields['status'] = status
+    # An empty priority cell means the task has none.
+    priority = record.get('priority', 'medium') or None
+    if priority is not None:
+        validate_priority(priority)
+    fields['priority'] = priority
+
+    tags = record.get('tags')
+    if isinstance(tags, str):
+        tags = parse_tags(tags)
+    elif tags is not None and not (isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)):
+        raise ValueError("Invalid tags: expected a list of strings or a comma-separated string.")
+    fields['tags'] = tags
+
+    for field in ('created_at', 'modified_at'):
+        if record.get(field):
+            seconds = parse_date(record[field])
+            if seconds is None:
+                raise ValueError(f"Invalid {field}: {record[field]}. Use ISO 8601 (e.g. 2025-12-31T09:00:00Z).")
+            fields[field] = seconds
+    fields['due_date'] = record.get('due_date') or None
+    return Task(**fields)
+
+
+Row = Tuple[int, Union[dict, ValueError]]
+
+
+def _ndjson_records(lines: Iterable[str]) -> Iterator[Row]:
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e.msg}.")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError("Expected a JSON object.")
+            continue
+        yield line_no, record
+
+
+def _csv_records(lines: Iterable[str]) -> Iterator[Row]:
+    reader = csv.DictReader(lines)
+    header = reader.fieldnames or []
+    unknown = [name for name in header if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown CSV column(s): {', '.join(unknown)}.")
+    if header and 'title' not in header:
+        raise ValueError("The CSV header has no 'title' column.")
+    line_no = reader.line_num + 1
+    for row in reader:
+        if None in row:
+            yield line_no, ValueError(f"Expected {len(header)} columns, got more.")
+        elif not any(row.values()):
+            pass  # blank line
+        else:
+            # Empty cells are missing values; the priority cell stays, as an empty one means none.
+            yield line_no, {key: value for key, value in row.items()
+                            if value is not None and (value != '' or key == 'priority')}
+        line_no = reader.line_num + 1
+
+
+def read_tasks(lines: Iterable[str], fmt: str = 'ndjson') -> Iterator[Tuple[int, Union[Task, ValueError]]]:
+    """
+    Parses and validates tasks from lines of NDJSON or CSV, one row at a time.
+
+    Yields ``(line number, Task)`` for each valid row and ``(line number,
+    ValueError)`` for each invalid one. Blank lines are skipped.
+
+    Raises:
+        ValueError: If the format is unknown or the CSV header is invalid.
+    """
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Invalid format: {fmt}. Must be one of {', '.join(TRANSFER_FORMATS)}.")
+    records = _ndjson_records(lines) if fmt == 'ndjson' else _csv_records(lines)
+    for line_no, record in records:
+        if isinstance(record, ValueError):
+            yield line_no, record
+            continue
+        try:
+            yield line_no, task_from_record(record)
+        except ValueError as e:
+            yield line_no, e
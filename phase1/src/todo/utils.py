@@ -1,6 +1,11 @@
+import calendar
 from datetime import datetime, timezone
+import os
+import re
+import threading
+import time
 import uuid
-from typing import List, Literal
+from typing import Dict, List, Literal, Optional
 
 def now_iso() -> str:
     """
@@ -11,6 +16,105 @@ def now_iso() -> str:
     """
     return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
 
+def now_epoch() -> int:
+    """
+    Returns the current UTC time as whole seconds since the Unix epoch.
+
+    This is the compact form of ``now_iso()``; ``format_iso`` turns it back into
+    the same string.
+    """
+    return int(datetime.now(timezone.utc).timestamp())
+
+_ISO_RE = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ\Z")
+# Rendered date and time-of-day halves. Timestamps are rendered far more often
+# than they are created, and they share days and clock times heavily.
+_DATES: Dict[int, str] = {}
+_CLOCK: Dict[int, str] = {}
+
+def format_iso(seconds: int) -> str:
+    """
+    Renders seconds since the epoch in the format of ``now_iso()``.
+
+    Example: 1765101600 -> '2025-12-07T10:00:00Z'
+    """
+    days, rem = divmod(seconds, 86400)
+    date = _DATES.get(days)
+    if date is None:
+        date = _DATES[days] = "%04d-%02d-%02dT" % time.gmtime(seconds)[:3]
+    clock = _CLOCK.get(rem)
+    if clock is None:
+        hours, minutes = divmod(rem, 3600)
+        clock = _CLOCK[rem] = "%02d:%02d:%02dZ" % (hours, *divmod(minutes, 60))
+    return date + clock
+
+def parse_iso(value: str) -> Optional[int]:
+    """
+    Converts a timestamp in the exact format of ``now_iso()`` to epoch seconds.
+
+    Returns None for anything else (other ISO 8601 variants, plain dates,
+    out-of-range fields), so that ``format_iso(parse_iso(value)) == value``
+    whenever a number is returned.
+    """
+    if not _ISO_RE.match(value):
+        return None
+    try:
+        seconds = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                   int(value[11:13]), int(value[14:16]), int(value[17:19])))
+    except ValueError:
+        return None
+    return seconds if format_iso(seconds) == value else None
+
+_DATE_RE = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d):(\d\d)(?::(\d\d))?(?:\.\d+)?)?"
+    r"(Z|[+-]\d\d:?\d\d)?\Z"
+)
+
+def parse_date(value: str) -> Optional[int]:
+    """
+    Leniently converts a user-supplied ISO 8601 date or date-time to epoch seconds.
+
+    Accepts plain dates ('2025-12-31', taken as midnight UTC), optional seconds
+    and fractions, and 'Z' or '+HH:MM' offsets; times without an offset are UTC.
+    Returns None if the value cannot be understood.
+    """
+    seconds = parse_iso(value)
+    if seconds is not None:
+        return seconds
+    match = _DATE_RE.match(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, offset = match.groups()
+    fields = (int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    try:
+        seconds = calendar.timegm(fields)
+    except ValueError:
+        return None
+    if time.gmtime(seconds)[:6] != fields:
+        return None  # out-of-range fields such as February 30th
+    if offset and offset != 'Z':
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        seconds -= sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    return seconds
+
+_DURATION_RE = re.compile(r"(\d+)\s*([mhdw]?)\Z")
+_DURATION_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+def parse_duration(value: str) -> int:
+    """
+    Converts a duration such as '90m', '12h', '3d' or '2w' to seconds.
+
+    A bare number is a number of days.
+
+    Raises:
+        ValueError: If the duration is not understood.
+    """
+    match = _DURATION_RE.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}. Use a number followed by m, h, d or w (e.g. 3d).")
+    amount, unit = match.groups()
+    return int(amount) * _DURATION_UNITS[unit or 'd']
+
 def parse_tags(tags_str: str) -> List[str]:
     """
     Converts a comma-separated string of tags into a clean list of strings.
@@ -40,6 +144,47 @@ def validate_priority(priority: str) -> None:
     if priority not in ['high', 'medium', 'low']:
         raise ValueError(f"Invalid priority: {priority}. Must be 'high', 'medium', or 'low'.")
 
+_v7_lock = threading.Lock()
+_v7_last = [0, 0]  # millisecond timestamp and counter of the last UUIDv7
+
+def uuid7() -> str:
+    """
+    Returns a new time-ordered UUID (version 7, RFC 9562) as a string.
+
+    The first 48 bits are the Unix time in milliseconds, followed by a 12-bit
+    counter and 62 random bits. The counter is incremented for IDs created in
+    the same millisecond, so IDs from one process sort in creation order, both
+    as UUIDs and as strings.
+    """
+    ms = time.time_ns() // 1_000_000
+    with _v7_lock:
+        last_ms, counter = _v7_last
+        if ms <= last_ms:  # same millisecond, or the clock stepped back
+            ms, counter = last_ms, counter + 1
+            if counter > 0xFFF:
+                ms, counter = ms + 1, 0
+        else:
+            # Start low enough that the counter rarely overflows.
+            counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        _v7_last[:] = ms, counter
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    return str(uuid.UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | random_bits))
+
+_ID_PREFIX_RE = re.compile(r"[0-9a-fA-F-]{1,36}\Z")
+
+def validate_id_prefix(value: str) -> None:
+    """
+    Checks that a string is a full UUID or the start of one.
+
+    Commands accept any unique prefix of a task ID (such as the short ID shown
+    in task tables), which storage ``resolve_id`` expands to the full ID.
+
+    Raises:
+        ValueError: If the string cannot be (the start of) a UUID.
+    """
+    if not _ID_PREFIX_RE.match(value):
+        raise ValueError(f"Invalid UUID: {value}")
+
 def validate_uuid(uuid_str: str) -> None:
     """
     Checks if a string is a valid UUID (Universally Unique Identifier).
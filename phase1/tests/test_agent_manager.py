@@ -5,6 +5,7 @@ from src.agent.manager import TodoManager
 @pytest.fixture
 def mock_storage():
     with patch('src.agent.skills._storage') as mock:
+        mock.resolve_id.side_effect = lambda task_id: task_id
         yield mock
 
 def test_manager_add_command(mock_storage):
@@ -31,7 +32,7 @@ def test_manager_list_filtered(mock_storage):
     mock_storage.search_tasks.return_value = []
     
     response = agent.run("list pending")
-    mock_storage.search_tasks.assert_called_with(status="pending", priority=None, tags=None)
+    mock_storage.search_tasks.assert_called_with(status="pending", priority=None, tags=None, limit=None, after=None)
 
 def test_manager_help(mock_storage):
     agent = TodoManager()
@@ -43,3 +44,51 @@ def test_manager_unknown_command(mock_storage):
     agent = TodoManager()
     response = agent.run("dance")
     assert "Unknown command" in response
+
+def test_manager_due_commands(mock_storage):
+    agent = TodoManager()
+    mock_storage.overdue.return_value = []
+    assert agent.run("overdue") == "No overdue tasks."
+
+    mock_storage.due_between.return_value = []
+    assert agent.run("due 3d") == "No tasks due within 3d."
+    (start, end), _ = mock_storage.due_between.call_args
+    assert end - start == 3 * 86400
+    assert agent.run("upcoming soonish").startswith("Error: Invalid duration")
+
+def test_manager_history_commands(mock_storage):
+    agent = TodoManager()
+    mock_storage.undo.return_value = 2
+    assert agent.run("undo") == "Undid 2 change(s)."
+    mock_storage.redo.return_value = 0
+    assert agent.run("redo") == "Nothing to redo."
+
+    mock_storage.state_at.return_value = []
+    assert agent.run("at 2025-12-02") == "No tasks at 2025-12-02."
+    mock_storage.state_at.assert_called_with(1764633600)
+    assert agent.run("at yesterday").startswith("Error: Invalid date")
+
+def test_manager_history_commands_without_history():
+    from src.todo.storage import InMemoryStorage
+    with patch('src.agent.skills._storage', InMemoryStorage()):
+        agent = TodoManager()
+        assert agent.run("undo") == "Error: History is not enabled for this store."
+        assert agent.run("redo") == "Error: History is not enabled for this store."
+        assert agent.run("at 2025-12-02") == "Error: History is not enabled for this store."
+
+def test_manager_filter_expressions(mock_storage):
+    agent = TodoManager()
+    mock_storage.filter_tasks.return_value = []
+
+    assert agent.run("list status=pending and (priority=high or tag:urgent)") == "No tasks found matching criteria."
+    mock_storage.filter_tasks.assert_called_with("(status=pending and (priority=high or tag:urgent))",
+                                                 limit=None, after=None)
+    agent.run("search tag:work and not priority=low")
+    mock_storage.filter_tasks.assert_called_with("tag:work and not priority=low", limit=None, after=None)
+
+    mock_storage.search_tasks.return_value = []
+    agent.run("search quarterly report")
+    mock_storage.search_tasks.assert_called_with(query="quarterly report", ranked=False, limit=None, after=None)
+    agent.run("find --ranked quarterly report")
+    mock_storage.search_tasks.assert_called_with(query="quarterly report", ranked=True, limit=None, after=None)
+    assert agent.run("search --ranked").startswith("Search query required.")
@@ -6,6 +6,7 @@ import src.agent.skills as skills
 @pytest.fixture
 def mock_storage():
     with patch('src.agent.skills._storage') as mock:
+        mock.resolve_id.side_effect = lambda task_id: task_id
         yield mock
 
 def test_add_task_skill(mock_storage):
@@ -39,7 +40,28 @@ def test_list_tasks_filtered(mock_storage):
     
     result = skills.list_tasks(status="pending")
     assert "No tasks found" in result
-    mock_storage.search_tasks.assert_called_with(status="pending", priority=None, tags=None)
+    mock_storage.search_tasks.assert_called_with(status="pending", priority=None, tags=None, limit=None, after=None)
+
+def test_list_tasks_with_filter_expression(mock_storage):
+    mock_storage.filter_tasks.return_value = []
+    result = skills.list_tasks(where="tag:work or due<2026-11-01", status="pending")
+    assert "No tasks found" in result
+    mock_storage.filter_tasks.assert_called_with('(tag:work or due<2026-11-01) and status="pending"',
+                                                 limit=None, after=None)
+
+    mock_storage.filter_tasks.side_effect = ValueError("Invalid filter 'tag:' at position 5: expected a value after tag:")
+    assert skills.list_tasks(where="tag:").startswith("Error: Invalid filter")
+
+def test_filter_skills_quote_user_values():
+    from src.todo.storage import InMemoryStorage
+
+    storage = InMemoryStorage()
+    storage.add_tasks([Task(title='Say "hi" to Bob', tags=['o\'brien "jr"']), Task(title="Say hi")])
+    with patch('src.agent.skills._storage', storage):
+        result = skills.search_tasks(query='say "hi"', where="status=pending")
+        assert "Found 1 task(s)" in result and 'Say "hi" to Bob' in result
+        result = skills.list_tasks(where="text:say", tag='o\'brien "jr"')
+        assert result.count("ID:") == 1 and 'Say "hi" to Bob' in result
 
 def test_complete_task_skill(mock_storage):
     result = skills.complete_task("task-id")
@@ -55,3 +77,84 @@ def test_delete_task_skill(mock_storage):
     result = skills.delete_task("task-id")
     assert "deleted" in result
     mock_storage.delete_task.assert_called_with("task-id")
+
+def test_search_tasks_skill_ranked(mock_storage):
+    mock_storage.search_tasks.return_value = [Task(title="Buy milk", id="1")]
+
+    result = skills.search_tasks("milk", ranked=True)
+    assert "Found 1 task(s) matching 'milk'" in result
+    mock_storage.search_tasks.assert_called_with(query="milk", ranked=True, limit=None, after=None)
+
+def test_bulk_complete_skill(mock_storage):
+    mock_storage.update_tasks.side_effect = lambda updates: [Task(title="t", id=task_id) for task_id in updates]
+    result = skills.bulk_complete("id-1, id-2 id-3 id-1")
+    assert "3 task(s) marked as completed" in result
+    mock_storage.update_tasks.assert_called_with({
+        "id-1": {"status": "completed"},
+        "id-2": {"status": "completed"},
+        "id-3": {"status": "completed"},
+    })
+
+def test_bulk_delete_skill_unknown_id(mock_storage):
+    mock_storage.delete_tasks.side_effect = KeyError("Task with ID id-2 not found.")
+    result = skills.bulk_delete("id-1,id-2")
+    assert "Error: Task with ID id-2 not found. No tasks were deleted." == result
+
+def test_get_statistics_skill(mock_storage):
+    from src.todo.storage import InMemoryStorage
+    real = InMemoryStorage()
+    real.add_tasks([Task(title="A", priority="high", tags=["work"]),
+                    Task(title="B", status="completed", tags=["work"])])
+    mock_storage.statistics.return_value = real.statistics()
+
+    result = skills.get_statistics()
+    assert "Total tasks: 2" in result
+    assert "Completed: 1" in result
+    assert "High priority (pending): 1" in result
+    assert "work: 1/2" in result
+
+def test_complete_task_ambiguous_prefix(mock_storage):
+    from src.todo.storage import AmbiguousIDError
+    mock_storage.resolve_id.side_effect = AmbiguousIDError("ab", ["abc", "abd"])
+    result = skills.complete_task("ab")
+    assert result == "Error: ID prefix 'ab' is ambiguous; it matches abc, abd"
+    mock_storage.update_task.assert_not_called()
+
+def test_result_cache_is_bounded_lru():
+    from src.agent.cache import ResultCache
+
+    cache = ResultCache(max_size=2)
+    calls = []
+    compute = lambda value: (lambda: calls.append(value) or value)
+    assert cache.get_or_compute("a", 1, compute("A")) == "A"
+    assert cache.get_or_compute("b", 1, compute("B")) == "B"
+    assert cache.get_or_compute("a", 1, compute("A2")) == "A"  # hit; "a" is now most recent
+    assert cache.get_or_compute("c", 1, compute("C")) == "C"   # evicts "b"
+    assert cache.get_or_compute("b", 1, compute("B2")) == "B2"
+    assert cache.get_or_compute("b", 2, compute("B3")) == "B3"  # new generation
+    assert calls == ["A", "B", "C", "B2", "B3"]
+    assert cache.stats() == {"hits": 1, "misses": 5, "size": 2, "max_size": 2}
+
+def test_read_skills_are_cached_until_the_store_changes():
+    from src.todo.storage import InMemoryStorage
+
+    storage = InMemoryStorage()
+    storage.add_task(Task(title="First", tags=["work"]))
+    with patch('src.agent.skills._storage', storage), \
+            patch.object(storage, 'list_tasks', wraps=storage.list_tasks) as list_spy, \
+            patch.object(storage, 'statistics', wraps=storage.statistics) as stats_spy:
+        before = skills.read_cache.stats()
+        first = skills.list_tasks()
+        assert skills.list_tasks(status=None) == first  # same normalized arguments
+        skills.get_statistics()
+        skills.get_statistics()
+        assert list_spy.call_count == 1 and stats_spy.call_count == 1
+
+        storage.add_task(Task(title="Second"))
+        assert "Second" in skills.list_tasks()
+        assert "Total tasks: 2" in skills.get_statistics()
+        assert list_spy.call_count == 2 and stats_spy.call_count == 2
+
+        after = skills.read_cache.stats()
+        assert after["hits"] - before["hits"] == 2
+        assert after["misses"] - before["misses"] == 4
@@ -0,0 +1,1228 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.todo import binformat
+from src.todo.aio import AsyncStorage
+from src.todo.client import DaemonError, StoreClient, connect
+from src.todo.daemon import StoreDaemon
+from src.todo.models import Task
+from src.todo.storage import FileStorage, InMemoryStorage, SQLiteStorage, convert_store
+
+
+# --- Journaled FileStorage ---
+def test_journal_appends_instead_of_rewriting(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    task = Task(title="Journaled")
+    storage.add_task(task)
+
+    assert not (tmp_path / "tasks.json").exists()
+    lines = (tmp_path / "tasks.journal").read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["op"] == "add"
+
+
+def test_journal_replays_on_load(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    keep = Task(title="Keep")
+    drop = Task(title="Drop")
+    storage.add_task(keep)
+    storage.add_task(drop)
+    storage.update_task(keep.id, title="Kept", tags=["a"])
+    storage.delete_task(drop.id)
+
+    reloaded = FileStorage(storage_dir=tmp_path, journal=True)
+    assert [t.id for t in reloaded.list_tasks()] == [keep.id]
+    assert reloaded.get_task(keep.id).title == "Kept"
+    assert reloaded.get_task(keep.id).tags == ["a"]
+    assert reloaded.get_task(keep.id).modified_at is not None
+
+
+def test_journal_compacts_into_snapshot(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True, compact_every=3)
+    tasks = [Task(title=f"Task {i}") for i in range(3)]
+    for task in tasks:
+        storage.add_task(task)
+
+    assert not (tmp_path / "tasks.journal").exists()
+    snapshot = json.loads((tmp_path / "tasks.json").read_text())
+    assert set(snapshot) == {t.id for t in tasks}
+
+    storage.delete_task(tasks[0].id)
+    reloaded = FileStorage(storage_dir=tmp_path, journal=True)
+    assert {t.id for t in reloaded.list_tasks()} == {tasks[1].id, tasks[2].id}
+
+
+def test_journal_ignores_torn_final_record(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    task = Task(title="Survivor")
+    storage.add_task(task)
+    with open(tmp_path / "tasks.journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "id"')
+
+    reloaded = FileStorage(storage_dir=tmp_path, journal=True)
+    assert reloaded.get_task(task.id).title == "Survivor"
+
+
+def test_plain_mode_folds_leftover_journal(tmp_path):
+    journaled = FileStorage(storage_dir=tmp_path, journal=True)
+    first = Task(title="First")
+    journaled.add_task(first)
+
+    plain = FileStorage(storage_dir=tmp_path)
+    assert plain.get_task(first.id).title == "First"
+    plain.add_task(Task(title="Second"))
+
+    assert not (tmp_path / "tasks.journal").exists()
+    assert len(FileStorage(storage_dir=tmp_path).list_tasks()) == 2
+
+
+# --- SQLiteStorage ---
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    storage = SQLiteStorage(storage_dir=tmp_path)
+    yield storage
+    storage.close()
+
+
+def test_sqlite_crud_roundtrip(sqlite_storage):
+    task = Task(title="Write spec", description="Draft", tags=["work", "docs"], due_date="2025-12-10")
+    sqlite_storage.add_task(task)
+    assert sqlite_storage.get_task(task.id) == task
+
+    with pytest.raises(ValueError, match="already exists"):
+        sqlite_storage.add_task(task)
+
+    updated = sqlite_storage.update_task(task.id, title="Write final spec", tags=["docs"], priority="high")
+    assert updated.modified_at is not None
+    stored = sqlite_storage.get_task(task.id)
+    assert stored.title == "Write final spec"
+    assert stored.tags == ["docs"]
+    assert stored.priority == "high"
+
+    with pytest.raises(ValueError, match="Invalid priority"):
+        sqlite_storage.update_task(task.id, priority="urgent")
+
+    sqlite_storage.delete_task(task.id)
+    with pytest.raises(KeyError, match=f"Task with ID {task.id} not found."):
+        sqlite_storage.get_task(task.id)
+    with pytest.raises(KeyError):
+        sqlite_storage.delete_task(task.id)
+
+
+def test_sqlite_list_and_search_order(sqlite_storage):
+    done = Task(title="Done first", status="completed", created_at="2025-12-07T08:00:00Z")
+    older = Task(title="Buy milk", description="2 liters", tags=["shopping"], created_at="2025-12-07T09:00:00Z")
+    newer = Task(title="Report", description="Monthly WORK report", tags=["work"], priority="high",
+                 created_at="2025-12-07T10:00:00Z")
+    for task in (newer, done, older):
+        sqlite_storage.add_task(task)
+
+    assert [t.id for t in sqlite_storage.list_tasks()] == [older.id, newer.id, done.id]
+    assert sqlite_storage.search_tasks(query="work") == [newer]
+    assert sqlite_storage.search_tasks(status="completed") == [done]
+    assert sqlite_storage.search_tasks(priority="high") == [newer]
+    assert sqlite_storage.search_tasks(tags=["shopping", "work"]) == [older, newer]
+    assert sqlite_storage.search_tasks(query="milk", tags=["work"]) == []
+
+
+def test_sqlite_persists_across_connections(tmp_path):
+    first = SQLiteStorage(storage_dir=tmp_path)
+    task = Task(title="Persisted", tags=["a", "b"])
+    first.add_task(task)
+    first.close()
+
+    second = SQLiteStorage(storage_dir=tmp_path)
+    assert second.get_task(task.id).tags == ["a", "b"]
+    second.close()
+
+
+# --- Secondary indexes ---
+def _scan(storage, status=None, priority=None, tags=None):
+    """Reference implementation of the filter semantics."""
+    return sorted(
+        (t for t in storage._tasks.values()
+         if (not status or t.status == status)
+         and (not priority or t.priority == priority)
+         and (not tags or any(tag in t.tags for tag in tags))),
+        key=lambda t: (t.status == 'completed', t.created_at, t.id),
+    )
+
+
+@pytest.fixture(params=["memory", "file", "lazy"])
+def indexed_storage(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStorage()
+    if request.param == "lazy":
+        return FileStorage(storage_dir=tmp_path, journal=True, lazy=True, cache_size=2, format="binary")
+    return FileStorage(storage_dir=tmp_path, journal=True)
+
+
+def test_indexes_follow_updates(indexed_storage):
+    a = Task(title="A", tags=["work"], priority="high", created_at="2025-12-07T09:00:00Z")
+    b = Task(title="B", tags=["home"], priority="low", created_at="2025-12-07T10:00:00Z")
+    indexed_storage.add_task(a)
+    indexed_storage.add_task(b)
+
+    indexed_storage.update_task(a.id, tags=["home", "urgent"], status="completed")
+    indexed_storage.update_task(b.id, priority="high")
+
+    assert indexed_storage.search_tasks(tags=["work"]) == []
+    assert indexed_storage.search_tasks(tags=["home"]) == [b, a]
+    assert indexed_storage.search_tasks(tags=["urgent"], status="completed") == [a]
+    assert indexed_storage.search_tasks(priority="high") == [b, a]
+    assert indexed_storage.search_tasks(priority="low") == []
+
+    indexed_storage.delete_task(a.id)
+    assert indexed_storage.search_tasks(tags=["home"]) == [b]
+    assert indexed_storage.search_tasks(status="completed") == []
+
+
+def test_indexes_match_full_scan(indexed_storage):
+    statuses = ["pending", "completed"]
+    priorities = ["high", "medium", "low"]
+    tag_pool = ["a", "b", "c", "d"]
+    tasks = []
+    for i in range(40):
+        task = Task(
+            title=f"Task {i}",
+            status=statuses[i % 2],
+            priority=priorities[i % 3],
+            tags=tag_pool[i % 4:i % 4 + 2],
+            created_at=f"2025-12-07T10:{i % 7:02d}:00Z",
+        )
+        indexed_storage.add_task(task)
+        tasks.append(task)
+    for i, task in enumerate(tasks[::3]):
+        indexed_storage.update_task(task.id, status=statuses[(i + 1) % 2], tags=tag_pool[i % 3:i % 3 + 1])
+    for task in tasks[::5]:
+        indexed_storage.delete_task(task.id)
+
+    for status in [None] + statuses:
+        for priority in [None] + priorities:
+            for tags in [None, ["a"], ["b", "d"]]:
+                assert indexed_storage.search_tasks(status=status, priority=priority, tags=tags) == \
+                    _scan(indexed_storage, status, priority, tags)
+
+
+def test_rejected_update_leaves_task_untouched():
+    storage = InMemoryStorage()
+    task = Task(title="Stable", priority="low")
+    storage.add_task(task)
+
+    with pytest.raises(ValueError):
+        storage.update_task(task.id, title="Changed", priority="urgent")
+    assert task.title == "Stable"
+    assert storage.search_tasks(priority="low") == [task]
+
+
+# --- Full-text index ---
+def test_text_index_substring_and_case(indexed_storage):
+    milk = Task(title="Buy MILK", description="Semi-skimmed", created_at="2025-12-07T09:00:00Z")
+    report = Task(title="Report", description="Monthly milkshake budget", created_at="2025-12-07T10:00:00Z")
+    indexed_storage.add_task(milk)
+    indexed_storage.add_task(report)
+
+    assert indexed_storage.search_tasks(query="milk") == [milk, report]
+    assert indexed_storage.search_tasks(query="SKIM") == [milk]
+    assert indexed_storage.search_tasks(query="ly m") == [report]
+    assert indexed_storage.search_tasks(query="k") == [milk, report]
+    assert indexed_storage.search_tasks(query="yogurt") == []
+
+    indexed_storage.update_task(milk.id, title="Buy bread", description=None)
+    assert indexed_storage.search_tasks(query="milk") == [report]
+    assert indexed_storage.search_tasks(query="bread") == [milk]
+
+    indexed_storage.delete_task(report.id)
+    assert indexed_storage.search_tasks(query="milk") == []
+
+
+def test_ranked_search_prefers_title_word_matches(indexed_storage):
+    in_description = Task(title="Errands", description="pick up milk", created_at="2025-12-07T08:00:00Z")
+    substring_only = Task(title="Milkshake recipe", created_at="2025-12-07T09:00:00Z")
+    title_word = Task(title="Milk the cow", created_at="2025-12-07T10:00:00Z")
+    for task in (in_description, substring_only, title_word):
+        indexed_storage.add_task(task)
+
+    assert indexed_storage.search_tasks(query="milk") == [in_description, substring_only, title_word]
+    assert indexed_storage.search_tasks(query="milk", ranked=True) == [title_word, substring_only, in_description]
+
+
+# --- Ordered listing ---
+def test_list_tasks_keeps_order_through_mutations(indexed_storage):
+    tasks = [Task(title=f"Task {i}", created_at=f"2025-12-07T10:00:{i:02d}Z") for i in range(6)]
+    for task in reversed(tasks):
+        indexed_storage.add_task(task)
+
+    assert indexed_storage.list_tasks() == tasks
+
+    indexed_storage.update_task(tasks[0].id, status="completed")
+    indexed_storage.delete_task(tasks[3].id)
+    expected = [tasks[1], tasks[2], tasks[4], tasks[5], tasks[0]]
+    assert indexed_storage.list_tasks() == expected
+    assert indexed_storage.search_tasks(query="task") == expected
+
+    assert indexed_storage.list_tasks(limit=2) == expected[:2]
+    assert indexed_storage.list_tasks(limit=2, offset=3) == expected[3:5]
+    assert indexed_storage.list_tasks(offset=4) == expected[4:]
+    assert indexed_storage.list_tasks(limit=3, offset=10) == []
+
+
+def test_sqlite_list_tasks_window(sqlite_storage):
+    tasks = [Task(title=f"Task {i}", created_at=f"2025-12-07T10:00:{i:02d}Z") for i in range(4)]
+    for task in tasks:
+        sqlite_storage.add_task(task)
+
+    assert sqlite_storage.list_tasks(limit=2, offset=1) == tasks[1:3]
+    assert sqlite_storage.list_tasks(offset=3) == tasks[3:]
+
+
+# --- Cursor pagination and streaming ---
+@pytest.fixture(params=["memory", "file", "lazy", "sqlite"])
+def any_storage(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryStorage()
+    elif request.param == "file":
+        yield FileStorage(storage_dir=tmp_path, journal=True)
+    elif request.param == "lazy":
+        yield FileStorage(storage_dir=tmp_path, lazy=True, cache_size=2, format="binary")
+    else:
+        storage = SQLiteStorage(storage_dir=tmp_path)
+        yield storage
+        storage.close()
+
+
+def test_cursor_pages_cover_listing_once(any_storage):
+    tasks = [Task(title=f"Task {i}", priority=["high", "low"][i % 2],
+                  created_at=f"2025-12-07T10:00:{i:02d}Z") for i in range(7)]
+    for task in tasks:
+        any_storage.add_task(task)
+
+    seen, after = [], None
+    while True:
+        page = any_storage.list_tasks(limit=3, after=after)
+        if not page:
+            break
+        seen += page
+        after = any_storage.cursor_for(page[-1])
+    assert seen == tasks
+
+    first = any_storage.search_tasks(priority="high", limit=2)
+    rest = any_storage.search_tasks(priority="high", after=any_storage.cursor_for(first[-1]))
+    assert first + rest == tasks[0::2]
+
+
+def test_iter_tasks_tolerates_mutation(any_storage):
+    tasks = [Task(title=f"Task {i}", created_at=f"2025-12-07T10:00:{i:02d}Z") for i in range(7)]
+    for task in tasks:
+        any_storage.add_task(task)
+
+    completed = []
+    for task in any_storage.iter_tasks(status="pending", batch_size=2):
+        any_storage.update_task(task.id, status="completed")
+        completed.append(task.id)
+    assert completed == [t.id for t in tasks]
+    assert [t.id for t in any_storage.iter_tasks(batch_size=3)] == [t.id for t in tasks]
+
+
+def test_invalid_cursor_is_rejected(any_storage):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        any_storage.list_tasks(after="not-a-cursor")
+
+
+# --- Batch mutations ---
+def test_bulk_update_validates_before_changing(any_storage):
+    a, b = Task(title="A"), Task(title="B")
+    any_storage.add_tasks([a, b])
+
+    with pytest.raises(KeyError):
+        any_storage.update_tasks({a.id: {"status": "completed"}, "missing": {"status": "completed"}})
+    with pytest.raises(ValueError):
+        any_storage.update_tasks({a.id: {"status": "completed"}, b.id: {"priority": "urgent"}})
+    assert any_storage.search_tasks(status="completed") == []
+
+    any_storage.update_tasks({a.id: {"status": "completed"}, b.id: {"status": "completed"}})
+    assert len(any_storage.search_tasks(status="completed")) == 2
+
+    with pytest.raises(KeyError):
+        any_storage.delete_tasks([a.id, "missing"])
+    assert len(any_storage.list_tasks()) == 2
+    any_storage.delete_tasks([a.id, b.id])
+    assert any_storage.list_tasks() == []
+
+
+def test_bulk_add_rejects_duplicates(any_storage):
+    task = Task(title="Once")
+    with pytest.raises(ValueError, match="already exists"):
+        any_storage.add_tasks([task, task])
+    assert any_storage.list_tasks() == []
+
+
+def test_batch_rolls_back_on_error(any_storage):
+    kept = Task(title="Kept", tags=["x"])
+    any_storage.add_task(kept)
+
+    with pytest.raises(RuntimeError):
+        with any_storage.batch():
+            any_storage.add_task(Task(title="Added"))
+            any_storage.update_task(kept.id, title="Renamed", tags=["y"])
+            any_storage.delete_task(kept.id)
+            raise RuntimeError("abort")
+
+    assert [t.title for t in any_storage.list_tasks()] == ["Kept"]
+    assert any_storage.get_task(kept.id).tags == ["x"]
+    assert any_storage.search_tasks(tags=["x"])[0].id == kept.id
+    assert any_storage.search_tasks(query="added") == []
+
+
+def test_file_batch_persists_once(tmp_path, monkeypatch):
+    storage = FileStorage(storage_dir=tmp_path)
+    saves = []
+    original = storage._save_tasks
+    monkeypatch.setattr(storage, "_save_tasks", lambda: (saves.append(1), original()))
+
+    tasks = storage.add_tasks(Task(title=f"Task {i}") for i in range(50))
+    storage.update_tasks({t.id: {"status": "completed"} for t in tasks})
+    assert len(saves) == 2
+
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.delete_tasks([t.id for t in tasks])
+            raise RuntimeError("abort")
+    assert len(saves) == 2
+    assert len(FileStorage(storage_dir=tmp_path).search_tasks(status="completed")) == 50
+
+
+def test_failed_journal_commit_leaves_nothing_to_replay(tmp_path, monkeypatch):
+    import src.todo.storage as storage_module
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    kept = Task(title="Kept")
+    storage.add_task(kept)
+
+    def sync_then_fail(f, durability):
+        f.flush()  # the records reach the file before the failure
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage_module, "_sync", sync_then_fail)
+    with pytest.raises(OSError, match="disk full"):
+        with storage.batch():
+            storage.add_task(Task(title="Rolled back"))
+            storage.update_task(kept.id, title="Renamed")
+    monkeypatch.undo()
+    assert [t.title for t in storage.list_tasks()] == ["Kept"]
+
+    reopened = FileStorage(storage_dir=tmp_path, journal=True)
+    assert [t.title for t in reopened.list_tasks()] == ["Kept"]
+    storage.add_task(Task(title="Later"))
+    assert sorted(t.title for t in FileStorage(storage_dir=tmp_path, journal=True).list_tasks()) == ["Kept", "Later"]
+
+
+def test_failed_compaction_keeps_the_journaled_write(tmp_path, monkeypatch, capsys):
+    storage = FileStorage(storage_dir=tmp_path, journal=True, compact_every=1)
+    monkeypatch.setattr(storage, "_save_tasks", lambda: (_ for _ in ()).throw(OSError("disk full")))
+    task = Task(title="Journaled")
+    storage.add_task(task)
+    assert "Error compacting the task journal: disk full" in capsys.readouterr().err
+    assert FileStorage(storage_dir=tmp_path, journal=True).get_task(task.id).title == "Journaled"
+
+
+# --- Crash safety ---
+def test_failed_save_keeps_previous_snapshot(tmp_path, monkeypatch):
+    storage = FileStorage(storage_dir=tmp_path)
+    first = Task(title="First")
+    storage.add_task(first)
+
+    def broken_dump(obj, f, **kwargs):
+        f.write('{"partial": ')
+        raise OSError("disk full")
+
+    monkeypatch.setattr("src.todo.storage.json.dump", broken_dump)
+    with pytest.raises(OSError):
+        storage.add_task(Task(title="Second"))
+    monkeypatch.undo()
+
+    assert not list(tmp_path.glob("*.tmp"))
+    assert [t.id for t in FileStorage(storage_dir=tmp_path).list_tasks()] == [first.id]
+
+
+def test_corrupt_snapshot_is_moved_aside(tmp_path, capsys):
+    (tmp_path / "tasks.json").write_text('{"truncated": {"title": ')
+
+    storage = FileStorage(storage_dir=tmp_path)
+    assert storage.list_tasks() == []
+    assert "moved to" in capsys.readouterr().err
+    storage.add_task(Task(title="Fresh"))
+
+    corrupt = list(tmp_path.glob("tasks.json.corrupt-*"))
+    assert len(corrupt) == 1
+    assert corrupt[0].read_text() == '{"truncated": {"title": '
+
+
+def test_appends_after_torn_journal_record_survive(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    storage.add_task(Task(title="Before"))
+    storage.close()
+    with open(tmp_path / "tasks.journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "task": {"title"')
+
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    storage.add_task(Task(title="After"))
+    storage.close()
+
+    reloaded = FileStorage(storage_dir=tmp_path, journal=True)
+    assert sorted(t.title for t in reloaded.list_tasks()) == ["After", "Before"]
+
+
+@pytest.mark.parametrize("durability", ["none", "flush", "fsync"])
+def test_durability_levels_persist(tmp_path, durability):
+    storage = FileStorage(storage_dir=tmp_path, journal=True, durability=durability)
+    task = Task(title="Durable")
+    storage.add_task(task)
+    storage.close()
+    assert FileStorage(storage_dir=tmp_path).get_task(task.id).title == "Durable"
+
+
+def test_invalid_durability_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Invalid durability"):
+        FileStorage(storage_dir=tmp_path, durability="eventually")
+
+
+# --- Multi-process sharing ---
+@pytest.mark.parametrize("journal", [False, True])
+def test_instances_see_each_others_writes(tmp_path, journal):
+    first = FileStorage(storage_dir=tmp_path, journal=journal)
+    second = FileStorage(storage_dir=tmp_path, journal=journal)
+
+    task = Task(title="Shared", tags=["a"])
+    first.add_task(task)
+    assert second.get_task(task.id).title == "Shared"
+    assert second.search_tasks(tags=["a"])[0].id == task.id
+
+    second.update_task(task.id, status="completed")
+    first.update_task(task.id, priority="high")
+    for storage in (first, second, FileStorage(storage_dir=tmp_path, journal=journal)):
+        stored = storage.get_task(task.id)
+        assert (stored.status, stored.priority) == ("completed", "high")
+
+    first.delete_task(task.id)
+    assert second.list_tasks() == []
+
+
+def test_unchanged_store_is_not_reloaded(tmp_path, monkeypatch):
+    storage = FileStorage(storage_dir=tmp_path, journal=True)
+    storage.add_task(Task(title="Cached"))
+
+    loads = []
+    monkeypatch.setattr(storage, "_load_tasks", lambda: loads.append(1))
+    storage.list_tasks()
+    storage.search_tasks(query="cached")
+    storage.add_task(Task(title="Another"))
+    assert loads == []
+
+
+def _add_many(storage_dir, worker, count):
+    storage = FileStorage(storage_dir=storage_dir, journal=worker % 2 == 0, compact_every=7)
+    for i in range(count):
+        storage.add_task(Task(title=f"Worker {worker} task {i}"))
+    storage.close()
+
+
+def test_concurrent_processes_lose_no_updates(tmp_path):
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_add_many, args=(tmp_path, worker, 15)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert len(FileStorage(storage_dir=tmp_path, journal=True).list_tasks()) == 60
+
+
+def test_write_behind_defers_until_flush(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True, write_behind=True,
+                          flush_interval=60, flush_threshold=1000)
+    task = Task(title="Deferred")
+    storage.add_task(task)
+    storage.update_task(task.id, status="completed")
+    assert storage.get_task(task.id).status == "completed"
+    assert FileStorage(storage_dir=tmp_path).list_tasks() == []
+
+    storage.flush()
+    assert FileStorage(storage_dir=tmp_path).get_task(task.id).status == "completed"
+    storage.close()
+
+
+def test_write_behind_flushes_on_threshold_and_interval(tmp_path):
+    import time
+
+    storage = FileStorage(storage_dir=tmp_path, write_behind=True, flush_interval=60, flush_threshold=3)
+    storage.add_tasks([Task(title=f"Task {i}") for i in range(3)])
+    deadline = time.monotonic() + 5
+    while len(FileStorage(storage_dir=tmp_path).list_tasks()) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(FileStorage(storage_dir=tmp_path).list_tasks()) == 3
+    storage.close()
+
+    storage = FileStorage(storage_dir=tmp_path, write_behind=True, flush_interval=0.05, flush_threshold=1000)
+    storage.add_task(Task(title="Timed"))
+    deadline = time.monotonic() + 5
+    while len(FileStorage(storage_dir=tmp_path).list_tasks()) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(FileStorage(storage_dir=tmp_path).list_tasks()) == 4
+    storage.close()
+
+
+def test_write_behind_close_flushes_and_rebases(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, journal=True, write_behind=True,
+                          flush_interval=60, flush_threshold=1000)
+    mine, theirs = Task(title="Mine"), Task(title="Theirs")
+    storage.add_task(mine)
+    FileStorage(storage_dir=tmp_path).add_task(theirs)
+
+    # A read picks up the other process' task without dropping the held-back one.
+    assert {task.title for task in storage.list_tasks()} == {"Mine", "Theirs"}
+    with pytest.raises(ValueError):
+        with storage.batch():
+            storage.delete_task(mine.id)
+            raise ValueError("abort")
+    storage.close()
+
+    titles = {task.title for task in FileStorage(storage_dir=tmp_path).list_tasks()}
+    assert titles == {"Mine", "Theirs"}
+    assert FileStorage(storage_dir=tmp_path).get_task(theirs.id) is not None
+
+
+# --- Binary snapshot format ---
+def test_binary_format_round_trips_every_field():
+    tasks = [
+        Task(title="Plain"),
+        Task(title="Ünïcode ✓", description="multi\nline", status="completed", priority=None,
+             tags=["work", "urgent", "work"], modified_at="2025-12-08T10:00:00Z", due_date="2025-12-31"),
+        Task(title="Odd stamps", created_at="2025-13-01T00:00:00Z", due_date="tomorrow", description=""),
+    ]
+    decoded = binformat.decode(binformat.encode(tasks))
+    assert [task.to_dict() for task in decoded.values()] == [task.to_dict() for task in tasks]
+
+
+def test_binary_format_rejects_foreign_versions():
+    data = bytearray(binformat.encode([Task(title="Versioned")]))
+    data[8] = binformat.FORMAT_VERSION + 1
+    with pytest.raises(binformat.FormatError, match="version"):
+        binformat.decode(bytes(data))
+    with pytest.raises(binformat.FormatError):
+        binformat.decode(b"{}")
+
+
+def test_binary_store_is_detected_and_journaled(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path, format="binary", journal=True, compact_every=2)
+    tasks = [Task(title=f"Task {i}", tags=["t"]) for i in range(3)]
+    storage.add_tasks(tasks)
+    storage.update_task(tasks[0].id, status="completed")
+
+    assert not (tmp_path / "tasks.json").exists()
+    reloaded = FileStorage(storage_dir=tmp_path)
+    assert reloaded.get_task(tasks[0].id).status == "completed"
+    assert len(reloaded.list_tasks()) == 3
+
+
+def test_convert_store_between_formats(tmp_path):
+    storage = FileStorage(storage_dir=tmp_path)
+    task = Task(title="Convert me", tags=["x"], due_date="2026-01-01T00:00:00Z")
+    storage.add_task(task)
+    storage.close()
+
+    assert convert_store("binary", tmp_path) == 1
+    assert not (tmp_path / "tasks.json").exists()
+    assert FileStorage(storage_dir=tmp_path).get_task(task.id).to_dict() == task.to_dict()
+
+    assert convert_store("json", tmp_path) == 1
+    assert not (tmp_path / "tasks.bin").exists()
+    assert json.loads((tmp_path / "tasks.json").read_text())[task.id] == task.to_dict()
+
+
+# --- Lazy, memory-mapped loading ---
+def test_lazy_store_touches_only_requested_tasks(tmp_path):
+    tasks = [Task(title=f"Task {i}", created_at=f"2025-12-07T10:00:{i:02d}Z") for i in range(20)]
+    FileStorage(storage_dir=tmp_path, format="binary").add_tasks(tasks)
+
+    storage = FileStorage(storage_dir=tmp_path, lazy=True, cache_size=4)
+    assert storage.get_task(tasks[3].id) == tasks[3]
+    storage.update_task(tasks[5].id, status="completed")
+    storage.delete_task(tasks[6].id)
+    storage.add_task(Task(title="New"))
+    assert not storage._index._built
+    assert len(storage._tasks._cache) <= 4
+
+    reloaded = FileStorage(storage_dir=tmp_path, lazy=True)
+    listed = reloaded.list_tasks()
+    assert len(listed) == 20
+    assert listed[-1].id == tasks[5].id
+    assert tasks[6].id not in {task.id for task in listed}
+    assert {task.id: task.to_dict() for task in listed} == {
+        task.id: task.to_dict() for task in FileStorage(storage_dir=tmp_path).list_tasks()
+    }
+
+
+def test_new_lazy_store_uses_json_like_eager_stores(tmp_path):
+    lazy = FileStorage(storage_dir=tmp_path, lazy=True)
+    lazy.add_task(Task(title="From the CLI"))
+    eager = FileStorage(storage_dir=tmp_path)
+    eager.add_task(Task(title="From the agent"))
+
+    assert not (tmp_path / "tasks.bin").exists()
+    assert len(lazy.list_tasks()) == len(FileStorage(storage_dir=tmp_path, lazy=True).list_tasks()) == 2
+
+
+def test_lazy_store_finds_records_by_id_index(tmp_path):
+    tasks = [Task(title=f"Task {i}") for i in range(50)]
+    data = binformat.encode(tasks)
+    snapshot = binformat.Snapshot(data)
+    for task in tasks:
+        assert snapshot.task_at(snapshot.find(task.id)) == task
+    assert snapshot.find("missing") is None
+    assert [task_id for task_id, _ in snapshot.scan()] == [task.id for task in tasks]
+
+
+def test_lazy_store_resolves_id_prefixes_without_building_the_index(tmp_path):
+    tasks = [Task(title=f"Task {i}") for i in range(50)]
+    FileStorage(storage_dir=tmp_path, format="binary").add_tasks(tasks)
+    storage = FileStorage(storage_dir=tmp_path, lazy=True)
+    storage.delete_task(tasks[10].id)
+    storage.update_task(tasks[20].id, title="Changed")
+    storage.add_task(Task(title="New"))
+    eager = FileStorage(storage_dir=tmp_path, format="binary")
+
+    for task in tasks[:10] + tasks[11:]:
+        assert storage.short_id(task.id, 4) == eager.short_id(task.id, 4)
+        assert storage.resolve_id(storage.short_id(task.id)) == task.id
+        assert storage._index.ids_with_prefix(task.id[:12]) == eager._index.ids_with_prefix(task.id[:12])
+    with pytest.raises(KeyError):
+        storage.resolve_id(tasks[10].id[:20])
+    assert not storage._index._built
+
+
+def test_snapshot_without_sorted_ids_falls_back_to_a_scan():
+    tasks = [Task(title=f"Task {i}") for i in range(20)]
+    data = bytearray(binformat.encode(tasks))
+    data[10] = binformat.FLAG_ID_INDEX  # as written before the sorted ID section existed
+    snapshot = binformat.Snapshot(bytes(data))
+    assert list(snapshot.sorted_ids) == sorted(task.id for task in tasks)
+    assert list(snapshot.ids_with_prefix(tasks[3].id[:-2])) == [tasks[3].id]
+
+
+# --- Column statistics ---
+NOW = 1765101600  # 2025-12-07T10:00:00Z
+DAY = 86400
+
+
+def _stats_tasks():
+    from src.todo.utils import format_iso
+    return [
+        Task(title="Late", tags=["work", "urgent"], priority="high",
+             created_at=format_iso(NOW - 2 * DAY), due_date=format_iso(NOW - DAY)),
+        Task(title="Very late", tags=["work"], created_at=format_iso(NOW - 10 * DAY),
+             due_date="2025-11-20"),
+        Task(title="Done", tags=["home"], status="completed", priority="low",
+             created_at=format_iso(NOW - 20 * DAY), due_date=format_iso(NOW - 30 * DAY)),
+        Task(title="Later", priority=None, created_at=format_iso(NOW - 100 * DAY),
+             due_date=format_iso(NOW + DAY)),
+    ]
+
+
+EXPECTED_STATS = {
+    "total": 4,
+    "by_status": {"pending": 3, "completed": 1},
+    "by_priority": {"high": 1, "medium": 1, "low": 1, None: 1},
+    "pending_by_priority": {"high": 1, "medium": 1, "low": 0, None: 1},
+    "by_tag": {"home": {"total": 1, "pending": 0}, "urgent": {"total": 1, "pending": 1},
+               "work": {"total": 2, "pending": 2}},
+    "overdue": 2,
+    "overdue_by_week": {0: 1, 2: 1},
+    "created_by_week": [1, 1, 1, 0, 0, 0, 0, 0],
+}
+
+
+def test_statistics_match_across_backends(any_storage):
+    tasks = _stats_tasks()
+    any_storage.add_tasks(tasks)
+    any_storage.add_task(Task(title="Gone", tags=["home"]))
+    assert any_storage.statistics(now=NOW)["by_tag"]["home"]["total"] == 2
+
+    gone = any_storage.search_tasks(query="Gone")[0]
+    any_storage.delete_task(gone.id)
+    any_storage.update_task(tasks[0].id, due_date=tasks[0].due_date)  # rewrites the row in place
+    assert any_storage.statistics(now=NOW) == EXPECTED_STATS
+
+
+def test_statistics_numpy_and_array_paths_agree(monkeypatch):
+    from src.todo import columns
+
+    table = columns.TaskColumns.build(_stats_tasks())
+    monkeypatch.setattr(columns, "np", None)
+    assert table.stats(now=NOW) == EXPECTED_STATS
+    monkeypatch.undo()
+    if columns.np is None:
+        pytest.skip("NumPy is not installed")
+    assert table.stats(now=NOW) == EXPECTED_STATS
+
+
+def test_statistics_counters_stay_consistent(indexed_storage):
+    import random
+    from src.todo.utils import format_iso
+
+    rng = random.Random(7)
+    ids = []
+    for step in range(300):
+        action = rng.random()
+        if action < 0.5 or not ids:
+            task = Task(title=f"T{step}", status=rng.choice(["pending", "completed"]),
+                        priority=rng.choice(["high", "low", None]), tags=rng.sample(["a", "b", "c"], rng.randint(0, 2)),
+                        created_at=format_iso(NOW - rng.randint(0, 80) * DAY),
+                        due_date=rng.choice([None, "2025-11-30", format_iso(NOW + rng.randint(-60, 5) * DAY)]))
+            indexed_storage.add_task(task)
+            ids.append(task.id)
+        elif action < 0.85:
+            indexed_storage.update_task(rng.choice(ids), status=rng.choice(["pending", "completed"]),
+                                        due_date=format_iso(NOW - rng.randint(-5, 40) * DAY), tags=["b"])
+        else:
+            indexed_storage.delete_task(ids.pop(rng.randrange(len(ids))))
+        if step % 50 == 0:
+            assert indexed_storage.check_statistics(now=NOW) == {}
+    assert indexed_storage.check_statistics(now=NOW) == {}
+    assert indexed_storage.statistics(now=NOW)["total"] == len(ids)
+
+    indexed_storage._index.counters.by_status["pending"] += 1  # a missed update shows up in the diff
+    assert set(indexed_storage.check_statistics(now=NOW)) == {"by_status"}
+
+
+def test_due_date_queries(any_storage):
+    from src.todo.utils import format_iso
+
+    late = Task(title="Late", due_date=format_iso(NOW - 3 * DAY))
+    later = Task(title="Very late", due_date="2025-11-20")
+    soon = Task(title="Soon", due_date=format_iso(NOW + 2 * DAY))
+    far = Task(title="Far", due_date="2026-03-01T12:00:00+01:00")
+    done = Task(title="Done", status="completed", due_date=format_iso(NOW - DAY))
+    undated = Task(title="Someday")
+    garbage = Task(title="Garbage", due_date="next tuesday")
+    any_storage.add_tasks([late, later, soon, far, done, undated, garbage])
+
+    titles = lambda tasks: [task.title for task in tasks]
+    assert titles(any_storage.overdue(now=NOW)) == ["Very late", "Late"]
+    assert titles(any_storage.due_between(NOW, NOW + 7 * DAY)) == ["Soon"]
+    assert titles(any_storage.due_between()) == ["Very late", "Late", "Soon", "Far"]
+    assert titles(any_storage.next_due(2, now=NOW)) == ["Soon", "Far"]
+
+    any_storage.update_task(later.id, status="completed")
+    any_storage.update_task(far.id, due_date=format_iso(NOW + DAY))
+    any_storage.update_task(done.id, status="pending")
+    any_storage.delete_task(soon.id)
+    assert titles(any_storage.overdue(now=NOW)) == ["Late", "Done"]
+    assert titles(any_storage.next_due(5, now=NOW)) == ["Far"]
+    assert titles(any_storage.overdue(now=NOW, limit=1)) == ["Late"]
+
+
+def test_resolve_id_prefixes(any_storage):
+    from src.todo.storage import AmbiguousIDError
+
+    ids = ["0190a1b2-0000-7000-8000-000000000001", "0190a1b2-0000-7000-8000-000000000002",
+           "0190a1c0-0000-7000-8000-000000000003", "abc"]
+    any_storage.add_tasks([Task(title=task_id, id=task_id) for task_id in ids])
+
+    assert any_storage.resolve_id("0190a1c") == ids[2]
+    assert any_storage.resolve_id(ids[0]) == ids[0]
+    assert any_storage.resolve_id("ab") == "abc"
+    with pytest.raises(AmbiguousIDError) as error:
+        any_storage.resolve_id("0190a1b2")
+    assert error.value.candidates == ids[:2]
+    assert ids[1] in str(error.value)
+    for prefix in ("0190a1d", "b", ""):
+        with pytest.raises(KeyError):
+            any_storage.resolve_id(prefix)
+
+    assert any_storage.short_id(ids[2]) == "0190a1c0"
+    assert any_storage.short_id(ids[0]) == ids[0]
+    any_storage.delete_task(ids[1])
+    assert any_storage.short_id(ids[0]) == "0190a1b2"
+    assert any_storage.resolve_id("0190a1b2") == ids[0]
+
+
+def test_change_feed(any_storage):
+    batches = []
+    unsubscribe = any_storage.subscribe(batches.append)
+    start = any_storage.version
+
+    task = Task(title="Watch me", tags=["a"])
+    any_storage.add_task(task)
+    any_storage.update_task(task.id, title="Watched", tags=["a"])
+    assert [[event.kind for event in batch] for batch in batches] == [["added"], ["updated"]]
+    update = batches[1][0]
+    assert update.task_id == task.id and update.task.title == "Watched"
+    assert set(update.changes) == {"title", "modified_at"}
+    assert update.changes["title"] == ("Watch me", "Watched")
+
+    others = [Task(title="One"), Task(title="Two")]
+    any_storage.add_tasks(others)
+    any_storage.delete_tasks([task.id, others[0].id])
+    assert [[event.kind for event in batch] for batch in batches[2:]] == [["added", "added"], ["deleted", "deleted"]]
+    assert batches[3][0].task.title == "Watched"
+
+    with pytest.raises(KeyError):
+        any_storage.delete_tasks([others[1].id, "missing"])
+    assert len(batches) == 4  # a rolled-back batch publishes nothing
+
+    events = any_storage.changes_since(start)
+    assert [event.version for event in events] == list(range(start + 1, start + 7))
+    assert any_storage.version == start + 6
+    assert any_storage.changes_since(any_storage.version) == []
+
+    unsubscribe()
+    any_storage.update_task(others[1].id, status="completed")
+    assert len(batches) == 4
+    assert any_storage.changes_since(start + 6)[0].changes["status"] == ("pending", "completed")
+
+
+def test_update_cannot_change_the_id(any_storage):
+    task = Task(title="Keep my ID")
+    any_storage.add_task(task)
+    batches = []
+    any_storage.subscribe(batches.append)
+
+    updated = any_storage.update_task(task.id, id="other", title="Renamed")
+    assert updated.id == task.id
+    assert any_storage.get_task(task.id).title == "Renamed"
+    with pytest.raises(KeyError):
+        any_storage.get_task("other")
+    assert set(batches[0][0].changes) == {"title", "modified_at"}
+
+
+def test_change_feed_sees_other_processes(tmp_path):
+    first = FileStorage(storage_dir=tmp_path, journal=True)
+    first.add_task(Task(title="Seed"))  # so that later writes only append to the journal
+    second = FileStorage(storage_dir=tmp_path, journal=True)
+    task = Task(title="Shared")
+    first.add_task(task)
+    first.update_task(task.id, priority="high")
+
+    version = second.version
+    assert [event.kind for event in second.changes_since(version - 2)] == ["added", "updated"]
+    assert second.changes_since(version - 1)[0].changes["priority"] == ("medium", "high")
+
+    first.compact()
+    assert second.changes_since(version)[0].kind == "reloaded"
+
+
+def test_sqlite_change_feed_sees_other_connections(tmp_path):
+    first, second = SQLiteStorage(storage_dir=tmp_path), SQLiteStorage(storage_dir=tmp_path)
+    try:
+        version = second.version
+        first.add_task(Task(title="Elsewhere"))
+        assert [event.kind for event in second.changes_since(version)] == ["reloaded"]
+        assert second.version == version + 1
+    finally:
+        first.close()
+        second.close()
+
+
+# --- Event history ---
+@pytest.fixture(params=["memory", "file", "lazy"])
+def history_storage(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStorage(history=True)
+    if request.param == "lazy":
+        return FileStorage(storage_dir=tmp_path, lazy=True, cache_size=2, history=True, format="binary")
+    return FileStorage(storage_dir=tmp_path, journal=True, history=True)
+
+
+def test_undo_and_redo(history_storage):
+    a, b = Task(title="A", tags=["x"]), Task(title="B")
+    history_storage.add_task(a)
+    history_storage.update_task(a.id, title="A2", tags=["y"])
+    with history_storage.batch():
+        history_storage.add_task(b)
+        history_storage.delete_task(a.id)
+
+    assert history_storage.undo() == 2  # the batch is undone as a whole
+    assert [(t.title, t.tags) for t in history_storage.list_tasks()] == [("A2", ["y"])]
+    assert history_storage.undo() == 1
+    assert [(t.title, t.tags) for t in history_storage.list_tasks()] == [("A", ["x"])]
+    assert history_storage.redo() == 1
+    assert history_storage.redo() == 2
+    assert [t.title for t in history_storage.list_tasks()] == ["B"]
+    assert history_storage.redo() == 0
+
+    assert history_storage.undo() == 2
+    history_storage.update_task(a.id, priority="high")  # a new change discards the redo stack
+    assert history_storage.redo() == 0
+    assert history_storage.undo() == 1
+    assert history_storage.get_task(a.id).priority == "medium"
+
+
+def test_state_at_replays_from_nearest_snapshot(history_storage, monkeypatch):
+    start = int(time.time()) + 1000
+    clock = [start]
+    monkeypatch.setattr("src.todo.history.now_epoch", lambda: clock[0])
+    history_storage.history.snapshot_every = 3
+    task = Task(title="v0")
+    history_storage.add_task(task)
+    for version in range(1, 8):
+        clock[0] += 10
+        history_storage.update_task(task.id, title=f"v{version}")
+    clock[0] += 10
+    history_storage.delete_task(task.id)
+
+    assert [t.title for t in history_storage.state_at(start)] == ["v0"]
+    for version in range(1, 8):
+        assert [t.title for t in history_storage.state_at(start + version * 10 + 5)] == [f"v{version}"]
+    assert history_storage.state_at(clock[0]) == []
+    assert len(history_storage.history._snapshot_headers()) == 4  # the base one plus one per 3 events
+    with pytest.raises(ValueError, match="No history before"):
+        history_storage.state_at(start - 10 ** 6)
+
+
+def test_history_is_shared_between_processes(tmp_path):
+    first = FileStorage(storage_dir=tmp_path, journal=True, history=True)
+    task = Task(title="Shared")
+    first.add_task(task)
+    first.update_task(task.id, status="completed")
+
+    second = FileStorage(storage_dir=tmp_path, journal=True, history=True)
+    assert second.undo() == 1
+    assert first.get_task(task.id).status == "pending"
+    assert first.redo() == 1
+    assert second.get_task(task.id).status == "completed"
+
+
+def test_history_must_be_enabled(tmp_path):
+    with pytest.raises(ValueError, match="History is not enabled"):
+        InMemoryStorage().undo()
+    with pytest.raises(ValueError, match="History is not enabled"):
+        FileStorage(storage_dir=tmp_path).state_at(NOW)
+
+
+# --- Asyncio facade ---
+def test_async_storage_coalesces_concurrent_writes(tmp_path, monkeypatch):
+    store = FileStorage(storage_dir=tmp_path)
+    saves = []
+    original = store._save_tasks
+    monkeypatch.setattr(store, "_save_tasks", lambda: saves.append(1) or original())
+    tasks = [Task(title=f"Task {i}") for i in range(20)]
+
+    async def main():
+        async with AsyncStorage(store) as facade:
+            await asyncio.gather(*(facade.add_task(task) for task in tasks))
+            duplicate = facade.add_task(tasks[0])
+            update = facade.update_task(tasks[1].id, priority="high")
+            results = await asyncio.gather(duplicate, update, return_exceptions=True)
+            assert isinstance(results[0], ValueError)  # fails alone, the update still commits
+            assert (await facade.get_task(tasks[1].id)).priority == "high"
+            return [task.title async for task in facade.iter_tasks(batch_size=7)]
+
+    titles = asyncio.run(main())
+    assert sorted(titles) == sorted(task.title for task in tasks)
+    assert len(saves) <= 3  # one write per group instead of one per task
+    assert len(FileStorage(storage_dir=tmp_path).list_tasks()) == 20
+
+
+def test_async_storage_rolls_back_a_group_that_cannot_be_written(tmp_path, monkeypatch):
+    store = FileStorage(storage_dir=tmp_path)
+    kept = Task(title="Kept")
+    store.add_task(kept)
+    original = store._write_records
+
+    def failing_write(records):
+        raise OSError("disk full")
+
+    async def main():
+        async with AsyncStorage(store) as facade:
+            monkeypatch.setattr(store, "_write_records", failing_write)
+            results = await asyncio.gather(facade.add_task(Task(title="Lost")),
+                                           facade.update_task(kept.id, title="Renamed"),
+                                           return_exceptions=True)
+            assert all(isinstance(result, OSError) for result in results)
+            monkeypatch.setattr(store, "_write_records", original)
+            return [task.title for task in await facade.list_tasks()]
+
+    assert asyncio.run(main()) == ["Kept"]
+    assert [task.title for task in FileStorage(storage_dir=tmp_path).list_tasks()] == ["Kept"]
+
+
+def test_async_storage_over_sqlite(tmp_path):
+    async def main():
+        facade = AsyncStorage(SQLiteStorage(storage_dir=tmp_path))
+        delivered = []
+        facade.subscribe(delivered.append)
+        await asyncio.gather(*(facade.add_task(Task(title=f"T{i}")) for i in range(5)))
+        with pytest.raises(KeyError):
+            await facade.delete_task("missing")
+        assert len(await facade.list_tasks()) == 5
+        await asyncio.sleep(0)
+        await facade.close()
+        return delivered
+
+    delivered = asyncio.run(main())
+    assert sum(len(events) for events in delivered) == 5
+
+
+# --- Store daemon ---
+@pytest.fixture
+def store_daemon(tmp_path):
+    """A daemon serving an in-memory store, running on an event loop in a background thread."""
+    loop = asyncio.new_event_loop()
+    daemon = StoreDaemon(InMemoryStorage(history=True), 'memory', tmp_path / "daemon.sock")
+    loop.run_until_complete(daemon.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield daemon
+    asyncio.run_coroutine_threadsafe(daemon.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_daemon_client_matches_direct_storage(store_daemon):
+    client = connect('memory', store_daemon.socket_path)
+    direct = store_daemon.store.storage
+    tasks = [Task(title=f"Task {i}", priority=("high", None)[i % 2], tags=["work"] if i % 3 else [],
+                  due_date="2020-01-01" if i % 4 == 0 else None) for i in range(10)]
+    client.add_tasks(tasks[:-1])
+    client.add_task(tasks[-1])
+
+    assert client.get_task(tasks[0].id).to_dict() == tasks[0].to_dict()
+    assert client.resolve_id(client.short_id(tasks[3].id)) == tasks[3].id
+    assert client.short_ids([task.id for task in tasks]) == [direct.short_id(task.id) for task in tasks]
+    assert client.update_task(tasks[1].id, status="completed").status == "completed"
+    assert [task.id for task in client.list_tasks()] == [task.id for task in direct.list_tasks()]
+    paged = client.iter_tasks(where="priority=high and tag:work", batch_size=2)
+    assert [task.id for task in paged] == [task.id for task in direct.filter_tasks("priority=high and tag:work")]
+    # Non-string keys (priority None, week numbers) survive the trip.
+    assert client.statistics(now=1_700_000_000) == direct.statistics(now=1_700_000_000)
+    assert client.undo() == 1 and direct.get_task(tasks[1].id).status == "pending"
+
+    with pytest.raises(KeyError, match="not found"):
+        client.delete_task("missing")
+    with pytest.raises(ValueError, match="already exists"):
+        client.add_task(tasks[0])
+    client.delete_tasks([task.id for task in tasks])
+    assert client.list_tasks() == [] and client.version == direct.version
+    client.close()
+
+
+def test_daemon_connect_falls_back_and_rejects_bad_requests(store_daemon, tmp_path):
+    assert connect('memory', tmp_path / "missing.sock") is None
+    assert connect('file', store_daemon.socket_path) is None  # serves another storage type
+    (tmp_path / "stale.sock").touch()
+    assert connect('memory', tmp_path / "stale.sock") is None
+
+    client = StoreClient(store_daemon.socket_path)
+    with pytest.raises(DaemonError, match="Unknown method: close"):
+        client.call("close")
+    client._file.write(b"{oops\n")
+    client._file.flush()
+    assert json.loads(client._file.readline())["error"]["code"] == -32700
+    assert client.ping() == {"storage": "memory", "pid": os.getpid(), "history": True}  # still usable
+    client.close()
+    with pytest.raises(OSError, match="already listening"):
+        asyncio.run(StoreDaemon(InMemoryStorage(), 'memory', store_daemon.socket_path).start())
+
+
+def test_daemon_socket_is_private_and_the_client_is_thin(store_daemon):
+    import stat
+    import subprocess
+    import sys
+    assert stat.S_IMODE(os.stat(store_daemon.socket_path).st_mode) & 0o077 == 0  # owner only
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, src.todo.cli; "
+         "print(sorted(m for m in ('asyncio', 'src.todo.aio', 'src.todo.storage') if m in sys.modules))"],
+        capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == "[]"
+
+
+# --- Filter expressions ---
+FILTERS = [
+    "status=pending and (priority=high or tag:urgent) and due<2026-11-01",
+    "tag:work tag:urgent",
+    "not tag:work or priority=none",
+    "priority!=low and status!=completed",
+    "text:report or title='Call Bob'",
+    "description:'the report'",
+    "due=none",
+    "status=pending and due>=2026-10-05 and due<=2026-10-09",
+    "due=2026-10-07",
+    "not (status=pending and due<2026-10-08)",
+    "created>2025-12-07T10:00:20Z",
+    "id:0 or id:f",
+]
+
+
+def test_filter_expressions_match_predicate(any_storage):
+    from src.todo.query import compile_filter
+
+    titles = ["Write report", "Call Bob", "Fix bug", "Review the report", "Plan trip"]
+    tasks = [
+        Task(title=titles[i % 5], description="about the report" if i % 4 == 0 else None,
+             status=["pending", "completed"][i % 3 == 0], priority=["high", "medium", "low", None][i % 4],
+             tags=[["work"], ["urgent"], ["work", "urgent"], []][i % 4],
+             due_date=None if i % 5 == 0 else f"2026-10-{1 + i % 12:02d}",
+             created_at=f"2025-12-07T10:00:{i:02d}Z")
+        for i in range(40)
+    ]
+    any_storage.add_tasks(tasks)
+    any_storage.update_task(tasks[1].id, status="completed", tags=["home"])
+    any_storage.delete_task(tasks[2].id)
+
+    listing = any_storage.list_tasks()
+    for expression in FILTERS:
+        expected = [task for task in listing if compile_filter(expression)(task)]
+        assert any_storage.filter_tasks(expression) == expected, expression
+        assert list(any_storage.iter_tasks(where=expression, batch_size=3)) == expected, expression
+        assert any_storage.filter_tasks(expression, limit=2) == expected[:2], expression
+
+    assert [t.title for t in any_storage.filter_tasks("title='Call Bob' and status=completed")] == ["Call Bob"] * 4
+
+
+def test_quoted_filter_values_round_trip():
+    from src.todo.query import compile_filter, quote_value
+
+    for value in ['say "hi"', "it's", 'both "\'', 'C:\\dir\\', "plain", ""]:
+        assert compile_filter(f"title={quote_value(value)}").tree.value == value
+    # A backslash before anything but a quote or a backslash stays as it is.
+    assert compile_filter(r"title='C:\dir' and tag:\"a\\\"b\"").tree.terms[0].value == "C:\\dir"
+    assert compile_filter(r"tag:'it\'s'").tree.value == "it's"
+
+
+@pytest.mark.parametrize("expression", [
+    "", "status=", "colour=red", "(status=pending", "status=pending)", "due<someday",
+    "status<pending", "priority=urgent", "status=done", "tag:work or", "created<none",
+])
+def test_invalid_filter_expressions_are_rejected(expression):
+    from src.todo.query import compile_filter
+
+    with pytest.raises(ValueError, match="Invalid filter"):
+        compile_filter(expression)
+
+
+def test_filter_planner_uses_indexes_or_scans():
+    from src.todo.query import compile_filter
+
+    storage = InMemoryStorage()
+    storage.add_tasks([Task(title=f"Task {i}", tags=["rare"] if i == 7 else [], priority="low",
+                            due_date="2026-10-01" if i < 3 else None) for i in range(100)])
+    index = storage._index
+    rare = storage.filter_tasks("tag:rare")[0].id
+    assert compile_filter("tag:rare and priority=low").candidates(index) == {rare}
+    assert len(compile_filter("status=pending and due<2026-10-02").candidates(index)) == 3
+    # Without status=pending the due-date index would miss completed tasks.
+    assert compile_filter("due<2026-10-02").candidates(index) is None
+    assert compile_filter("not tag:rare").candidates(index) is None
+    assert compile_filter("tag:rare or priority!=low").candidates(index) is None
+    # Nearly every task matches: a page is found faster by scanning.
+    assert len(compile_filter("priority=low").candidates(index)) == 100
+    assert compile_filter("priority=low").candidates(index, limit=5) is None
@@ -5,15 +5,18 @@ import json
 import io
 import sys
 import argparse
+import uuid
 
 from src.todo.models import Task
-from src.todo.utils import now_iso, parse_tags, validate_priority, validate_uuid
+from src.todo.utils import format_iso, now_epoch, now_iso, parse_iso, parse_tags, uuid7, validate_id_prefix, validate_priority, validate_uuid
 from src.todo.storage import FileStorage
 import os
 from pathlib import Path
 
 # Import functions directly for testing, not the main entry point
-from src.todo.cli import storage, add_task, list_tasks_command, update_task_command, delete_task_command, complete_task_command 
+from src.todo.cli import _get_storage, add_task, list_tasks_command, update_task_command, delete_task_command, complete_task_command, bulk_complete_command, bulk_delete_command, stats_command, history_command, export_command, import_command
+
+storage = _get_storage()  # the store the CLI handlers use
 
 # Mock datetime for deterministic tests
 @pytest.fixture
@@ -54,10 +57,60 @@ def test_task_creation_with_all_fields(mock_datetime_utcnow):
     assert task.modified_at is None
     assert task.due_date == "2025-12-08T12:00:00Z"
 
+def test_task_compact_representation(mock_datetime_utcnow):
+    a = Task(title="A", status="".join(["pend", "ing"]), tags=["".join(["wo", "rk"])])
+    b = Task(title="B", tags=["work"])
+    assert not hasattr(a, "__dict__")
+    assert a.status is b.status
+    assert a.tags[0] is b.tags[0]
+    assert a.created_ts == 1765101600
+    assert a.to_dict()["created_at"] == "2025-12-07T10:00:00Z"
+
+    a.due_date = "2025-12-31"  # not in the canonical format: kept verbatim
+    assert a.due_date == "2025-12-31" and a.due_ts is None
+    a.modified_at = "2025-12-08T09:30:00Z"
+    assert a.modified_ts == 1765186200
+
+    copy = Task(**a.to_dict())
+    assert copy == a
+    assert repr(copy) == repr(a)
+    copy.tags = ["home"]
+    assert copy != a
+
 # --- Test Utility Functions ---
 def test_now_iso(mock_datetime_utcnow):
     assert now_iso() == "2025-12-07T10:00:00Z"
 
+def test_epoch_timestamps(mock_datetime_utcnow):
+    assert format_iso(now_epoch()) == now_iso()
+    assert parse_iso("2025-12-07T10:00:00Z") == now_epoch()
+    assert parse_iso("2025-12-07") is None
+    assert parse_iso("2025-02-30T00:00:00Z") is None
+
+def test_uuid7_ids_sort_in_creation_order():
+    from src.todo import models
+
+    ids = [uuid7() for _ in range(2000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert uuid.UUID(ids[0]).version == 7
+
+    models.set_id_scheme("uuid7")
+    try:
+        tasks = [Task(title=f"Task {i}") for i in range(100)]
+    finally:
+        models.set_id_scheme("uuid4")
+    assert [t.id for t in tasks] == sorted(t.id for t in tasks)
+    assert uuid.UUID(Task(title="Random").id).version == 4
+    with pytest.raises(ValueError, match="Invalid ID scheme: ulid"):
+        models.set_id_scheme("ulid")
+
+def test_validate_id_prefix():
+    validate_id_prefix("0190A1b2")
+    validate_id_prefix(str(uuid.uuid4()))
+    for value in ("", "not-an-id", "0" * 37):
+        with pytest.raises(ValueError, match="Invalid UUID"):
+            validate_id_prefix(value)
+
 def test_parse_tags():
     assert parse_tags("tag1, tag2,tag3 ") == ["tag1", "tag2", "tag3"]
     assert parse_tags("") == []
@@ -81,9 +134,10 @@ def test_validate_uuid():
 @pytest.fixture(autouse=True)
 def clear_storage():
     """Clear storage before each test."""
-    filepath = Path.home() / ".todo_cli" / "tasks.json"
-    if filepath.exists():
-        os.remove(filepath)
+    for name in ("tasks.json", "tasks.bin", "tasks.journal"):
+        filepath = Path.home() / ".todo_cli" / name
+        if filepath.exists():
+            os.remove(filepath)
     storage._tasks.clear() # Clear in-memory cache as well
     storage._load_tasks() # Reload empty tasks after clearing file
     yield
@@ -212,9 +266,18 @@ def run_cli_command():
         elif command_func == list_tasks_command:
             args.filter = None
             args.sort = None
+            args.limit = None
+            args.after = None
+            args.overdue = "--overdue" in args_list
+            args.due_within = None
+            args.at = None
             for i in range(len(args_list)):
                 if args_list[i] == "--filter": args.filter = args_list[i+1]
                 if args_list[i] == "--sort": args.sort = args_list[i+1]
+                if args_list[i] == "--limit": args.limit = int(args_list[i+1])
+                if args_list[i] == "--after": args.after = args_list[i+1]
+                if args_list[i] == "--due-within": args.due_within = args_list[i+1]
+                if args_list[i] == "--at": args.at = args_list[i+1]
                 if args_list[i] == "--json": args.format = 'json'
         elif command_func == update_task_command:
             args.id = args_list[1]
@@ -233,6 +296,28 @@ def run_cli_command():
                 if args_list[i] == "--due": args.due = args_list[i+1]
         elif command_func == delete_task_command or command_func == complete_task_command:
             args.id = args_list[1]
+        elif command_func == bulk_complete_command or command_func == bulk_delete_command:
+            args.ids = args_list[1:]
+        elif command_func == history_command:
+            args.command = args_list[0]
+        elif command_func == stats_command:
+            args.weeks = 8
+            if "--json" in args_list: args.format = 'json'
+        elif command_func == export_command:
+            args.output = None
+            args.type = None
+            args.filter = None
+            for i in range(len(args_list)):
+                if args_list[i] == "--output": args.output = args_list[i+1]
+                if args_list[i] == "--type": args.type = args_list[i+1]
+                if args_list[i] == "--filter": args.filter = args_list[i+1]
+        elif command_func == import_command:
+            args.file = args_list[1]
+            args.type = None
+            args.batch_size = 1000
+            for i in range(len(args_list)):
+                if args_list[i] == "--type": args.type = args_list[i+1]
+                if args_list[i] == "--batch-size": args.batch_size = int(args_list[i+1])
         
         command_func(args)
         captured = capsys.readouterr()
@@ -292,6 +377,22 @@ def test_cli_list_tasks_filter(run_cli_command, capsys, mock_datetime_utcnow):
     assert "Pending Task" not in out
     assert not err
 
+def test_cli_list_tasks_filter_expression(run_cli_command, capsys, mock_datetime_utcnow):
+    storage.add_task(Task(title="Urgent Task", tags=["urgent"], due_date="2026-10-20"))
+    storage.add_task(Task(title="High Task", priority="high", due_date="2026-12-01"))
+    storage.add_task(Task(title="Done Task", priority="high", status="completed", due_date="2026-10-20"))
+    storage.add_task(Task(title="Plain Task", priority="low"))
+
+    expression = "status=pending and (priority=high or tag:urgent) and due<2026-11-01"
+    for extra in ([], ["--sort", "title"]):
+        out, err = run_cli_command(list_tasks_command, ["list", "--filter", expression] + extra, capsys)
+        assert "Urgent Task" in out
+        assert "High Task" not in out and "Done Task" not in out and "Plain Task" not in out
+        assert not err
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--filter", "status=pending and (tag:urgent"], capsys)
+    assert "Error: Invalid filter" in err and "missing ')'" in err
+
 def test_cli_list_tasks_sort(run_cli_command, capsys, mock_datetime_utcnow):
     task_high = Task(title="High Priority", priority="high", created_at="2025-12-07T10:00:00Z")
     task_medium = Task(title="Medium Priority", priority="medium", created_at="2025-12-07T10:00:01Z")
@@ -361,3 +462,254 @@ def test_cli_complete_task_non_existent(run_cli_command, capsys):
     out, err = run_cli_command(complete_task_command, ["complete", "non-existent-id"], capsys)
     assert "Error completing task: Invalid UUID: non-existent-id" in err
     assert not out
+
+def test_cli_list_tasks_paginated(run_cli_command, capsys, mock_datetime_utcnow):
+    tasks = [Task(title=f"Paged {i}", created_at=f"2025-12-07T10:00:0{i}Z") for i in range(3)]
+    for task in tasks:
+        storage.add_task(task)
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--limit", "2"], capsys)
+    titles = [line for line in out.splitlines() if "Title:" in line]
+    assert len(titles) == 2 and "Paged 0" in titles[0] and "Paged 1" in titles[1]
+    cursor = out.splitlines()[-1].split("Next cursor: ")[1]
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--limit", "2", "--after", cursor], capsys)
+    titles = [line for line in out.splitlines() if "Title:" in line]
+    assert len(titles) == 1 and "Paged 2" in titles[0]
+    assert "Next cursor" not in out
+    assert not err
+
+def test_cli_list_tasks_json_empty(run_cli_command, capsys):
+    out, err = run_cli_command(list_tasks_command, ["list", "--json"], capsys)
+    assert json.loads(out) == []
+
+def test_cli_bulk_complete_and_delete(run_cli_command, capsys, mock_datetime_utcnow):
+    tasks = [Task(title=f"Bulk {i}") for i in range(3)]
+    storage.add_tasks(tasks)
+
+    out, err = run_cli_command(bulk_complete_command, ["bulk-complete"] + [t.id for t in tasks[:2]] + [tasks[0].id], capsys)
+    assert "2 task(s) marked as completed." in out
+    assert {t.id for t in storage.search_tasks(status="completed")} == {t.id for t in tasks[:2]}
+
+    out, err = run_cli_command(bulk_delete_command, ["bulk-delete", tasks[0].id, "00000000-0000-0000-0000-000000000000"], capsys)
+    assert "Error deleting tasks: 'Task with ID 00000000-0000-0000-0000-000000000000 not found.'" in err
+    assert len(storage.list_tasks()) == 3
+
+    out, err = run_cli_command(bulk_delete_command, ["bulk-delete", tasks[0].id, tasks[0].id[:12]], capsys)
+    assert "1 task(s) deleted." in out
+
+def test_cli_bulk_commands_report_unexpected_errors(run_cli_command, capsys, monkeypatch):
+    import src.todo.cli as cli
+    task = Task(title="Bulk")
+    storage.add_task(task)
+    monkeypatch.setattr(cli.storage, "delete_tasks", lambda task_ids: 1 / 0)
+    out, err = run_cli_command(bulk_delete_command, ["bulk-delete", task.id], capsys)
+    assert "An unexpected error occurred: division by zero" in err
+
+def test_cli_stats(run_cli_command, capsys, mock_datetime_utcnow):
+    storage.add_tasks([Task(title="Late", tags=["work"], due_date="2025-12-01T09:00:00Z"),
+                       Task(title="Done", status="completed", priority="low")])
+
+    out, err = run_cli_command(stats_command, ["stats"], capsys)
+    assert "Total: 2" in out
+    assert "Tag: work: 1 pending / 1" in out
+    assert "Overdue 0-1 weeks: 1" in out
+
+    out, err = run_cli_command(stats_command, ["stats", "--json"], capsys)
+    data = json.loads(out)
+    assert data["by_status"] == {"pending": 1, "completed": 1}
+    assert data["created_by_week"][0] == 2
+
+def test_cli_list_tasks_by_due_date(run_cli_command, capsys, mock_datetime_utcnow):
+    storage.add_tasks([Task(title="Late", due_date="2025-12-01"),
+                       Task(title="Soon", due_date="2025-12-09T09:00:00Z"),
+                       Task(title="Later", due_date="2026-01-31T09:00:00Z")])
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--overdue"], capsys)
+    assert "Late" in out and "Soon" not in out
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--due-within", "3d", "--json"], capsys)
+    assert [task["title"] for task in json.loads(out)] == ["Soon"]
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--overdue", "--due-within", "1w"], capsys)
+    assert "Late" in out and "Soon" in out and "Later" not in out
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--due-within", "soon"], capsys)
+    assert "Error: Invalid duration: soon." in err
+
+def test_cli_commands_accept_short_ids(run_cli_command, capsys, mock_datetime_utcnow):
+    first = Task(title="First", id="0190a1b2-0000-7000-8000-000000000001")
+    second = Task(title="Second", id="0190a1b2-0000-7000-8000-000000000002")
+    storage.add_tasks([first, second])
+
+    out, err = run_cli_command(complete_task_command, ["complete", "0190a1b2"], capsys)
+    assert "Error completing task: ID prefix '0190a1b2' is ambiguous; it matches" in err
+    assert second.id in err
+
+    out, err = run_cli_command(complete_task_command, ["complete", storage.short_id(second.id)], capsys)
+    assert f"Task '{second.id}' marked as completed." in out
+    assert storage.get_task(second.id).status == "completed"
+
+def test_cli_history_is_opt_in(run_cli_command, capsys, monkeypatch, tmp_path):
+    import src.todo.cli as cli
+    from src.todo.storage import history_enabled
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    monkeypatch.setattr(cli, "storage", cli.get_storage())
+    out, err = run_cli_command(history_command, ["undo"], capsys)
+    assert "History is not enabled for this store." in err
+    assert not (tmp_path / ".todo_cli" / "history").exists()
+
+    cli.get_storage(history=True)
+    assert history_enabled()
+    # Once enabled, the store keeps recording without the flag.
+    assert cli.get_storage()._history is not None
+
+def test_cli_file_store_appends_to_the_journal(monkeypatch, tmp_path):
+    import src.todo.cli as cli
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    store = cli.get_storage()
+    store.add_task(Task(title="Journaled"))
+    store.close()
+    journal = tmp_path / ".todo_cli" / "tasks.journal"
+    assert len(journal.read_text().splitlines()) == 1
+
+def test_cli_undo_redo_and_list_at(run_cli_command, capsys, mock_datetime_utcnow, monkeypatch, tmp_path):
+    import src.todo.cli as cli
+    storage = FileStorage(storage_dir=tmp_path, history=True)
+    monkeypatch.setattr(cli, "storage", storage)
+    task = Task(title="Draft")
+    storage.add_task(task)
+    storage.update_task(task.id, title="Final")
+
+    out, err = run_cli_command(history_command, ["undo"], capsys)
+    assert out.strip() == "Undid 1 change(s)."
+    assert storage.get_task(task.id).title == "Draft"
+
+    out, err = run_cli_command(history_command, ["redo"], capsys)
+    assert out.strip() == "Redid 1 change(s)."
+    assert storage.get_task(task.id).title == "Final"
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--at", "2099-01-01", "--json"], capsys)
+    assert "Final" in [item["title"] for item in json.loads(out)]
+
+    out, err = run_cli_command(list_tasks_command, ["list", "--at", "1999-01-01"], capsys)
+    assert "Error: No history before" in err
+    out, err = run_cli_command(list_tasks_command, ["list", "--at", "last tuesday"], capsys)
+    assert "Error: Invalid date: last tuesday." in err
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_cli_export_import_round_trip(run_cli_command, capsys, mock_datetime_utcnow, tmp_path, fmt):
+    tasks = [
+        Task(title="Write report", description="Q4, with \"quotes\"", priority="high", tags=["work", "q4"], due_date="2026-01-15"),
+        Task(title="Done task", status="completed", priority=None, modified_at="2025-12-08T09:00:00Z"),
+        Task(title="Plain task"),
+    ]
+    storage.add_tasks(tasks)
+    path = tmp_path / f"tasks.{fmt}"
+
+    out, err = run_cli_command(export_command, ["export", "--output", str(path)], capsys)
+    assert out.strip() == f"Exported 3 task(s) to {path}."
+    assert len(path.read_text().splitlines()) == (4 if fmt == "csv" else 3)
+    out, err = run_cli_command(export_command, ["export", "--type", fmt, "--filter", "priority=high"], capsys)
+    assert "Write report" in out and "Plain task" not in out
+
+    expected = sorted((task.to_dict() for task in tasks), key=lambda item: item["id"])
+    storage.delete_tasks([task.id for task in tasks])
+    out, err = run_cli_command(import_command, ["import", str(path), "--batch-size", "2"], capsys)
+    assert out.strip() == "Imported 3 task(s), skipped 0 invalid row(s)."
+    assert "... 2 task(s) imported" in err and "... 3 task(s) imported" in err
+    assert sorted((task.to_dict() for task in storage.list_tasks()), key=lambda item: item["id"]) == expected
+
+    # Importing the same file again finds every ID taken.
+    out, err = run_cli_command(import_command, ["import", str(path)], capsys)
+    assert out.strip() == "Imported 0 task(s), skipped 3 invalid row(s)."
+    assert "Skipped line 2: Task with ID" in err
+
+def test_ndjson_round_trip_keeps_empty_descriptions():
+    from src.todo.transfer import read_tasks, write_tasks
+    tasks = [Task(title="Empty", description=""), Task(title="Missing")]
+    out = io.StringIO()
+    write_tasks(tasks, out)
+    read = [task for _, task in read_tasks(out.getvalue().splitlines())]
+    assert [task.to_dict() for task in read] == [task.to_dict() for task in tasks]
+
+def test_cli_import_reports_invalid_rows(run_cli_command, capsys, mock_datetime_utcnow, tmp_path):
+    taken = Task(title="Existing")
+    storage.add_task(taken)
+    path = tmp_path / "tasks.ndjson"
+    path.write_text("\n".join([
+        json.dumps({"title": "Good", "tags": ["a", "b"], "priority": "low"}),
+        json.dumps({"title": ""}),
+        "{not json",
+        json.dumps({"title": "Bad priority", "priority": "urgent"}),
+        "",
+        json.dumps({"title": "Bad date", "created_at": "yesterday"}),
+        json.dumps({"title": "Bad id", "id": "not-a-uuid"}),
+        json.dumps({"title": "Taken", "id": taken.id}),
+        json.dumps({"title": "Extra", "colour": "red"}),
+        json.dumps(["a list"]),
+        json.dumps({"title": "CSV-style tags", "tags": "x, y", "status": "completed"}),
+    ]) + "\n")
+
+    out, err = run_cli_command(import_command, ["import", str(path)], capsys)
+    assert out.strip() == "Imported 2 task(s), skipped 8 invalid row(s)."
+    for line, message in [(2, "Task title cannot be empty."), (3, "Invalid JSON"), (4, "Invalid priority: urgent"),
+                          (6, "Invalid created_at: yesterday"), (7, "Invalid UUID"), (8, f"Task with ID {taken.id} already exists"),
+                          (9, "Unknown field(s): colour"), (10, "Expected a JSON object")]:
+        assert f"Skipped line {line}: {message}" in err
+    imported = {task.title: task for task in storage.list_tasks()}
+    assert imported["Good"].tags == ["a", "b"] and imported["Good"].priority == "low"
+    assert imported["CSV-style tags"].tags == ["x", "y"] and imported["CSV-style tags"].status == "completed"
+
+    path = tmp_path / "tasks.csv"
+    path.write_text("title,colour\nA,red\n")
+    out, err = run_cli_command(import_command, ["import", str(path)], capsys)
+    assert "Error importing tasks: Unknown CSV column(s): colour." in err
+
+def test_cli_main_opens_the_store_once(monkeypatch, capsys):
+    import src.todo.cli as cli
+    from src.todo.storage import InMemoryStorage
+    monkeypatch.setattr(cli, "storage", cli.storage)  # restored after the test
+    opened, daemon_store = [], InMemoryStorage()
+    monkeypatch.setattr(cli, "get_storage", lambda kind='file', history=False: opened.append(kind) or InMemoryStorage())
+
+    monkeypatch.setattr(cli, "connect", lambda kind: None)  # no daemon running
+    monkeypatch.setattr(sys, "argv", ["todo", "--storage", "memory", "--format", "plain", "stats"])
+    cli.main()
+    assert opened == ["memory"]
+
+    monkeypatch.setattr(cli, "connect", lambda kind: daemon_store)
+    cli.main()
+    assert opened == ["memory"] and cli.storage is daemon_store
+    monkeypatch.setattr(sys, "argv", ["todo", "--no-daemon", "--format", "plain", "stats"])
+    cli.main()
+    assert opened == ["memory", "file"]
+    assert "Total: 0" in capsys.readouterr().out
+
+    # Handlers called without main() open the default store on first use, once.
+    monkeypatch.setattr(cli, "storage", None)
+    cli.stats_command(argparse.Namespace(format='plain', weeks=8))
+    assert cli._get_storage() is cli.storage and opened == ["memory", "file", "file"]
+
+def test_cli_rejects_history_flag_for_a_daemon_without_history(monkeypatch, capsys):
+    import src.todo.cli as cli
+    from src.todo.storage import InMemoryStorage
+    monkeypatch.setattr(cli, "storage", cli.storage)  # restored after the test
+
+    class Daemon(InMemoryStorage):
+        recording = False
+        def ping(self):
+            return {"storage": "file", "history": self.recording}
+        def close(self):
+            pass
+
+    daemon = Daemon()
+    monkeypatch.setattr(cli, "connect", lambda kind: daemon)
+    monkeypatch.setattr(sys, "argv", ["todo", "--history", "--format", "plain", "stats"])
+    with pytest.raises(SystemExit):
+        cli.main()
+    assert "--history has no effect on the running task daemon" in capsys.readouterr().err
+
+    Daemon.recording = True
+    cli.main()
+    assert cli.storage is daemon and "Total: 0" in capsys.readouterr().out